@@ -0,0 +1,26 @@
+"""Utilitários compartilhados pelos benchmarks (rodar os scripts a partir de backend/)."""
+import os
+import subprocess
+import sys
+
+RAIZ_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ_BACKEND not in sys.path:
+    sys.path.insert(0, RAIZ_BACKEND)
+# src.main cria uma aplicação ao ser importado; sem isso ela tentaria o banco de produção
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) pelo método do valor mais próximo"""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ_BACKEND,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,159 @@
+"""
+Gera uma base sintética grande para os benchmarks.
+
+Padrão: 10 mil empresas, 100 mil licenças, 1 milhão de condicionantes e 200 mil
+notificações. As linhas são geradas em blocos (memória constante) e gravadas com
+COPY no PostgreSQL ou com executemany nos demais bancos (SQLite).
+
+Uso (a partir de backend/):
+    python benchmarks/gerar_dados.py sqlite:////tmp/benchmark.db
+    python benchmarks/gerar_dados.py postgresql://localhost/licenciamento_bench --escala 0.1
+"""
+import argparse
+import csv
+import io
+import itertools
+import random
+import time
+from datetime import date, datetime, timedelta
+
+import comum  # noqa: F401  (ajusta sys.path)
+from sqlalchemy import create_engine, event
+from src.models.user import db
+from src.models.licenciamento import Empresa, Licenca, Condicionante, Notificacao
+
+QUANTIDADES_PADRAO = {'empresas': 10_000, 'licencas': 100_000, 'condicionantes': 1_000_000, 'notificacoes': 200_000}
+TAMANHO_BLOCO = 50_000
+
+TIPOS_LICENCA = ['Licença Prévia', 'Licença de Instalação', 'Licença de Operação',
+                 'Licença de Operação - Renovação', 'Autorização Ambiental']
+DESCRICOES = ['Apresentar relatório de monitoramento de efluentes', 'Enviar plano de gerenciamento de resíduos',
+              'Realizar monitoramento de ruído', 'Manter cadastro técnico federal atualizado',
+              'Apresentar inventário de emissões atmosféricas', 'Executar programa de educação ambiental']
+RESPONSAVEIS = ['Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', None]
+
+
+def _empresas(n, rng, agora):
+    for i in range(1, n + 1):
+        yield (i, f'Empresa Sintética {i}', f'{i:014d}', f'(82) 9{rng.randrange(10**7, 10**8)}',
+               f'contato{i}@empresa.com.br', f'Rua {i}, Maceió - AL', agora, agora)
+
+
+def _licencas(n, empresas, rng, hoje, agora):
+    for i in range(1, n + 1):
+        emissao = hoje - timedelta(days=rng.randrange(0, 1500))
+        vencimento = emissao + timedelta(days=rng.choice((365, 730, 1460, 2190)))
+        status = 'vencida' if vencimento < hoje else rng.choices(('ativa', 'cancelada'), (95, 5))[0]
+        yield (i, rng.randrange(1, empresas + 1), rng.choice(TIPOS_LICENCA), f'LIC-{i:07d}', 'IMA/AL',
+               emissao, vencimento, status, None, agora, agora)
+
+
+def _condicionantes(n, licencas, rng, hoje, agora):
+    for i in range(1, n + 1):
+        prazo = rng.choice((30, 60, 90, 120, 180, 365))
+        limite = hoje + timedelta(days=rng.randrange(-400, 800))
+        status = rng.choices(('pendente', 'cumprida', 'vencida'), (60, 30, 10))[0]
+        envio = limite - timedelta(days=rng.randrange(0, 30)) if status == 'cumprida' else None
+        contagem = rng.choices(('corridos', 'corridos_dia_util', 'uteis'), (70, 10, 20))[0]
+        yield (i, rng.randrange(1, licencas + 1), rng.choice(DESCRICOES), prazo, contagem, limite, status,
+               rng.choice(RESPONSAVEIS), None, envio, None, agora, agora)
+
+
+def _notificacoes(n, condicionantes, rng, agora):
+    for i in range(1, n + 1):
+        tipo = rng.choices(('calendar', 'email'), (70, 30))[0]
+        status = rng.choices(('enviada', 'pendente', 'erro'), (85, 10, 5))[0]
+        envio = agora - timedelta(minutes=rng.randrange(0, 500_000)) if status == 'enviada' else None
+        evento = f'evt{i:09d}' if tipo == 'calendar' and status == 'enviada' else None
+        yield (i, rng.randrange(1, condicionantes + 1), tipo, envio, status, evento, None, agora)
+
+
+def _colunas(modelo):
+    return [coluna.name for coluna in modelo.__table__.columns]
+
+
+def _copiar_postgres(conexao, tabela, colunas, linhas):
+    """COPY ... FROM STDIN em blocos de CSV"""
+    cursor = conexao.connection.dbapi_connection.cursor()
+    while True:
+        bloco = list(itertools.islice(linhas, TAMANHO_BLOCO))
+        if not bloco:
+            break
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        for linha in bloco:
+            escritor.writerow(['\\N' if v is None else (v.isoformat() if isinstance(v, (date, datetime)) else v)
+                               for v in linha])
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {tabela} ({', '.join(colunas)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+    # Sequências do SERIAL passam a continuar depois dos ids gerados
+    conexao.exec_driver_sql(f"SELECT setval(pg_get_serial_sequence('{tabela}', 'id'), COALESCE(MAX(id), 1)) FROM {tabela}")
+
+
+def _inserir_em_lote(conexao, tabela, colunas, linhas):
+    """executemany em blocos (um INSERT preparado, vários conjuntos de parâmetros)"""
+    marcadores = ', '.join(['?'] * len(colunas)) if conexao.dialect.paramstyle == 'qmark' else \
+        ', '.join(['%s'] * len(colunas))
+    sql = f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({marcadores})"
+    cursor = conexao.connection.dbapi_connection.cursor()
+    while True:
+        bloco = list(itertools.islice(linhas, TAMANHO_BLOCO))
+        if not bloco:
+            break
+        cursor.executemany(sql, bloco)
+
+
+def gerar_dados(url, escala=1.0, semente=42, quantidades=None):
+    """
+    Cria as tabelas em `url` (que deve estar vazia) e carrega a base sintética.
+
+    Returns:
+        dict: Linhas inseridas por tabela e o tempo total
+    """
+    quantidades = {tabela: max(1, int(n * escala)) for tabela, n in (quantidades or QUANTIDADES_PADRAO).items()}
+    rng = random.Random(semente)
+    hoje = date.today()
+    agora = datetime.utcnow().replace(microsecond=0)
+
+    engine = create_engine(url)
+    if engine.dialect.name == 'sqlite':
+        @event.listens_for(engine, 'connect')
+        def _pragmas_de_carga(conexao_dbapi, _):
+            conexao_dbapi.execute('PRAGMA journal_mode=OFF')
+            conexao_dbapi.execute('PRAGMA synchronous=OFF')
+    db.metadata.create_all(engine)
+
+    carregar = _copiar_postgres if engine.dialect.name == 'postgresql' else _inserir_em_lote
+    cargas = [
+        (Empresa, _empresas(quantidades['empresas'], rng, agora)),
+        (Licenca, _licencas(quantidades['licencas'], quantidades['empresas'], rng, hoje, agora)),
+        (Condicionante, _condicionantes(quantidades['condicionantes'], quantidades['licencas'], rng, hoje, agora)),
+        (Notificacao, _notificacoes(quantidades['notificacoes'], quantidades['condicionantes'], rng, agora)),
+    ]
+
+    inicio = time.perf_counter()
+    with engine.begin() as conexao:
+        for modelo, linhas in cargas:
+            carregar(conexao, modelo.__tablename__, _colunas(modelo), linhas)
+    if engine.dialect.name == 'postgresql':
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conexao:
+            conexao.exec_driver_sql('ANALYZE')
+    engine.dispose()
+
+    return {**quantidades, 'segundos': round(time.perf_counter() - inicio, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera a base sintética dos benchmarks')
+    parser.add_argument('url', help='URL SQLAlchemy do banco (vazio) de destino')
+    parser.add_argument('--escala', type=float, default=1.0, help='Multiplica as quantidades padrão (ex.: 0.01)')
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+
+    resultado = gerar_dados(args.url, args.escala, args.semente)
+    print(', '.join(f'{tabela}: {n}' for tabela, n in resultado.items() if tabela != 'segundos') +
+          f" — {resultado['segundos']}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Mede o custo de inicialização de um worker: importar `src.main` e atender a primeira requisição.
+
+Cada medição roda num processo Python novo (como um worker do gunicorn recém-criado).
+Também executa `python -X importtime` e lista os módulos mais caros de importar.
+
+Uso (a partir de backend/):
+    python benchmarks/inicializacao.py --execucoes 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from comum import RAIZ_BACKEND, commit_atual
+
+# Executado no processo filho: tempo desde o início do interpretador até a primeira resposta
+_SCRIPT_PRIMEIRA_REQUISICAO = """
+import time
+inicio = time.perf_counter()
+from src.main import app
+importado = time.perf_counter()
+resposta = app.test_client().get('/api/calendar/config')
+fim = time.perf_counter()
+assert resposta.status_code == 200
+print(importado - inicio, fim - inicio)
+"""
+
+
+def _ambiente(url_banco):
+    return {**os.environ, 'DATABASE_URL': url_banco, 'PYTHONPATH': RAIZ_BACKEND}
+
+
+def medir_primeira_requisicao(url_banco, execucoes):
+    importacao, primeira = [], []
+    for _ in range(execucoes):
+        saida = subprocess.run([sys.executable, '-c', _SCRIPT_PRIMEIRA_REQUISICAO], cwd=RAIZ_BACKEND,
+                               env=_ambiente(url_banco), capture_output=True, text=True, check=True)
+        segundos_importacao, segundos_primeira = map(float, saida.stdout.split())
+        importacao.append(segundos_importacao * 1000)
+        primeira.append(segundos_primeira * 1000)
+    return {
+        'importacao_ms': round(statistics.median(importacao), 1),
+        'primeira_requisicao_ms': round(statistics.median(primeira), 1)
+    }
+
+
+def modulos_mais_caros(url_banco, quantidade):
+    """
+    Saída do -X importtime: tempo total de `src.main` e os módulos importados diretamente
+    por ele, pelo tempo acumulado (incluindo as próprias dependências).
+    """
+    saida = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import src.main'], cwd=RAIZ_BACKEND,
+                           env=_ambiente(url_banco), capture_output=True, text=True, check=True)
+    # Os filhos aparecem antes do módulo que os importou, com um nível a mais de indentação
+    pendentes, total, diretos = [], None, []
+    for linha in saida.stderr.splitlines():
+        if not linha.startswith('import time:') or 'cumulative' in linha:
+            continue
+        _, acumulado, nome = linha[len('import time:'):].split('|')
+        nivel = (len(nome) - len(nome.lstrip()) - 1) // 2
+        if nivel == 1:
+            pendentes.append((int(acumulado), nome.strip()))
+        elif nivel == 0:
+            if nome.strip() == 'src.main':
+                total, diretos = int(acumulado), pendentes
+            pendentes = []
+    return {
+        'src_main_ms': round(total / 1000, 1) if total else None,
+        'mais_caros': [{'modulo': nome, 'ms': round(acumulado / 1000, 1)}
+                       for acumulado, nome in sorted(diretos, reverse=True)[:quantidade]]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tempo de inicialização de um worker')
+    parser.add_argument('--execucoes', type=int, default=5)
+    parser.add_argument('--banco', help='URL do banco (padrão: SQLite temporário)')
+    args = parser.parse_args()
+
+    url_banco = args.banco or f'sqlite:///{os.path.join(tempfile.mkdtemp(), "inicializacao.db")}'
+    relatorio = {
+        'commit': commit_atual(),
+        **medir_primeira_requisicao(url_banco, args.execucoes),
+        'importtime': modulos_mais_caros(url_banco, 10)
+    }
+    print(json.dumps(relatorio, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
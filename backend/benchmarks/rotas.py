@@ -0,0 +1,121 @@
+"""
+Mede as rotas GET da API sobre uma base gerada por gerar_dados.py.
+
+Para cada rota: latência p50/p95/p99, pico de memória alocada (tracemalloc) e número
+de comandos SQL por requisição. O resultado é gravado em JSON para comparar execuções.
+
+Uso (a partir de backend/):
+    python benchmarks/gerar_dados.py sqlite:////tmp/benchmark.db
+    python benchmarks/rotas.py sqlite:////tmp/benchmark.db --repeticoes 10 --saida resultado.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+
+from comum import percentil, commit_atual
+from sqlalchemy import event
+from src.main import create_app
+from src.models.user import db
+
+ROTAS = [
+    '/api/empresas',
+    '/api/licencas',
+    '/api/licencas/vencimento',
+    '/api/condicionantes',
+    '/api/condicionantes/vencimento',
+    '/api/dashboard/resumo',
+    '/api/calendar/status',
+]
+
+
+def medir_rota(client, engine, url, repeticoes):
+    comandos = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        comandos.append(statement)
+
+    client.get(url)  # aquecimento (cache de compilação do SQLAlchemy, páginas do banco)
+
+    latencias, consultas, tamanhos, status = [], [], [], set()
+    event.listen(engine, 'before_cursor_execute', contar)
+    try:
+        for _ in range(repeticoes):
+            comandos.clear()
+            inicio = time.perf_counter()
+            resposta = client.get(url)
+            corpo = resposta.get_data()
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            consultas.append(len(comandos))
+            tamanhos.append(len(corpo))
+            status.add(resposta.status_code)
+    finally:
+        event.remove(engine, 'before_cursor_execute', contar)
+
+    # Memória numa requisição à parte: o tracemalloc deixaria as medições de latência mais lentas
+    tracemalloc.start()
+    client.get(url).get_data()
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'rota': url,
+        'status': sorted(status),
+        'repeticoes': repeticoes,
+        'latencia_ms': {
+            'p50': round(statistics.median(latencias), 2),
+            'p95': round(percentil(latencias, 95), 2),
+            'p99': round(percentil(latencias, 99), 2),
+            'max': round(max(latencias), 2)
+        },
+        'pico_memoria_mb': round(pico / 1024 / 1024, 2),
+        'consultas_sql': max(consultas),
+        'bytes_resposta': max(tamanhos)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark das rotas GET da API')
+    parser.add_argument('url', help='URL SQLAlchemy da base gerada por gerar_dados.py')
+    parser.add_argument('--repeticoes', type=int, default=10)
+    parser.add_argument('--rota', action='append', dest='rotas', help='Mede apenas esta rota (pode repetir)')
+    parser.add_argument('--saida', help='Arquivo JSON de saída (padrão: imprime na tela)')
+    args = parser.parse_args()
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': args.url})
+    client = app.test_client()
+
+    with app.app_context():
+        engine = db.engine
+        contagens = {
+            tabela: db.session.execute(db.text(f'SELECT COUNT(*) FROM {tabela}')).scalar()
+            for tabela in ('empresas', 'licencas', 'condicionantes', 'notificacoes')
+        }
+
+    resultados = []
+    for url in args.rotas or ROTAS:
+        resultado = medir_rota(client, engine, url, args.repeticoes)
+        resultados.append(resultado)
+        print(f"{url:35} p50 {resultado['latencia_ms']['p50']:>9} ms  p99 {resultado['latencia_ms']['p99']:>9} ms  "
+              f"{resultado['consultas_sql']:>3} consultas  {resultado['pico_memoria_mb']:>8} MB")
+
+    relatorio = {
+        'executado_em': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit_atual(),
+        'python': platform.python_version(),
+        'banco': engine.dialect.name,
+        'linhas': contagens,
+        'rotas': resultados
+    }
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+    else:
+        print(json.dumps(relatorio, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Compara a serialização JSON das respostas com orjson e com o módulo json da biblioteca
+padrão (fallback do ProvedorJSON) na listagem `/api/condicionantes` com 10 mil linhas.
+
+Mede a rota inteira e, à parte, só a codificação do payload já montado.
+
+Uso (a partir de backend/):
+    python benchmarks/serializacao_json.py --condicionantes 10000 --repeticoes 10
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from comum import commit_atual
+from gerar_dados import gerar_dados
+from src.main import create_app
+from src.services import serializacao
+
+
+def _mediana_ms(funcao, repeticoes):
+    funcao()  # aquecimento
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return round(statistics.median(tempos), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serialização JSON: orjson x json')
+    parser.add_argument('--condicionantes', type=int, default=10000)
+    parser.add_argument('--repeticoes', type=int, default=10)
+    args = parser.parse_args()
+
+    url = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "serializacao.db")}'
+    gerar_dados(url, quantidades={'empresas': args.condicionantes // 10, 'licencas': args.condicionantes // 5,
+                                  'condicionantes': args.condicionantes, 'notificacoes': 1})
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+    client = app.test_client()
+
+    with app.test_request_context():
+        from src.models.licenciamento import Condicionante
+        payload = [dict(c.to_dict(), licenca=c.licenca.to_dict(), empresa=c.licenca.empresa.to_dict())
+                   for c in Condicionante.query.all()]
+
+    orjson = serializacao.orjson
+    relatorio = {'commit': commit_atual(), 'linhas': len(payload), 'bytes': len(client.get('/api/condicionantes').data)}
+    for nome, modulo in (('orjson', orjson), ('json', None)):
+        serializacao.orjson = modulo
+        try:
+            relatorio[nome] = {
+                'rota_ms': _mediana_ms(lambda: client.get('/api/condicionantes').data, args.repeticoes),
+                'codificacao_ms': _mediana_ms(lambda: app.json.response(payload).data, args.repeticoes)
+            }
+        finally:
+            serializacao.orjson = orjson
+    print(json.dumps(relatorio, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark: latência de outras rotas durante uma rajada de logins.
+
+Sobe a aplicação num servidor WSGI com threads (como o gunicorn com worker gthread),
+dispara logins concorrentes e, ao mesmo tempo, mede a latência de GET /api/empresas.
+Cada configuração de PASSWORD_HASH_WORKERS é medida separadamente; 0 reproduz o
+comportamento antigo (hash calculado dentro da requisição).
+
+Uso (a partir de backend/):
+    python benchmarks/tempestade_login.py --workers 0,2 --logins 200 --concorrencia 16
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from comum import percentil
+from werkzeug.serving import make_server
+from src.main import create_app
+from src.models.user import db, User
+from src.models.licenciamento import Empresa
+from src.services import senhas
+
+EMAIL = 'benchmark@empresa.com'
+SENHA = 'senha-do-benchmark'
+
+
+def _post_login(base):
+    corpo = json.dumps({'email': EMAIL, 'password': SENHA}).encode()
+    requisicao = urllib.request.Request(f'{base}/api/login', data=corpo,
+                                        headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(requisicao, timeout=60) as resposta:
+            return resposta.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def medir(workers, logins, concorrencia, fila):
+    _, caminho_db = tempfile.mkstemp(suffix='.db')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho_db}',
+        'UPLOAD_FOLDER': tempfile.mkdtemp(),
+        'PASSWORD_HASH_WORKERS': workers,
+        'PASSWORD_HASH_FILA': fila
+    })
+    # O pool e o semáforo são globais do processo: recomeça para cada configuração
+    senhas._executor, senhas._vagas = None, None
+
+    with app.app_context():
+        db.create_all()
+        usuario = User(email=EMAIL)
+        usuario.set_password(SENHA)
+        db.session.add(usuario)
+        db.session.add(Empresa(razao_social='Empresa Benchmark', cnpj='33000167000101'))
+        db.session.commit()
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{servidor.server_port}'
+
+    status_logins = []
+    restantes = iter(range(logins))
+    trava = threading.Lock()
+
+    def disparar_logins():
+        while True:
+            with trava:
+                if next(restantes, None) is None:
+                    return
+            status = _post_login(base)
+            with trava:
+                status_logins.append(status)
+
+    latencias = []
+    em_rajada = threading.Event()
+    em_rajada.set()
+
+    def sondar():
+        while em_rajada.is_set():
+            inicio = time.perf_counter()
+            with urllib.request.urlopen(f'{base}/api/empresas', timeout=60) as resposta:
+                resposta.read()
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            time.sleep(0.01)
+
+    sonda = threading.Thread(target=sondar)
+    disparadores = [threading.Thread(target=disparar_logins) for _ in range(concorrencia)]
+    inicio = time.perf_counter()
+    sonda.start()
+    for thread in disparadores:
+        thread.start()
+    for thread in disparadores:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+    em_rajada.clear()
+    sonda.join()
+    servidor.shutdown()
+    if senhas._executor:
+        senhas._executor.shutdown()
+    os.unlink(caminho_db)
+
+    return {
+        'password_hash_workers': workers,
+        'logins': len(status_logins),
+        'logins_ok': status_logins.count(200),
+        'logins_503': status_logins.count(503),
+        'logins_por_segundo': round(len(status_logins) / duracao, 1),
+        'outras_rotas_ms': {
+            'amostras': len(latencias),
+            'p50': round(statistics.median(latencias), 2) if latencias else None,
+            'p95': round(percentil(latencias, 95), 2) if latencias else None,
+            'p99': round(percentil(latencias, 99), 2) if latencias else None
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', default='0,2', help='Valores de PASSWORD_HASH_WORKERS, separados por vírgula')
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concorrencia', type=int, default=16)
+    parser.add_argument('--fila', type=int, default=64, help='PASSWORD_HASH_FILA')
+    args = parser.parse_args()
+
+    resultados = [medir(int(w), args.logins, args.concorrencia, args.fila) for w in args.workers.split(',')]
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+import os
+import click
+from datetime import datetime
+
+
+def _adicionar_colunas_faltantes(db):
+    """
+    create_all não altera tabelas existentes: adiciona as colunas novas dos modelos
+    (que devem ser anuláveis ou ter server_default) com ALTER TABLE ... ADD COLUMN.
+    """
+    from sqlalchemy import inspect
+    from sqlalchemy.schema import CreateColumn
+
+    inspetor = inspect(db.engine)
+    adicionadas = []
+    for tabela in db.metadata.sorted_tables:
+        existentes = {coluna['name'] for coluna in inspetor.get_columns(tabela.name)}
+        for coluna in tabela.columns:
+            if coluna.name not in existentes:
+                definicao = CreateColumn(coluna).compile(dialect=db.engine.dialect)
+                with db.engine.begin() as conexao:
+                    conexao.exec_driver_sql(f'ALTER TABLE {tabela.name} ADD COLUMN {definicao}')
+                adicionadas.append(f'{tabela.name}.{coluna.name}')
+    return adicionadas
+
+
+def inicializar_banco(app):
+    """Cria as tabelas, colunas e índices que ainda não existem e as pastas de upload."""
+    from src.models.user import db
+
+    with app.app_context():
+        db.create_all()
+        for coluna in _adicionar_colunas_faltantes(db):
+            app.logger.info(f'Coluna adicionada: {coluna}')
+        # create_all não cria índices novos em tabelas que já existiam
+        for tabela in db.metadata.sorted_tables:
+            for indice in tabela.indexes:
+                indice.create(db.engine, checkfirst=True)
+    os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'comprovantes'), exist_ok=True)
+
+
+def registrar_comandos(app):
+    """Registra os comandos `flask ...` da aplicação."""
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Cria tabelas, colunas, índices e pastas de upload que faltam (rodar a cada deploy, antes de subir os workers)."""
+        inicializar_banco(app)
+        click.echo(f"Banco inicializado e pasta de uploads pronta em {app.config['UPLOAD_FOLDER']}")
+
+    @app.cli.command('marcar-vencidas')
+    @click.option('--data', 'data_referencia', default=None,
+                  help='Data de referência no formato YYYY-MM-DD (padrão: hoje).')
+    def marcar_vencidas_command(data_referencia):
+        """Marca como 'vencida' as licenças e condicionantes com prazo expirado.
+
+        Pensado para rodar uma vez por dia (cron / Render Cron Job).
+        """
+        from src.services.vencimentos import marcar_vencidas
+
+        hoje = datetime.strptime(data_referencia, '%Y-%m-%d').date() if data_referencia else None
+        varredura = marcar_vencidas(hoje)
+
+        mensagem = (f"Varredura de {varredura.data_referencia.isoformat()}: "
+                    f"{varredura.licencas_vencidas} licença(s) e "
+                    f"{varredura.condicionantes_vencidas} condicionante(s) marcadas como vencidas; "
+                    f"{varredura.licencas_reabertas} licença(s) e "
+                    f"{varredura.condicionantes_reabertas} condicionante(s) reabertas")
+        app.logger.info(mensagem)
+        click.echo(mensagem)
+
+    @app.cli.command('importar-licencas')
+    @click.argument('arquivo', type=click.File('r', encoding='utf-8'))
+    @click.option('--lote', 'tamanho_lote', default=500, show_default=True,
+                  help='Quantidade de licenças gravadas por transação.')
+    def importar_licencas_command(arquivo, tamanho_lote):
+        """Importa licenças e condicionantes de um arquivo NDJSON (use '-' para stdin)."""
+        from src.services.importacao import importar_ndjson
+
+        resultado = importar_ndjson(arquivo, tamanho_lote=tamanho_lote)
+
+        click.echo(f"{resultado['licencas_importadas']} licença(s) e "
+                   f"{resultado['condicionantes_importadas']} condicionante(s) importadas "
+                   f"em {resultado['segundos']}s ({resultado['linhas_por_segundo']} linhas/s)")
+        if resultado['total_erros']:
+            click.echo(f"{resultado['total_erros']} linha(s) com erro:", err=True)
+            for erro in resultado['erros']:
+                click.echo(f"  linha {erro['linha']}: {erro['erro']}", err=True)
+
+    @app.cli.command('comprimir-estaticos')
+    def comprimir_estaticos_command():
+        """Gera variantes .gz/.br dos arquivos estáticos (rodar após o build do frontend)."""
+        from src.services.estaticos import gerar_variantes_comprimidas
+
+        geradas = gerar_variantes_comprimidas(app.static_folder)
+        click.echo(f"{len(geradas)} variante(s) comprimida(s) gerada(s) em {app.static_folder}")
+
+    @app.cli.command('limpar-comprovantes')
+    @click.option('--carencia-horas', default=24, show_default=True,
+                  help='Só remove arquivos modificados há mais tempo que isso.')
+    @click.option('--lote', 'tamanho_lote', default=1000, show_default=True,
+                  help='Arquivos verificados por consulta ao banco.')
+    @click.option('--quarentena', is_flag=True,
+                  help='Move os arquivos para uploads/quarentena em vez de apagar.')
+    @click.option('--simular', is_flag=True,
+                  help='Apenas lista a contagem e os bytes que seriam liberados.')
+    def limpar_comprovantes_command(carencia_horas, tamanho_lote, quarentena, simular):
+        """Remove comprovantes em disco que nenhuma condicionante referencia."""
+        from src.services.limpeza_comprovantes import coletar_comprovantes_orfaos
+
+        resultado = coletar_comprovantes_orfaos(
+            carencia_horas=carencia_horas, tamanho_lote=tamanho_lote,
+            quarentena=quarentena, simular=simular
+        )
+
+        acao = {'simulacao': 'seriam removido(s)', 'quarentena': 'movido(s) para a quarentena',
+                'remocao': 'removido(s)'}[resultado['modo']]
+        mensagem = (f"{resultado['arquivos_analisados']} arquivo(s) analisado(s), "
+                    f"{resultado['arquivos_removidos']} órfão(s) {acao}, "
+                    f"{resultado['bytes_recuperados']} byte(s) recuperado(s); "
+                    f"{resultado['ignorados_por_carencia']} ignorado(s) por estarem dentro da carência")
+        app.logger.info(mensagem)
+        click.echo(mensagem)
+
+    @app.cli.command('recalcular-prazos')
+    @click.option('--licenca-id', type=int, default=None, help='Restringe às condicionantes de uma licença.')
+    @click.option('--lote', 'tamanho_lote', default=5000, show_default=True,
+                  help='Condicionantes calculadas e gravadas por transação.')
+    def recalcular_prazos_command(licenca_id, tamanho_lote):
+        """Recalcula as datas limite dos prazos em dias (corridos ou úteis) a partir da emissão da licença."""
+        from src.services.prazos import recalcular_prazos
+
+        resultado = recalcular_prazos(licenca_id=licenca_id, tamanho_lote=tamanho_lote)
+        mensagem = (f"{resultado['analisadas']} condicionante(s) analisada(s), "
+                    f"{resultado['alteradas']} com data limite alterada")
+        app.logger.info(mensagem)
+        click.echo(mensagem)
@@ -3,20 +3,36 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
 from src.models.user import db
+from src.models.banco import BIND_REPLICA, opcoes_engine, configurar_replica
 from src.models.licenciamento import Empresa, Licenca, Condicionante, Notificacao
 from src.routes.user import user_bp
 from src.routes.empresas import empresas_bp
 from src.routes.licencas import licencas_bp
 from src.routes.condicionantes import condicionantes_bp
 from src.routes.calendar import calendar_bp
+from src.routes.importacao import importacao_bp
+from src.routes.exportacao import exportacao_bp
+from src.routes.uploads import uploads_bp
+from src.routes.metricas import metricas_bp
+from src.routes.perfis import perfis_bp
+from src.routes.agenda import agenda_bp
+from src.cli import registrar_comandos, inicializar_banco
+from src.services.estaticos import ManifestoEstatico
+from src.services.autenticacao import configurar_autenticacao
+from src.services.metricas import configurar_metricas
+from src.services.serializacao import ProvedorJSON
+from src.services.compressao import configurar_compressao
+from src.services.consultas_lentas import configurar_consultas_lentas
+from src.services.perfilador import configurar_perfilador
 
 def create_app(config_overrides=None):
     """Cria e configura uma instância da aplicação Flask."""
     app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
     app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT' # Mantenha ou substitua por uma chave segura
+    app.json = ProvedorJSON(app) # orjson nas respostas; datas dos to_dict() saem em ISO 8601
 
     # Configurações padrão
     # Prioriza a DATABASE_URL do ambiente, caso contrário usa a URL externa fornecida.
@@ -29,17 +45,46 @@ def create_app(config_overrides=None):
         # Por agora, se for 'postgres://' e não a interna completa, converte para 'postgresql://'
         database_url = database_url.replace('postgres://', 'postgresql://', 1)
 
+    # Réplica somente leitura (opcional): recebe as leituras das requisições GET
+    replica_url = os.environ.get('DATABASE_REPLICA_URL')
+    if replica_url and replica_url.startswith('postgres://'):
+        replica_url = replica_url.replace('postgres://', 'postgresql://', 1)
 
     app.config.from_mapping(
         SQLALCHEMY_DATABASE_URI=database_url,
         SQLALCHEMY_TRACK_MODIFICATIONS=False,
-        UPLOAD_FOLDER=os.path.join(os.path.dirname(__file__), 'uploads') # Pasta padrão para uploads
+        SQLALCHEMY_BINDS={BIND_REPLICA: replica_url} if replica_url else {},
+        DB_REPLICA_STICKY_SEGUNDOS=int(os.environ.get('DB_REPLICA_STICKY_SEGUNDOS', 5)), # Leituras no primário após uma escrita do cliente
+        UPLOAD_FOLDER=os.path.join(os.path.dirname(__file__), 'uploads'), # Pasta padrão para uploads
+        MAX_COMPROVANTE_BYTES=int(os.environ.get('MAX_COMPROVANTE_BYTES', 100 * 1024 * 1024)), # Limite por comprovante
+        USE_X_SENDFILE=os.environ.get('USE_X_SENDFILE', '').lower() in ('1', 'true'), # Delegar envio de arquivos ao proxy
+        PREVIEW_WORKERS=int(os.environ.get('PREVIEW_WORKERS', 2)), # Processos para gerar miniaturas (0 = na própria requisição)
+        PASSWORD_HASH_METHOD=os.environ.get('PASSWORD_HASH_METHOD', 'scrypt'), # Hashes com outros parâmetros são refeitos no login
+        PASSWORD_HASH_WORKERS=int(os.environ.get('PASSWORD_HASH_WORKERS', 2)), # Processos para hash de senha (0 = na própria requisição)
+        PASSWORD_HASH_FILA=int(os.environ.get('PASSWORD_HASH_FILA', 8)), # Verificações aguardando além das em execução; acima disso, 503
+        AUTH_OBRIGATORIA=os.environ.get('AUTH_OBRIGATORIA', '').lower() in ('1', 'true'), # Exige token Bearer nas rotas /api
+        AUTH_INTERVALO_VERSOES=int(os.environ.get('AUTH_INTERVALO_VERSOES', 30)), # Segundos entre leituras das versões de token (revogação)
+        METRICAS_LIMITE_N_MAIS_1=int(os.environ.get('METRICAS_LIMITE_N_MAIS_1', 10)), # Repetições do mesmo SQL numa requisição que geram alerta de N+1
+        COMPRESSAO_MINIMO_BYTES=int(os.environ.get('COMPRESSAO_MINIMO_BYTES', 1024)), # Respostas menores não são comprimidas
+        COMPRESSAO_CACHE_BYTES=int(os.environ.get('COMPRESSAO_CACHE_BYTES', 32 * 1024 * 1024)), # Corpos comprimidos guardados por ETag
+        CONSULTAS_LENTAS_MS=float(os.environ.get('CONSULTAS_LENTAS_MS', 500)), # Comandos SQL acima disso vão para o log de consultas lentas
+        CONSULTAS_LENTAS_ARQUIVO=os.environ.get('CONSULTAS_LENTAS_ARQUIVO', os.path.join(os.path.dirname(__file__), 'logs', 'consultas_lentas.log')),
+        CONSULTAS_LENTAS_AMOSTRA_EXPLAIN=float(os.environ.get('CONSULTAS_LENTAS_AMOSTRA_EXPLAIN', 0.1)), # Fração dos SELECTs lentos com EXPLAIN ANALYZE (PostgreSQL)
+        PERFIS_PASTA=os.environ.get('PERFIS_PASTA', os.path.join(os.path.dirname(__file__), 'perfis')), # Arquivos .prof das requisições com X-Profile: 1
+        PERFIS_MAXIMO_ARQUIVOS=int(os.environ.get('PERFIS_MAXIMO_ARQUIVOS', 50)) # Perfis mais antigos são apagados
     )
 
     # Sobrescreve com configurações específicas (para testes, por exemplo)
     if config_overrides:
         app.config.from_mapping(config_overrides)
 
+    # Pool de conexões (tamanho, pre-ping, reciclagem, statement timeout) conforme o banco final
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', opcoes_engine(app.config['SQLALCHEMY_DATABASE_URI'], os.environ))
+    binds = app.config['SQLALCHEMY_BINDS']
+    if isinstance(binds.get(BIND_REPLICA), str):
+        # Binds informados só pela URL não herdam SQLALCHEMY_ENGINE_OPTIONS
+        binds[BIND_REPLICA] = {'url': binds[BIND_REPLICA], **opcoes_engine(binds[BIND_REPLICA], os.environ)}
+
     # Habilita CORS para todas as rotas
     CORS(app)
 
@@ -49,49 +94,55 @@ def create_app(config_overrides=None):
     app.register_blueprint(licencas_bp, url_prefix='/api')
     app.register_blueprint(condicionantes_bp, url_prefix='/api')
     app.register_blueprint(calendar_bp, url_prefix='/api')
+    app.register_blueprint(importacao_bp, url_prefix='/api')
+    app.register_blueprint(exportacao_bp, url_prefix='/api')
+    app.register_blueprint(uploads_bp, url_prefix='/api')
+    app.register_blueprint(metricas_bp, url_prefix='/api')
+    app.register_blueprint(perfis_bp, url_prefix='/api')
+    app.register_blueprint(agenda_bp, url_prefix='/api')
+
+    # Registra comandos de linha de comando (flask ...)
+    registrar_comandos(app)
+
+    # Latência, tamanho de resposta e SQL por rota (antes da autenticação, para contar também os 401)
+    configurar_metricas(app)
+
+    # gzip/brotli nas respostas grandes (registrada depois das métricas, roda antes delas:
+    # o histograma de tamanho registra os bytes efetivamente enviados)
+    configurar_compressao(app)
+
+    # Log rotativo dos comandos SQL lentos (resumo em /api/metrics/consultas-lentas)
+    configurar_consultas_lentas(app)
+
+    # Verificação do token JWT antes de cada requisição
+    configurar_autenticacao(app)
+
+    # cProfile sob demanda (X-Profile: 1) para administradores; depende de g.usuario
+    configurar_perfilador(app)
 
     # Inicializa o banco de dados
     db.init_app(app)
-    with app.app_context():
-        db.create_all()
-        # Cria a pasta de uploads se não existir
-        if not os.path.exists(app.config['UPLOAD_FOLDER']):
-            os.makedirs(app.config['UPLOAD_FOLDER'])
-
-        comprovantes_folder = os.path.join(app.config['UPLOAD_FOLDER'], 'comprovantes')
-        if not os.path.exists(comprovantes_folder):
-            os.makedirs(comprovantes_folder)
+    configurar_replica(app)
+    # O esquema do banco e as pastas de upload são criados por `flask init-db`, não aqui:
+    # create_app roda na inicialização de cada worker e não deve fazer DDL nem acessar o banco.
 
+    # Índice dos arquivos estáticos montado uma única vez (recarregado sob demanda em debug)
+    manifesto_estatico = ManifestoEstatico(app.static_folder, recarregar_se_ausente=app.debug)
 
     @app.route('/', defaults={'path': ''})
     @app.route('/<path:path>')
     def serve(path):
-        static_folder_path = app.static_folder
-        if static_folder_path is None:
+        if app.static_folder is None:
                 return "Static folder not configured", 404
 
-        if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-            return send_from_directory(static_folder_path, path)
-        else:
-            index_path = os.path.join(static_folder_path, 'index.html')
-            if os.path.exists(index_path):
-                return send_from_directory(static_folder_path, 'index.html')
-            else:
-                return "index.html not found", 404
+        return manifesto_estatico.servir(path)
 
     return app
 
 app = create_app()
 
 if __name__ == '__main__':
-    # Garante que a pasta de uploads principal e a de comprovantes existem ao rodar diretamente
-    # Embora já seja feito no create_app, é uma garantia extra ao rodar `python src/main.py`
-    upload_dir = app.config.get('UPLOAD_FOLDER', os.path.join(os.path.dirname(__file__), 'uploads'))
-    if not os.path.exists(upload_dir):
-        os.makedirs(upload_dir)
-
-    comprovantes_dir = os.path.join(upload_dir, 'comprovantes')
-    if not os.path.exists(comprovantes_dir):
-        os.makedirs(comprovantes_dir)
+    # Ao rodar direto (desenvolvimento), prepara o banco e as pastas como `flask init-db`
+    inicializar_banco(app)
 
     app.run(host='0.0.0.0', port=5001, debug=True)
@@ -0,0 +1,91 @@
+import time
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+BIND_REPLICA = 'replica'
+COOKIE_PRIMARIO = 'ler_primario_ate'
+METODOS_LEITURA = ('GET', 'HEAD')
+STICKY_PADRAO_SEGUNDOS = 5
+
+
+def opcoes_engine(database_url, ambiente):
+    """
+    Monta SQLALCHEMY_ENGINE_OPTIONS a partir das variáveis de ambiente.
+
+    `pool_pre_ping` e `pool_recycle` evitam erros com conexões derrubadas pelo servidor
+    depois de um tempo ociosas. As opções de pool não se aplicam ao SQLite.
+    """
+    opcoes = {'pool_pre_ping': ambiente.get('DB_POOL_PRE_PING', '1').lower() in ('1', 'true')}
+    if database_url.startswith('sqlite'):
+        return opcoes
+
+    opcoes.update(
+        pool_size=int(ambiente.get('DB_POOL_SIZE', 5)),
+        max_overflow=int(ambiente.get('DB_MAX_OVERFLOW', 10)),
+        pool_timeout=int(ambiente.get('DB_POOL_TIMEOUT', 30)),
+        pool_recycle=int(ambiente.get('DB_POOL_RECYCLE', 1800))
+    )
+    timeout_ms = int(ambiente.get('DB_STATEMENT_TIMEOUT_MS', 0))
+    if timeout_ms and database_url.startswith('postgresql'):
+        opcoes['connect_args'] = {'options': f'-c statement_timeout={timeout_ms}'}
+    return opcoes
+
+
+class SessaoRoteada(Session):
+    """
+    Sessão que envia as leituras de requisições GET/HEAD para a réplica (bind 'replica'),
+    quando configurada. Escritas, requisições que alteram dados e clientes que acabaram
+    de gravar algo (cookie de leitura no primário) usam sempre o banco principal.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and BIND_REPLICA in self._db.engines and self._pode_usar_replica():
+            return self._db.engines[BIND_REPLICA]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _pode_usar_replica(self):
+        if self._flushing or not has_request_context() or request.method not in METODOS_LEITURA:
+            return False
+        try:
+            return float(request.cookies.get(COOKIE_PRIMARIO, 0)) <= time.time()
+        except ValueError:
+            return True
+
+
+def _marcar_escrita(sessao, *args):
+    if has_request_context():
+        g._escrita_pendente = True
+
+
+def _verificar_escrita(estado):
+    if estado.is_insert or estado.is_update or estado.is_delete:
+        _marcar_escrita(estado.session)
+
+
+def _apos_commit(sessao):
+    if has_request_context() and g.pop('_escrita_pendente', False):
+        g._gravou_nesta_requisicao = True
+
+
+def _definir_cookie_primario(resposta):
+    if g.pop('_gravou_nesta_requisicao', False):
+        segundos = current_app.config.get('DB_REPLICA_STICKY_SEGUNDOS', STICKY_PADRAO_SEGUNDOS)
+        resposta.set_cookie(COOKIE_PRIMARIO, str(int(time.time()) + segundos), max_age=segundos,
+                            httponly=True, samesite='Lax')
+    return resposta
+
+
+def configurar_replica(app):
+    """
+    Ativa a leitura-após-escrita: depois de um commit que gravou dados, o cliente recebe
+    um cookie que mantém suas leituras no primário por DB_REPLICA_STICKY_SEGUNDOS,
+    tempo suficiente para a réplica alcançar o que acabou de ser gravado.
+    """
+    if BIND_REPLICA not in app.config.get('SQLALCHEMY_BINDS', {}):
+        return
+    for nome, funcao in (('after_flush', _marcar_escrita), ('do_orm_execute', _verificar_escrita),
+                         ('after_commit', _apos_commit)):
+        if not event.contains(SessaoRoteada, nome, funcao):
+            event.listen(SessaoRoteada, nome, funcao)
+    app.after_request(_definir_cookie_primario)
@@ -0,0 +1,66 @@
+from sqlalchemy import Date
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+
+class somar_dias(FunctionElement):
+    """
+    Expressão SQL `data + N dias` portável entre PostgreSQL e SQLite.
+
+    Uso: somar_dias(data, Condicionante.prazo_dias)
+    """
+    type = Date()
+    inherit_cache = True
+    name = 'somar_dias'
+
+
+@compiles(somar_dias)
+def _somar_dias_padrao(element, compiler, **kw):
+    data, dias = list(element.clauses)
+    return f"(CAST({compiler.process(data, **kw)} AS DATE) + {compiler.process(dias, **kw)})"
+
+
+@compiles(somar_dias, 'sqlite')
+def _somar_dias_sqlite(element, compiler, **kw):
+    data, dias = list(element.clauses)
+    return f"date({compiler.process(data, **kw)}, '+' || {compiler.process(dias, **kw)} || ' days')"
+
+
+class inicio_semana(FunctionElement):
+    """
+    Segunda-feira da semana da data (como `date_trunc('week', data)` do PostgreSQL).
+
+    Uso: db.select(inicio_semana(Licenca.data_vencimento), db.func.count()).group_by(...)
+    """
+    type = Date()
+    inherit_cache = True
+    name = 'inicio_semana'
+
+
+@compiles(inicio_semana)
+def _inicio_semana_padrao(element, compiler, **kw):
+    return f"CAST(date_trunc('week', {compiler.process(element.clauses, **kw)}) AS DATE)"
+
+
+@compiles(inicio_semana, 'sqlite')
+def _inicio_semana_sqlite(element, compiler, **kw):
+    data = compiler.process(element.clauses, **kw)
+    # %w: 0 = domingo; recua até a segunda-feira
+    return f"date({data}, '-' || ((CAST(strftime('%w', {data}) AS INTEGER) + 6) % 7) || ' days')"
+
+
+class inicio_mes(FunctionElement):
+    """Primeiro dia do mês da data (como `date_trunc('month', data)` do PostgreSQL)."""
+    type = Date()
+    inherit_cache = True
+    name = 'inicio_mes'
+
+
+@compiles(inicio_mes)
+def _inicio_mes_padrao(element, compiler, **kw):
+    return f"CAST(date_trunc('month', {compiler.process(element.clauses, **kw)}) AS DATE)"
+
+
+@compiles(inicio_mes, 'sqlite')
+def _inicio_mes_sqlite(element, compiler, **kw):
+    return f"date({compiler.process(element.clauses, **kw)}, 'start of month')"
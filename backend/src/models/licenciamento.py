@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime, timedelta
+from datetime import datetime
 from src.models.user import db
+from src.services.dias_uteis import CONTAGEM_CORRIDOS, calcular_data_limite
 
 class Empresa(db.Model):
     __tablename__ = 'empresas'
@@ -12,7 +13,7 @@ class Empresa(db.Model):
     email = db.Column(db.String(120))
     endereco = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)  # Validador HTTP das listagens (ETag)
     
     # Relacionamento com licenças
     licencas = db.relationship('Licenca', backref='empresa', lazy=True, cascade='all, delete-orphan')
@@ -28,8 +29,8 @@ class Empresa(db.Model):
             'telefone': self.telefone,
             'email': self.email,
             'endereco': self.endereco,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
 
 class Licenca(db.Model):
@@ -41,11 +42,11 @@ class Licenca(db.Model):
     numero_licenca = db.Column(db.String(50))
     orgao_emissor = db.Column(db.String(100), default='IMA/AL')
     data_emissao = db.Column(db.Date)
-    data_vencimento = db.Column(db.Date, nullable=False)
-    status = db.Column(db.String(20), default='ativa')  # ativa, vencida, cancelada
+    data_vencimento = db.Column(db.Date, nullable=False, index=True)
+    status = db.Column(db.String(20), default='ativa', index=True)  # ativa, vencida, cancelada
     observacoes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)  # Validador HTTP das listagens (ETag)
     
     # Relacionamento com condicionantes
     condicionantes = db.relationship('Condicionante', backref='licenca', lazy=True, cascade='all, delete-orphan')
@@ -67,13 +68,13 @@ class Licenca(db.Model):
             'tipo_licenca': self.tipo_licenca,
             'numero_licenca': self.numero_licenca,
             'orgao_emissor': self.orgao_emissor,
-            'data_emissao': self.data_emissao.isoformat() if self.data_emissao else None,
-            'data_vencimento': self.data_vencimento.isoformat() if self.data_vencimento else None,
+            'data_emissao': self.data_emissao,
+            'data_vencimento': self.data_vencimento,
             'status': self.status,
             'observacoes': self.observacoes,
             'dias_para_vencimento': self.dias_para_vencimento(),
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
 
 class Condicionante(db.Model):
@@ -83,14 +84,16 @@ class Condicionante(db.Model):
     licenca_id = db.Column(db.Integer, db.ForeignKey('licencas.id'), nullable=False)
     descricao = db.Column(db.Text, nullable=False)
     prazo_dias = db.Column(db.Integer)  # Prazo em dias (ex: 120, 30, etc.)
-    data_limite = db.Column(db.Date)  # Data limite calculada
-    status = db.Column(db.String(20), default='pendente')  # pendente, cumprida, vencida
+    tipo_contagem = db.Column(db.String(20), nullable=False, default=CONTAGEM_CORRIDOS,
+                              server_default=CONTAGEM_CORRIDOS)  # corridos, corridos_dia_util, uteis
+    data_limite = db.Column(db.Date, index=True)  # Data limite calculada
+    status = db.Column(db.String(20), default='pendente', index=True)  # pendente, cumprida, vencida
     responsavel = db.Column(db.String(100))
     observacoes = db.Column(db.Text)
     data_envio_cumprimento = db.Column(db.Date) # Nova coluna para data de envio/cumprimento
     comprovante_path = db.Column(db.String(255)) # Nova coluna para caminho do arquivo de comprovante
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)  # Validador HTTP das listagens (ETag)
     
     # Relacionamento com notificações
     notificacoes = db.relationship('Notificacao', backref='condicionante', lazy=True, cascade='all, delete-orphan')
@@ -106,10 +109,10 @@ class Condicionante(db.Model):
         return None
     
     def calcular_data_limite(self, data_base=None):
-        """Calcula a data limite baseada no prazo em dias"""
+        """Calcula a data limite baseada no prazo em dias (corridos ou úteis, conforme tipo_contagem)"""
         if self.prazo_dias:
             base = data_base or datetime.now().date()
-            self.data_limite = base + timedelta(days=self.prazo_dias)
+            self.data_limite = calcular_data_limite(base, self.prazo_dias, self.tipo_contagem or CONTAGEM_CORRIDOS)
     
     def to_dict(self):
         return {
@@ -117,15 +120,16 @@ class Condicionante(db.Model):
             'licenca_id': self.licenca_id,
             'descricao': self.descricao,
             'prazo_dias': self.prazo_dias,
-            'data_limite': self.data_limite.isoformat() if self.data_limite else None,
+            'tipo_contagem': self.tipo_contagem,
+            'data_limite': self.data_limite,
             'status': self.status,
             'responsavel': self.responsavel,
             'observacoes': self.observacoes,
-            'data_envio_cumprimento': self.data_envio_cumprimento.isoformat() if self.data_envio_cumprimento else None,
+            'data_envio_cumprimento': self.data_envio_cumprimento,
             'comprovante_path': self.comprovante_path,
             'dias_para_vencimento': self.dias_para_vencimento(),
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
 
 class Notificacao(db.Model):
@@ -148,10 +152,95 @@ class Notificacao(db.Model):
             'id': self.id,
             'condicionante_id': self.condicionante_id,
             'tipo': self.tipo,
-            'data_envio': self.data_envio.isoformat() if self.data_envio else None,
+            'data_envio': self.data_envio,
             'status': self.status,
             'google_event_id': self.google_event_id,
             'mensagem': self.mensagem,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
+        }
+
+
+class VarreduraVencimento(db.Model):
+    """Registro de cada execução da varredura diária que marca itens como 'vencida'"""
+    __tablename__ = 'varreduras_vencimento'
+
+    id = db.Column(db.Integer, primary_key=True)
+    data_referencia = db.Column(db.Date, nullable=False)
+    licencas_vencidas = db.Column(db.Integer, nullable=False, default=0)
+    condicionantes_vencidas = db.Column(db.Integer, nullable=False, default=0)
+    # Itens 'vencida' cuja data voltou para o futuro (prazo prorrogado) e foram reabertos
+    licencas_reabertas = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    condicionantes_reabertas = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    executada_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<VarreduraVencimento {self.data_referencia}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'data_referencia': self.data_referencia,
+            'licencas_vencidas': self.licencas_vencidas,
+            'condicionantes_vencidas': self.condicionantes_vencidas,
+            'licencas_reabertas': self.licencas_reabertas,
+            'condicionantes_reabertas': self.condicionantes_reabertas,
+            'executada_em': self.executada_em
+        }
+
+class Comprovante(db.Model):
+    """Arquivo de comprovante armazenado pelo seu SHA-256 (conteúdo idêntico é gravado uma única vez)"""
+    __tablename__ = 'comprovantes'
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    caminho = db.Column(db.String(255), unique=True, nullable=False)  # Relativo a UPLOAD_FOLDER
+    tamanho = db.Column(db.BigInteger, nullable=False)
+    extensao = db.Column(db.String(10))
+    referencias = db.Column(db.Integer, nullable=False, default=0)  # Condicionantes que apontam para este arquivo
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Comprovante {self.sha256[:12]} ({self.referencias} refs)>'
+
+    def to_dict(self):
+        return {
+            'sha256': self.sha256,
+            'caminho': self.caminho,
+            'tamanho': self.tamanho,
+            'extensao': self.extensao,
+            'referencias': self.referencias,
+            'created_at': self.created_at
         }
 
+class UploadComprovante(db.Model):
+    """Sessão de upload de comprovante enviado em partes (retomável)"""
+    __tablename__ = 'uploads_comprovantes'
+
+    id = db.Column(db.String(32), primary_key=True)  # UUID em hexadecimal
+    condicionante_id = db.Column(db.Integer, db.ForeignKey('condicionantes.id', ondelete='SET NULL'))
+    nome_arquivo = db.Column(db.String(255), nullable=False)
+    tamanho_total = db.Column(db.BigInteger, nullable=False)
+    recebidos = db.Column(db.BigInteger, nullable=False, default=0)  # Bytes já gravados em disco
+    status = db.Column(db.String(20), default='em_andamento')  # em_andamento, concluido
+    sha256 = db.Column(db.String(64))
+    deduplicado = db.Column(db.Boolean, default=False)  # Conteúdo já existia; a cópia recebida foi descartada
+    comprovante_path = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UploadComprovante {self.id} - {self.nome_arquivo}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'condicionante_id': self.condicionante_id,
+            'nome_arquivo': self.nome_arquivo,
+            'tamanho_total': self.tamanho_total,
+            'recebidos': self.recebidos,
+            'status': self.status,
+            'sha256': self.sha256,
+            'deduplicado': self.deduplicado,
+            'comprovante_path': self.comprovante_path,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
@@ -1,7 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
+from src.models.banco import SessaoRoteada
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': SessaoRoteada})
 
 class User(db.Model):
     __tablename__ = 'users' # Definindo explicitamente o nome da tabela
@@ -31,3 +32,16 @@ class User(db.Model):
             'role': self.role
             # Não incluir password_hash no to_dict por segurança
         }
+
+
+class VersaoToken(db.Model):
+    """
+    Versão atual dos tokens de um usuário. Tokens emitidos com versão menor são
+    recusados; incrementar a versão revoga todos os tokens já emitidos (ex.: troca de papel).
+
+    Fica numa tabela própria para não exigir ALTER TABLE em `users` (criada por create_all).
+    """
+    __tablename__ = 'versoes_token'
+
+    usuario_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,33 @@
+from flask import Blueprint, request, jsonify
+from src.models.user import db
+from src.models.licenciamento import Empresa, Licenca, Condicionante
+from src.services.agenda import GRANULARIDADES, HORIZONTE_PADRAO, HORIZONTE_MAXIMO, linha_do_tempo
+from src.services.cache_http import ValidadorColecao
+
+agenda_bp = Blueprint('agenda', __name__)
+
+@agenda_bp.route('/agenda/timeline', methods=['GET'])
+def timeline():
+    """Vencimentos de licenças e condicionantes por semana ou mês, por empresa e status"""
+    try:
+        granularidade = request.args.get('granularidade', 'semana')
+        horizonte = request.args.get('horizonte', HORIZONTE_PADRAO, type=int)
+        if granularidade not in GRANULARIDADES:
+            return jsonify({'erro': f"granularidade deve ser uma de: {', '.join(GRANULARIDADES)}"}), 400
+        if not 1 <= horizonte <= HORIZONTE_MAXIMO:
+            return jsonify({'erro': f'horizonte deve estar entre 1 e {HORIZONTE_MAXIMO} dias'}), 400
+
+        # Os parâmetros entram no ETag: com os mesmos dados, cada agrupamento tem a sua resposta
+        validador = ValidadorColecao(tuple(db.session.execute(db.select(*(
+            db.select(funcao).scalar_subquery() for funcao in (
+                db.func.count(Licenca.id), db.func.max(Licenca.updated_at),
+                db.func.count(Condicionante.id), db.func.max(Condicionante.updated_at),
+                db.func.max(Empresa.updated_at)
+            )
+        ))).one()) + (granularidade, horizonte))
+        if validador.nao_modificado():
+            return validador.resposta_nao_modificado()
+
+        return validador.aplicar(jsonify(linha_do_tempo(granularidade, horizonte))), 200
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
@@ -207,7 +207,7 @@ def status_sincronizacao():
             'ultimas_sincronizacoes': [
                 {
                     'condicionante_id': n.condicionante_id,
-                    'data_envio': n.data_envio.isoformat() if n.data_envio else None,
+                    'data_envio': n.data_envio,
                     'event_id': n.google_event_id,
                     'mensagem': n.mensagem
                 }
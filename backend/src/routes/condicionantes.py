@@ -1,6 +1,12 @@
 from flask import Blueprint, request, jsonify, current_app
 from src.models.user import db
-from src.models.licenciamento import Licenca, Condicionante, Notificacao
+from src.models.licenciamento import Empresa, Licenca, Condicionante, Notificacao, VarreduraVencimento
+from sqlalchemy.orm import joinedload
+from src.services.vencimentos import reabrir_se_no_prazo, ultima_varredura
+from src.services.comprovantes import desvincular_comprovante, liberar_comprovantes, enviar_comprovante
+from src.services.previews import TAMANHOS_PREVIEW, agendar_previews, caminho_preview, preview_falhou, preview_suportado
+from src.services.cache_http import ValidadorColecao
+from src.services.dias_uteis import TIPOS_CONTAGEM, CONTAGEM_CORRIDOS, PRAZO_MAXIMO_DIAS, prazo_valido
 from datetime import datetime, date, timedelta
 import os
 from werkzeug.utils import secure_filename
@@ -9,11 +15,37 @@ condicionantes_bp = Blueprint('condicionantes', __name__)
 
 UPLOAD_FOLDER = 'uploads/comprovantes'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf'}
+ERRO_TIPO_CONTAGEM = f"Tipo de contagem inválido. Use {', '.join(TIPOS_CONTAGEM)}"
+ERRO_PRAZO_DIAS = f'prazo_dias deve ser um número inteiro de dias entre 0 e {PRAZO_MAXIMO_DIAS}'
+
+# Condicionantes ainda não cumpridas; 'vencida' é atribuído pela varredura diária
+STATUS_EM_ABERTO = ('pendente', 'vencida')
 
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def campos_transicao_status(status):
+    """Retorna os campos alterados ao mover uma condicionante para 'cumprida' ou 'pendente'.
+
+    Usado tanto pelas rotas individuais quanto pela transição em lote, para que
+    ambas apliquem exatamente as mesmas mudanças.
+    """
+    if status == 'cumprida':
+        data_envio = date.today()
+    elif status == 'pendente':
+        data_envio = None
+    else:
+        raise ValueError(f"Transição de status não suportada: {status}")
+
+    return {
+        'status': status,
+        'data_envio_cumprimento': data_envio,
+        'observacoes': None, # Limpa observações de cumprimento anterior
+        'comprovante_path': None, # Limpa comprovante anterior
+        'updated_at': datetime.utcnow()
+    }
+
 @condicionantes_bp.route('/condicionantes', methods=['GET'])
 def listar_condicionantes():
     """Lista todas as condicionantes"""
@@ -22,14 +54,26 @@ def listar_condicionantes():
         licenca_id = request.args.get('licenca_id', type=int)
         status = request.args.get('status')
         
-        query = Condicionante.query
-        
+        filtros = []
         if licenca_id:
-            query = query.filter_by(licenca_id=licenca_id)
+            filtros.append(Condicionante.licenca_id == licenca_id)
         if status:
-            query = query.filter_by(status=status)
-        
-        condicionantes = query.all()
+            filtros.append(Condicionante.status == status)
+
+        # A resposta inclui licença e empresa de cada condicionante: alterações nelas também mudam o ETag
+        validador = ValidadorColecao.consultar(
+            db.select(db.func.count(Condicionante.id), db.func.max(Condicionante.updated_at),
+                      db.func.max(Licenca.updated_at), db.func.max(Empresa.updated_at))
+            .join(Licenca, Condicionante.licenca_id == Licenca.id).join(Empresa, Licenca.empresa_id == Empresa.id)
+            .where(*filtros)
+        )
+        if validador.nao_modificado():
+            return validador.resposta_nao_modificado()
+
+        # Licença e empresa carregadas no mesmo SELECT (evita uma consulta por condicionante)
+        condicionantes = Condicionante.query.options(
+            joinedload(Condicionante.licenca).joinedload(Licenca.empresa)
+        ).filter(*filtros).all()
         resultado = []
         
         for condicionante in condicionantes:
@@ -39,7 +83,7 @@ def listar_condicionantes():
             condicionante_dict['empresa'] = condicionante.licenca.empresa.to_dict()
             resultado.append(condicionante_dict)
         
-        return jsonify(resultado), 200
+        return validador.aplicar(jsonify(resultado)), 200
     except Exception as e:
         return jsonify({'erro': str(e)}), 500
 
@@ -54,6 +98,11 @@ def criar_condicionante():
             return jsonify({'erro': 'ID da licença é obrigatório'}), 400
         if not dados.get('descricao'):
             return jsonify({'erro': 'Descrição é obrigatória'}), 400
+        tipo_contagem = dados.get('tipo_contagem') or CONTAGEM_CORRIDOS
+        if tipo_contagem not in TIPOS_CONTAGEM:
+            return jsonify({'erro': ERRO_TIPO_CONTAGEM}), 400
+        if not prazo_valido(dados.get('prazo_dias')):
+            return jsonify({'erro': ERRO_PRAZO_DIAS}), 400
         
         # Verifica se a licença existe
         licenca = Licenca.query.get(dados['licenca_id'])
@@ -65,6 +114,7 @@ def criar_condicionante():
             licenca_id=dados['licenca_id'],
             descricao=dados['descricao'],
             prazo_dias=dados.get('prazo_dias'),
+            tipo_contagem=tipo_contagem,
             responsavel=dados.get('responsavel'),
             observacoes=dados.get('observacoes'),
             status=dados.get('status', 'pendente')
@@ -99,6 +149,45 @@ def obter_condicionante(condicionante_id):
     except Exception as e:
         return jsonify({'erro': str(e)}), 500
 
+@condicionantes_bp.route('/condicionantes/<int:condicionante_id>/comprovante', methods=['GET'])
+def baixar_comprovante(condicionante_id):
+    """Baixa o comprovante da condicionante (com suporte a ETag e Range)"""
+    condicionante = Condicionante.query.get_or_404(condicionante_id)
+    if not condicionante.comprovante_path:
+        return jsonify({'erro': 'Condicionante sem comprovante'}), 404
+
+    resposta = enviar_comprovante(condicionante.comprovante_path)
+    if resposta is None:
+        current_app.logger.error(f"Comprovante da condicionante {condicionante_id} não encontrado em disco: {condicionante.comprovante_path}")
+        return jsonify({'erro': 'Arquivo do comprovante não encontrado'}), 404
+    return resposta
+
+@condicionantes_bp.route('/condicionantes/<int:condicionante_id>/comprovante/preview', methods=['GET'])
+def preview_comprovante(condicionante_id):
+    """Retorna a miniatura (`tamanho=thumb`) ou a prévia (`tamanho=preview`) do comprovante"""
+    tamanho = request.args.get('tamanho', 'thumb')
+    if tamanho not in TAMANHOS_PREVIEW:
+        return jsonify({'erro': f"Tamanho inválido. Use: {', '.join(TAMANHOS_PREVIEW)}"}), 400
+
+    condicionante = Condicionante.query.get_or_404(condicionante_id)
+    if not condicionante.comprovante_path:
+        return jsonify({'erro': 'Condicionante sem comprovante'}), 404
+    if not preview_suportado(condicionante.comprovante_path):
+        return jsonify({'erro': 'Tipo de comprovante sem pré-visualização'}), 404
+
+    resposta = enviar_comprovante(caminho_preview(condicionante.comprovante_path, tamanho))
+    if resposta is None:
+        # Ainda não gerada (ou gerada antes desta funcionalidade): agenda e pede nova tentativa,
+        # a menos que uma geração anterior tenha falhado (não adianta reenfileirar)
+        if not preview_falhou(condicionante.comprovante_path):
+            agendar_previews(condicionante.comprovante_path)
+        if preview_falhou(condicionante.comprovante_path):
+            return jsonify({'erro': 'Não foi possível gerar a pré-visualização deste comprovante'}), 415
+        resposta = jsonify({'status': 'processando'})
+        resposta.status_code = 202
+        resposta.headers['Retry-After'] = '2'
+    return resposta
+
 @condicionantes_bp.route('/condicionantes/<int:condicionante_id>', methods=['PUT'])
 def atualizar_condicionante(condicionante_id):
     """Atualiza uma condicionante"""
@@ -109,14 +198,23 @@ def atualizar_condicionante(condicionante_id):
         # Atualiza campos se fornecidos
         if 'descricao' in dados:
             condicionante.descricao = dados['descricao']
-        if 'prazo_dias' in dados:
-            condicionante.prazo_dias = dados['prazo_dias']
-            # Recalcula data limite se prazo mudou
+        if 'tipo_contagem' in dados:
+            if dados['tipo_contagem'] not in TIPOS_CONTAGEM:
+                return jsonify({'erro': ERRO_TIPO_CONTAGEM}), 400
+            condicionante.tipo_contagem = dados['tipo_contagem']
+        if 'prazo_dias' in dados and not prazo_valido(dados['prazo_dias']):
+            return jsonify({'erro': ERRO_PRAZO_DIAS}), 400
+        if 'prazo_dias' in dados or 'tipo_contagem' in dados:
+            if 'prazo_dias' in dados:
+                condicionante.prazo_dias = dados['prazo_dias']
+            # Recalcula data limite se o prazo ou a forma de contagem mudou
             if condicionante.prazo_dias:
                 data_base = condicionante.licenca.data_emissao or date.today()
                 condicionante.calcular_data_limite(data_base)
         if 'data_limite' in dados:
             condicionante.data_limite = datetime.strptime(dados['data_limite'], '%Y-%m-%d').date()
+        # Prazo prorrogado (novo prazo, contagem ou data limite): 'vencida' volta a 'pendente'
+        reabrir_se_no_prazo(condicionante, condicionante.data_limite)
         if 'status' in dados:
             condicionante.status = dados['status']
         if 'responsavel' in dados:
@@ -145,6 +243,7 @@ def deletar_condicionante(condicionante_id):
     try:
         condicionante = Condicionante.query.get_or_404(condicionante_id)
         
+        desvincular_comprovante(condicionante)
         db.session.delete(condicionante)
         db.session.commit()
         
@@ -159,10 +258,12 @@ def condicionantes_por_vencer():
     try:
         dias_limite = request.args.get('dias', default=30, type=int)
         
-        # Busca condicionantes que vencem nos próximos X dias
-        condicionantes = Condicionante.query.filter(
+        # Busca condicionantes que vencem nos próximos X dias (incluindo as já vencidas)
+        condicionantes = Condicionante.query.options(
+            joinedload(Condicionante.licenca).joinedload(Licenca.empresa)
+        ).filter(
             Condicionante.data_limite <= date.today() + timedelta(days=dias_limite),
-            Condicionante.status == 'pendente'
+            Condicionante.status.in_(STATUS_EM_ABERTO)
         ).order_by(Condicionante.data_limite).all()
         
         resultado = []
@@ -182,12 +283,10 @@ def marcar_condicionante_cumprida_rapido(condicionante_id):
     try:
         condicionante = Condicionante.query.get_or_404(condicionante_id)
         
-        condicionante.status = 'cumprida'
-        condicionante.data_envio_cumprimento = date.today()
-        condicionante.observacoes = None # Limpa observações de cumprimento anterior
-        condicionante.comprovante_path = None # Limpa comprovante anterior
+        desvincular_comprovante(condicionante)
+        for campo, valor in campos_transicao_status('cumprida').items():
+            setattr(condicionante, campo, valor)
 
-        condicionante.updated_at = datetime.utcnow()
         db.session.commit()
 
         return jsonify(condicionante.to_dict()), 200
@@ -202,12 +301,10 @@ def marcar_condicionante_pendente(condicionante_id):
     try:
         condicionante = Condicionante.query.get_or_404(condicionante_id)
 
-        condicionante.status = 'pendente'
-        condicionante.data_envio_cumprimento = None
-        condicionante.observacoes = None # Limpa observações de cumprimento anterior
-        condicionante.comprovante_path = None # Limpa comprovante anterior
+        desvincular_comprovante(condicionante)
+        for campo, valor in campos_transicao_status('pendente').items():
+            setattr(condicionante, campo, valor)
 
-        condicionante.updated_at = datetime.utcnow()
         db.session.commit()
         
         return jsonify(condicionante.to_dict()), 200
@@ -216,40 +313,114 @@ def marcar_condicionante_pendente(condicionante_id):
         current_app.logger.error(f"Erro ao marcar condicionante como pendente: {str(e)}")
         return jsonify({'erro': str(e)}), 500
 
+@condicionantes_bp.route('/condicionantes/bulk-status', methods=['POST'])
+def alterar_status_em_lote():
+    """Marca várias condicionantes como cumpridas ou pendentes com um único UPDATE.
+
+    Aceita uma lista de IDs (`ids`) ou um filtro (`filtro` com `licenca_id` e/ou `status`).
+    As linhas afetadas são devolvidas diretamente via RETURNING, sem recarregá-las.
+    """
+    try:
+        dados = request.get_json(silent=True) or {}
+        if not isinstance(dados, dict):
+            return jsonify({'erro': 'O corpo deve ser um objeto JSON'}), 400
+
+        novo_status = dados.get('status')
+        if novo_status not in ('cumprida', 'pendente'):
+            return jsonify({'erro': "Status deve ser 'cumprida' ou 'pendente'"}), 400
+
+        criterios = []
+        ids = dados.get('ids')
+        filtro = dados.get('filtro') or {}
+        if not isinstance(filtro, dict):
+            return jsonify({'erro': 'filtro deve ser um objeto com licenca_id e/ou status'}), 400
+        licenca_id = filtro.get('licenca_id')
+        if licenca_id is not None and (not isinstance(licenca_id, int) or isinstance(licenca_id, bool)):
+            return jsonify({'erro': 'filtro.licenca_id deve ser um inteiro'}), 400
+        if filtro.get('status') is not None and not isinstance(filtro['status'], str):
+            return jsonify({'erro': 'filtro.status deve ser um texto'}), 400
+
+        if ids is not None:
+            # bool é subclasse de int: true/false não são IDs
+            if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+                return jsonify({'erro': 'ids deve ser uma lista de inteiros'}), 400
+            if not ids:
+                return jsonify({'atualizadas': 0, 'condicionantes': []}), 200
+            criterios.append(Condicionante.id.in_(ids))
+        if filtro.get('licenca_id'):
+            criterios.append(Condicionante.licenca_id == filtro['licenca_id'])
+        if filtro.get('status'):
+            criterios.append(Condicionante.status == filtro['status'])
+
+        # Sem critério algum o UPDATE atingiria a tabela inteira
+        if not criterios:
+            return jsonify({'erro': 'Informe ids ou um filtro (licenca_id e/ou status)'}), 400
+
+        liberar_comprovantes(*criterios)
+        stmt = (
+            db.update(Condicionante)
+            .where(*criterios)
+            .values(**campos_transicao_status(novo_status))
+            .returning(Condicionante)
+        )
+        condicionantes = db.session.execute(stmt).scalars().all()
+        db.session.commit()
+
+        return jsonify({
+            'atualizadas': len(condicionantes),
+            'condicionantes': [c.to_dict() for c in condicionantes]
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Erro ao alterar status de condicionantes em lote: {str(e)}")
+        return jsonify({'erro': str(e)}), 500
+
 @condicionantes_bp.route('/dashboard/resumo', methods=['GET'])
 def dashboard_resumo():
     """Retorna resumo para o dashboard"""
     try:
         hoje = date.today()
+
+        # Validador de todas as tabelas do resumo num único SELECT de subconsultas escalares
+        validador = ValidadorColecao.consultar(db.select(*(
+            db.select(funcao).scalar_subquery() for funcao in (
+                db.func.count(Licenca.id), db.func.max(Licenca.updated_at),
+                db.func.count(Condicionante.id), db.func.max(Condicionante.updated_at),
+                db.func.max(Empresa.updated_at), db.func.max(VarreduraVencimento.id)
+            )
+        )))
+        if validador.nao_modificado():
+            return validador.resposta_nao_modificado()
         
         # Contadores gerais
         total_empresas = db.session.query(db.func.count(db.distinct(Licenca.empresa_id))).scalar()
         total_licencas = Licenca.query.filter_by(status='ativa').count()
-        total_condicionantes = Condicionante.query.filter_by(status='pendente').count()
+        total_condicionantes = Condicionante.query.filter(Condicionante.status.in_(STATUS_EM_ABERTO)).count()
         
-        # Licenças por vencer (próximos 30 dias)
+        # Licenças por vencer (próximos 30 dias, incluindo as já vencidas)
         licencas_vencimento = Licenca.query.filter(
             Licenca.data_vencimento <= hoje + timedelta(days=30),
-            Licenca.status == 'ativa'
+            Licenca.status.in_(('ativa', 'vencida'))
         ).count()
         
-        # Condicionantes por vencer (próximos 30 dias)
+        # Condicionantes por vencer (próximos 30 dias, incluindo as já vencidas)
         condicionantes_vencimento = Condicionante.query.filter(
             Condicionante.data_limite <= hoje + timedelta(days=30),
-            Condicionante.status == 'pendente'
+            Condicionante.status.in_(STATUS_EM_ABERTO)
         ).count()
         
-        # Condicionantes vencidas
-        condicionantes_vencidas = Condicionante.query.filter(
-            Condicionante.data_limite < hoje,
-            Condicionante.status == 'pendente'
-        ).count()
+        # Condicionantes vencidas (materializadas pela varredura diária `flask marcar-vencidas`)
+        condicionantes_vencidas = Condicionante.query.filter_by(status='vencida').count()
         
         # Próximas ações (condicionantes mais urgentes)
-        proximas_acoes = Condicionante.query.filter(
-            Condicionante.status == 'pendente'
+        proximas_acoes = Condicionante.query.options(
+            joinedload(Condicionante.licenca).joinedload(Licenca.empresa)
+        ).filter(
+            Condicionante.status.in_(STATUS_EM_ABERTO)
         ).order_by(Condicionante.data_limite).limit(5).all()
         
+        varredura = ultima_varredura()
+
         resultado = {
             'totais': {
                 'empresas': total_empresas,
@@ -268,10 +439,11 @@ def dashboard_resumo():
                     'tipo_licenca': condicionante.licenca.tipo_licenca
                 }
                 for condicionante in proximas_acoes
-            ]
+            ],
+            'ultima_varredura': varredura.to_dict() if varredura else None
         }
         
-        return jsonify(resultado), 200
+        return validador.aplicar(jsonify(resultado)), 200
     except Exception as e:
         return jsonify({'erro': str(e)}), 500
 
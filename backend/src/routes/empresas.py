@@ -4,6 +4,7 @@ from src.models.licenciamento import Empresa, Licenca, Condicionante
 from validate_docbr import CNPJ
 from datetime import datetime
 from werkzeug.exceptions import HTTPException
+from src.services.cache_http import ValidadorColecao
 
 empresas_bp = Blueprint('empresas', __name__)
 
@@ -11,8 +12,12 @@ empresas_bp = Blueprint('empresas', __name__)
 def listar_empresas():
     """Lista todas as empresas"""
     try:
+        validador = ValidadorColecao.consultar(db.select(db.func.count(Empresa.id), db.func.max(Empresa.updated_at)))
+        if validador.nao_modificado():
+            return validador.resposta_nao_modificado()
+
         empresas = Empresa.query.all()
-        return jsonify([empresa.to_dict() for empresa in empresas]), 200
+        return validador.aplicar(jsonify([empresa.to_dict() for empresa in empresas])), 200
     except Exception as e:
         # Idealmente, logar o erro: current_app.logger.error(f"Erro em listar_empresas: {str(e)}")
         return jsonify({'erro': 'Erro interno do servidor', 'detalhe': str(e)}), 500
@@ -0,0 +1,54 @@
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from datetime import date
+from src.services.exportacao import (
+    COLUNAS_CONDICIONANTES, COLUNAS_LICENCAS,
+    consulta_condicionantes, consulta_licencas,
+    gerar_csv, gerar_xlsx
+)
+
+exportacao_bp = Blueprint('exportacao', __name__)
+
+TIPOS_CONTEUDO = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+def _resposta_exportacao(stmt, colunas, nome_base, formato):
+    """Monta a resposta em streaming no formato pedido"""
+    cabecalhos = [titulo for titulo, _ in colunas]
+    if formato == 'csv':
+        gerador = gerar_csv(stmt, cabecalhos)
+    else:
+        gerador = gerar_xlsx(stmt, cabecalhos, nome_planilha=nome_base.capitalize())
+
+    nome_arquivo = f"{nome_base}_{date.today().strftime('%Y%m%d')}.{formato}"
+    return Response(
+        stream_with_context(gerador),
+        mimetype=TIPOS_CONTEUDO[formato],
+        headers={'Content-Disposition': f'attachment; filename="{nome_arquivo}"'}
+    )
+
+@exportacao_bp.route('/export/condicionantes.<formato>', methods=['GET'])
+def exportar_condicionantes(formato):
+    """Exporta condicionantes (com licença e empresa) em CSV ou XLSX"""
+    if formato not in TIPOS_CONTEUDO:
+        return jsonify({'erro': 'Formato não suportado. Use csv ou xlsx'}), 404
+
+    stmt = consulta_condicionantes(
+        licenca_id=request.args.get('licenca_id', type=int),
+        empresa_id=request.args.get('empresa_id', type=int),
+        status=request.args.get('status')
+    )
+    return _resposta_exportacao(stmt, COLUNAS_CONDICIONANTES, 'condicionantes', formato)
+
+@exportacao_bp.route('/export/licencas.<formato>', methods=['GET'])
+def exportar_licencas(formato):
+    """Exporta licenças (com empresa) em CSV ou XLSX"""
+    if formato not in TIPOS_CONTEUDO:
+        return jsonify({'erro': 'Formato não suportado. Use csv ou xlsx'}), 404
+
+    stmt = consulta_licencas(
+        empresa_id=request.args.get('empresa_id', type=int),
+        status=request.args.get('status')
+    )
+    return _resposta_exportacao(stmt, COLUNAS_LICENCAS, 'licencas', formato)
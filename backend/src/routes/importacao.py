@@ -0,0 +1,29 @@
+from flask import Blueprint, request, jsonify, current_app
+from src.models.user import db
+from src.services.importacao import importar_ndjson, TAMANHO_LOTE_PADRAO
+
+importacao_bp = Blueprint('importacao', __name__)
+
+@importacao_bp.route('/importacao/licencas', methods=['POST'])
+def importar_licencas():
+    """
+    Importa licenças com condicionantes a partir de um corpo NDJSON (application/x-ndjson).
+
+    O corpo é lido linha a linha diretamente do stream da requisição.
+    """
+    try:
+        tamanho_lote = request.args.get('lote', default=TAMANHO_LOTE_PADRAO, type=int)
+        if tamanho_lote < 1:
+            return jsonify({'erro': 'Tamanho de lote deve ser positivo'}), 400
+
+        resultado = importar_ndjson(request.stream, tamanho_lote=tamanho_lote)
+        current_app.logger.info(
+            f"Importação NDJSON: {resultado['licencas_importadas']} licenças, "
+            f"{resultado['condicionantes_importadas']} condicionantes, "
+            f"{resultado['linhas_por_segundo']} linhas/s"
+        )
+        return jsonify(resultado), 200
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Erro na importação NDJSON: {str(e)}")
+        return jsonify({'erro': str(e)}), 500
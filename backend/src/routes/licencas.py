@@ -1,6 +1,11 @@
 from flask import Blueprint, request, jsonify
 from src.models.user import db
 from src.models.licenciamento import Empresa, Licenca, Condicionante
+from sqlalchemy.orm import joinedload
+from src.services.prazos import recalcular_datas_limite, previsualizar_recalculo
+from src.services.comprovantes import liberar_comprovantes
+from src.services.cache_http import ValidadorColecao
+from src.services.vencimentos import reabrir_se_no_prazo
 from datetime import datetime, date, timedelta
 
 licencas_bp = Blueprint('licencas', __name__)
@@ -13,14 +18,22 @@ def listar_licencas():
         empresa_id = request.args.get('empresa_id', type=int)
         status = request.args.get('status')
         
-        query = Licenca.query
-        
+        filtros = []
         if empresa_id:
-            query = query.filter_by(empresa_id=empresa_id)
+            filtros.append(Licenca.empresa_id == empresa_id)
         if status:
-            query = query.filter_by(status=status)
-        
-        licencas = query.all()
+            filtros.append(Licenca.status == status)
+
+        # A resposta inclui a empresa de cada licença: alterações nela também mudam o ETag
+        validador = ValidadorColecao.consultar(
+            db.select(db.func.count(Licenca.id), db.func.max(Licenca.updated_at), db.func.max(Empresa.updated_at))
+            .join(Empresa, Licenca.empresa_id == Empresa.id).where(*filtros)
+        )
+        if validador.nao_modificado():
+            return validador.resposta_nao_modificado()
+
+        # Empresa carregada no mesmo SELECT (evita uma consulta por licença)
+        licencas = Licenca.query.options(joinedload(Licenca.empresa)).filter(*filtros).all()
         resultado = []
         
         for licenca in licencas:
@@ -29,7 +42,7 @@ def listar_licencas():
             licenca_dict['empresa'] = licenca.empresa.to_dict()
             resultado.append(licenca_dict)
         
-        return jsonify(resultado), 200
+        return validador.aplicar(jsonify(resultado)), 200
     except Exception as e:
         return jsonify({'erro': str(e)}), 500
 
@@ -109,10 +122,16 @@ def atualizar_licenca(licenca_id):
             licenca.numero_licenca = dados['numero_licenca']
         if 'orgao_emissor' in dados:
             licenca.orgao_emissor = dados['orgao_emissor']
+        condicionantes_recalculadas = 0
         if 'data_emissao' in dados:
-            licenca.data_emissao = datetime.strptime(dados['data_emissao'], '%Y-%m-%d').date()
+            nova_data_emissao = datetime.strptime(dados['data_emissao'], '%Y-%m-%d').date()
+            if nova_data_emissao != licenca.data_emissao:
+                # Datas limite das condicionantes dependem da data de emissão
+                condicionantes_recalculadas = recalcular_datas_limite(licenca.id, nova_data_emissao)
+            licenca.data_emissao = nova_data_emissao
         if 'data_vencimento' in dados:
             licenca.data_vencimento = datetime.strptime(dados['data_vencimento'], '%Y-%m-%d').date()
+            reabrir_se_no_prazo(licenca, licenca.data_vencimento)
         if 'status' in dados:
             licenca.status = dados['status']
         if 'observacoes' in dados:
@@ -121,19 +140,45 @@ def atualizar_licenca(licenca_id):
         licenca.updated_at = datetime.utcnow()
         db.session.commit()
         
-        return jsonify(licenca.to_dict()), 200
+        licenca_dict = licenca.to_dict()
+        licenca_dict['condicionantes_recalculadas'] = condicionantes_recalculadas
+        return jsonify(licenca_dict), 200
     except ValueError as e:
         return jsonify({'erro': 'Formato de data inválido. Use YYYY-MM-DD'}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'erro': str(e)}), 500
 
+@licencas_bp.route('/licencas/<int:licenca_id>/recalculo-prazos', methods=['GET'])
+def previsualizar_recalculo_prazos(licenca_id):
+    """Mostra, sem alterar nada, quais datas limite mudariam com uma nova data de emissão"""
+    try:
+        licenca = Licenca.query.get_or_404(licenca_id)
+        if not request.args.get('data_emissao'):
+            return jsonify({'erro': 'Parâmetro data_emissao é obrigatório'}), 400
+        data_emissao = datetime.strptime(request.args['data_emissao'], '%Y-%m-%d').date()
+
+        alteracoes = previsualizar_recalculo(licenca.id, data_emissao)
+        return jsonify({
+            'licenca_id': licenca.id,
+            'data_emissao_atual': licenca.data_emissao,
+            'data_emissao_nova': data_emissao.isoformat(),
+            'total': len(alteracoes),
+            'condicionantes': alteracoes
+        }), 200
+    except ValueError as e:
+        return jsonify({'erro': 'Formato de data inválido. Use YYYY-MM-DD'}), 400
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
+
 @licencas_bp.route('/licencas/<int:licenca_id>', methods=['DELETE'])
 def deletar_licenca(licenca_id):
     """Deleta uma licença"""
     try:
         licenca = Licenca.query.get_or_404(licenca_id)
         
+        # As condicionantes são apagadas em cascata; libera seus comprovantes antes
+        liberar_comprovantes(Condicionante.licenca_id == licenca.id)
         db.session.delete(licenca)
         db.session.commit()
         
@@ -149,10 +194,10 @@ def licencas_por_vencer():
         dias_limite = request.args.get('dias', default=30, type=int)
         data_limite = date.today()
         
-        # Busca licenças que vencem nos próximos X dias
-        licencas = Licenca.query.filter(
+        # Busca licenças que vencem nos próximos X dias (incluindo as já vencidas)
+        licencas = Licenca.query.options(joinedload(Licenca.empresa)).filter(
             Licenca.data_vencimento <= date.today() + timedelta(days=dias_limite),
-            Licenca.status == 'ativa'
+            Licenca.status.in_(('ativa', 'vencida'))
         ).order_by(Licenca.data_vencimento).all()
         
         resultado = []
@@ -0,0 +1,23 @@
+from flask import Blueprint, current_app, jsonify, request
+from src.services.autenticacao import requer_papel
+
+metricas_bp = Blueprint('metricas', __name__)
+
+@metricas_bp.route('/metrics', methods=['GET'])
+def exportar_metricas():
+    """Métricas por rota no formato texto do Prometheus"""
+    return current_app.extensions['metricas'].exportar(), 200, {
+        'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'
+    }
+
+@metricas_bp.route('/metrics/consultas-lentas', methods=['GET'])
+@requer_papel('administrador')
+def resumo_consultas_lentas():
+    """Comandos SQL acima do limite de lentidão neste processo, pelo tempo total gasto"""
+    limite = request.args.get('limite', 50, type=int)
+    registro = current_app.extensions['consultas_lentas']
+    return jsonify({
+        'limite_ms': current_app.config['CONSULTAS_LENTAS_MS'],
+        'arquivo': registro.arquivo,
+        'comandos': registro.resumo(limite)
+    }), 200
@@ -0,0 +1,22 @@
+from flask import Blueprint, jsonify, request, send_file
+from src.services.autenticacao import requer_papel
+from src.services.perfilador import caminho_perfil, listar_perfis, resumir_perfil
+
+perfis_bp = Blueprint('perfis', __name__)
+
+@perfis_bp.route('/perfis', methods=['GET'])
+@requer_papel('administrador')
+def listar():
+    """Perfis gravados por requisições com `X-Profile: 1`, dos mais recentes aos mais antigos"""
+    return jsonify(listar_perfis()), 200
+
+@perfis_bp.route('/perfis/<nome>', methods=['GET'])
+@requer_papel('administrador')
+def obter_perfil(nome):
+    """Resumo das funções mais caras do perfil; com ?formato=prof, o arquivo para o snakeviz/pstats"""
+    caminho = caminho_perfil(nome)
+    if caminho is None:
+        return jsonify({'erro': 'Perfil não encontrado'}), 404
+    if request.args.get('formato') == 'prof':
+        return send_file(caminho, mimetype='application/octet-stream', as_attachment=True, download_name=nome)
+    return jsonify({'nome': nome, **resumir_perfil(caminho, request.args.get('funcoes', 30, type=int))}), 200
@@ -0,0 +1,150 @@
+from flask import Blueprint, request, jsonify, current_app, abort
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_content_range_header
+from src.models.user import db
+from src.models.licenciamento import Condicionante, UploadComprovante
+from src.routes.condicionantes import allowed_file
+from src.services.comprovantes import (
+    ErroUpload, TAMANHO_BLOCO, tamanho_maximo,
+    criar_sessao, gravar_parte, finalizar_upload, cancelar_upload
+)
+
+uploads_bp = Blueprint('uploads', __name__)
+
+def _resposta_erro_upload(e):
+    return jsonify({'erro': e.mensagem, **e.detalhes}), e.status_code
+
+def _sessao_travada(upload_id):
+    """
+    Sessão carregada com SELECT ... FOR UPDATE: requisições simultâneas na mesma sessão
+    (partes repetidas, finalização dupla) esperam o commit da anterior e veem o
+    `recebidos`/`status` atualizado, em vez de gravarem o mesmo arquivo ao mesmo tempo.
+    """
+    upload = db.session.get(UploadComprovante, upload_id, with_for_update=True, populate_existing=True)
+    if upload is None:
+        abort(404)
+    return upload
+
+def _resposta_sessao(upload, status_code=200):
+    resposta = jsonify(upload.to_dict())
+    resposta.status_code = status_code
+    resposta.headers['Upload-Offset'] = str(upload.recebidos)
+    return resposta
+
+@uploads_bp.route('/uploads', methods=['POST'])
+def iniciar_upload():
+    """
+    Cria uma sessão de upload em partes.
+
+    Corpo JSON: {"nome_arquivo": "...", "tamanho": <bytes>, "condicionante_id": <opcional>,
+                 "sha256": <opcional>}
+
+    O SHA-256 informado é conferido na finalização; se o conteúdo já estiver
+    armazenado, o arquivo recebido é descartado e apenas vinculado (`deduplicado: true`).
+    """
+    try:
+        dados = request.get_json(silent=True) or {}
+
+        nome_arquivo = dados.get('nome_arquivo')
+        if not nome_arquivo:
+            return jsonify({'erro': 'Nome do arquivo é obrigatório'}), 400
+        if not allowed_file(nome_arquivo):
+            return jsonify({'erro': 'Tipo de arquivo não permitido'}), 400
+        if not isinstance(dados.get('tamanho'), int):
+            return jsonify({'erro': 'Tamanho do arquivo (em bytes) é obrigatório'}), 400
+
+        condicionante_id = dados.get('condicionante_id')
+        if condicionante_id and not db.session.get(Condicionante, condicionante_id):
+            return jsonify({'erro': 'Condicionante não encontrada'}), 404
+
+        upload = criar_sessao(nome_arquivo, dados['tamanho'], condicionante_id, dados.get('sha256'))
+
+        resposta = _resposta_sessao(upload, 201)
+        resposta.headers['Location'] = f'/api/uploads/{upload.id}'
+        return resposta
+    except ErroUpload as e:
+        return _resposta_erro_upload(e)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Erro ao iniciar upload: {str(e)}")
+        return jsonify({'erro': str(e)}), 500
+
+@uploads_bp.route('/uploads/<upload_id>', methods=['GET', 'HEAD'])
+def obter_upload(upload_id):
+    """Retorna o estado da sessão; `recebidos` indica de onde o cliente deve retomar"""
+    upload = UploadComprovante.query.get_or_404(upload_id)
+    resposta = _resposta_sessao(upload)
+    resposta.headers['X-Tamanho-Bloco'] = str(TAMANHO_BLOCO)
+    resposta.headers['X-Tamanho-Maximo'] = str(tamanho_maximo())
+    return resposta
+
+@uploads_bp.route('/uploads/<upload_id>', methods=['PUT'])
+def enviar_parte(upload_id):
+    """
+    Recebe uma parte do arquivo no corpo da requisição (application/octet-stream).
+
+    O cabeçalho Content-Range (bytes inicio-fim/total) indica a posição da parte.
+    O corpo é lido direto do stream e gravado em disco em blocos fixos.
+    """
+    try:
+        upload = _sessao_travada(upload_id)
+
+        tamanho_parte = request.content_length
+        if tamanho_parte is None:
+            return jsonify({'erro': 'Content-Length é obrigatório'}), 411
+
+        content_range = parse_content_range_header(request.headers.get('Content-Range'))
+        if content_range is None:
+            inicio = upload.recebidos
+        else:
+            if content_range.length is not None and content_range.length != upload.tamanho_total:
+                return jsonify({'erro': 'Tamanho total diverge do declarado na sessão'}), 400
+            if content_range.stop - content_range.start != tamanho_parte:
+                return jsonify({'erro': 'Content-Range não corresponde ao Content-Length'}), 400
+            inicio = content_range.start
+
+        upload = gravar_parte(upload, inicio, request.stream, tamanho_parte)
+        return _resposta_sessao(upload)
+    except HTTPException as e:
+        raise e
+    except ErroUpload as e:
+        return _resposta_erro_upload(e)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Erro ao gravar parte do upload {upload_id}: {str(e)}")
+        return jsonify({'erro': str(e)}), 500
+
+@uploads_bp.route('/uploads/<upload_id>/finalizar', methods=['POST'])
+def concluir_upload(upload_id):
+    """Finaliza o upload; aceita opcionalmente {"sha256": "..."} para conferência"""
+    try:
+        upload = _sessao_travada(upload_id)
+        dados = request.get_json(silent=True) or {}
+
+        upload = finalizar_upload(upload, dados.get('sha256'))
+        return _resposta_sessao(upload)
+    except HTTPException as e:
+        raise e
+    except ErroUpload as e:
+        return _resposta_erro_upload(e)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Erro ao finalizar upload {upload_id}: {str(e)}")
+        return jsonify({'erro': str(e)}), 500
+
+@uploads_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+def descartar_upload(upload_id):
+    """Cancela uma sessão de upload em andamento"""
+    try:
+        upload = UploadComprovante.query.get_or_404(upload_id)
+        if upload.status != 'em_andamento':
+            return jsonify({'erro': 'Upload já finalizado'}), 409
+
+        cancelar_upload(upload)
+        return jsonify({'mensagem': 'Upload cancelado com sucesso'}), 200
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Erro ao cancelar upload {upload_id}: {str(e)}")
+        return jsonify({'erro': str(e)}), 500
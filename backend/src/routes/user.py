@@ -1,10 +1,20 @@
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, jsonify, request, current_app, g
 from src.models.user import User, db
+from src.services.senhas import FilaSenhasCheia, gerar_hash, verificar_senha
+from src.services.autenticacao import requer_papel, revogar_tokens, versao_token
 import jwt
 from datetime import datetime, timedelta, timezone
 
 user_bp = Blueprint('user', __name__) # Pode ser renomeado para auth_bp se preferir separar
 
+@user_bp.errorhandler(FilaSenhasCheia)
+def fila_senhas_cheia(e):
+    # Pico de logins: melhor recusar rápido do que prender o worker esperando o pool
+    resposta = jsonify({'erro': 'Servidor ocupado, tente novamente em instantes'})
+    resposta.status_code = 503
+    resposta.headers['Retry-After'] = '1'
+    return resposta
+
 # Endpoint de Registro
 @user_bp.route('/register', methods=['POST'])
 def register_user():
@@ -19,9 +29,9 @@ def register_user():
     new_user = User(
         email=data['email'],
         nome_completo=data.get('nome_completo'),
-        role=data.get('role', 'visualizador') # Default role
+        role='visualizador' # Cadastro público: só um administrador altera o papel (PUT /users/<id>)
     )
-    new_user.set_password(data['password'])
+    new_user.password_hash = gerar_hash(data['password'])
 
     db.session.add(new_user)
     db.session.commit()
@@ -38,13 +48,16 @@ def login_user():
 
     user = User.query.filter_by(email=data['email']).first()
 
-    if not user or not user.check_password(data['password']):
+    if not user or not verificar_senha(user, data['password']):
         return jsonify({'erro': 'Credenciais inválidas'}), 401
+    if db.session.is_modified(user):
+        db.session.commit() # Hash regravado com os parâmetros atuais
 
     # Gerar token JWT
     payload = {
         'user_id': user.id,
         'role': user.role,
+        'ver': versao_token(user.id), # Tokens com versão antiga são recusados (revogação)
         'exp': datetime.now(timezone.utc) + timedelta(hours=current_app.config.get('JWT_EXPIRATION_HOURS', 24)) # Adicionado timezone.utc
     }
     token = jwt.encode(payload, current_app.config['SECRET_KEY'], algorithm='HS256')
@@ -56,8 +69,8 @@ def login_user():
 # Por enquanto, vamos focar em registro e login.
 # O endpoint GET /users pode ser usado por um admin no futuro.
 @user_bp.route('/users', methods=['GET'])
+@requer_papel('administrador')
 def get_users():
-    # TODO: Proteger esta rota (somente admin)
     users = User.query.all()
     return jsonify([user.to_dict() for user in users])
 
@@ -66,20 +79,34 @@ def get_users():
 
 @user_bp.route('/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
-    # TODO: Proteger esta rota (usuário logado pode ver o seu, admin pode ver qualquer um)
+    # Usuário logado vê o próprio cadastro; administrador vê qualquer um
+    if not current_app.config.get('LOGIN_DISABLED'):
+        usuario = g.get('usuario')
+        if usuario is None:
+            resposta = jsonify({'erro': 'Autenticação necessária'})
+            resposta.status_code = 401
+            resposta.headers['WWW-Authenticate'] = 'Bearer'
+            return resposta
+        if usuario['id'] != user_id and usuario['role'] != 'administrador':
+            return jsonify({'erro': 'Permissão insuficiente'}), 403
     user = User.query.get_or_404(user_id)
     return jsonify(user.to_dict())
 
 @user_bp.route('/users/<int:user_id>', methods=['PUT'])
+@requer_papel('administrador')
 def update_user(user_id):
     user = User.query.get_or_404(user_id)
     data = request.json
-    user.username = data.get('username', user.username)
+    user.nome_completo = data.get('nome_completo', user.nome_completo)
     user.email = data.get('email', user.email)
+    if data.get('role') and data['role'] != user.role:
+        user.role = data['role']
+        revogar_tokens(user.id) # Tokens emitidos com o papel antigo deixam de valer
     db.session.commit()
     return jsonify(user.to_dict())
 
 @user_bp.route('/users/<int:user_id>', methods=['DELETE'])
+@requer_papel('administrador')
 def delete_user(user_id):
     user = User.query.get_or_404(user_id)
     db.session.delete(user)
@@ -0,0 +1,85 @@
+from datetime import date, timedelta
+from sqlalchemy import literal
+from src.models.user import db
+from src.models.licenciamento import Empresa, Licenca, Condicionante
+from src.models.expressoes import inicio_semana, inicio_mes
+
+GRANULARIDADES = {'semana': inicio_semana, 'mes': inicio_mes}
+HORIZONTE_PADRAO = 365
+HORIZONTE_MAXIMO = 3 * 366
+
+
+def _inicio_periodo(data, granularidade):
+    if granularidade == 'semana':
+        return data - timedelta(days=data.weekday())
+    return data.replace(day=1)
+
+
+def _periodos(inicio, fim, granularidade):
+    """Início de cada semana ou mês entre as duas datas (inclusive), sem lacunas"""
+    periodos = []
+    atual = _inicio_periodo(inicio, granularidade)
+    while atual <= fim:
+        periodos.append(atual)
+        if granularidade == 'semana':
+            atual += timedelta(days=7)
+        else:
+            atual = date(atual.year + atual.month // 12, atual.month % 12 + 1, 1)
+    return periodos
+
+
+def linha_do_tempo(granularidade='semana', horizonte=HORIZONTE_PADRAO, hoje=None):
+    """
+    Quantidade de vencimentos de licenças e de datas limite de condicionantes por
+    semana ou mês, de hoje até `horizonte` dias à frente, por empresa e status.
+
+    Um único SELECT: os vencimentos das duas tabelas (filtrados pelas colunas de data
+    indexadas) são unidos com UNION ALL e agrupados pelo início do período.
+
+    Returns:
+        dict: `periodos` (início de cada período, sem lacunas) e `series`, uma por
+        (tipo, empresa, status), com as contagens alinhadas a `periodos`
+    """
+    hoje = hoje or date.today()
+    inicio = _inicio_periodo(hoje, granularidade)
+    fim = hoje + timedelta(days=horizonte)
+
+    vencimentos = db.union_all(
+        db.select(Licenca.data_vencimento.label('data'), literal('licenca').label('tipo'),
+                  Licenca.empresa_id.label('empresa_id'), Licenca.status.label('status'))
+        .where(Licenca.data_vencimento.between(inicio, fim)),
+        db.select(Condicionante.data_limite, literal('condicionante'), Licenca.empresa_id, Condicionante.status)
+        .join(Licenca, Condicionante.licenca_id == Licenca.id)
+        .where(Condicionante.data_limite.between(inicio, fim))
+    ).subquery()
+
+    periodo = GRANULARIDADES[granularidade](vencimentos.c.data).label('periodo')
+    linhas = db.session.execute(
+        db.select(periodo, vencimentos.c.tipo, vencimentos.c.empresa_id, Empresa.razao_social,
+                  vencimentos.c.status, db.func.count().label('quantidade'))
+        .join(Empresa, vencimentos.c.empresa_id == Empresa.id)
+        .group_by(periodo, vencimentos.c.tipo, vencimentos.c.empresa_id, Empresa.razao_social, vencimentos.c.status)
+    ).all()
+
+    periodos = _periodos(inicio, fim, granularidade)
+    indice = {inicio_periodo: posicao for posicao, inicio_periodo in enumerate(periodos)}
+    series = {}
+    for linha in linhas:
+        chave = (linha.tipo, linha.empresa_id, linha.status)
+        if chave not in series:
+            series[chave] = {
+                'tipo': linha.tipo,
+                'empresa_id': linha.empresa_id,
+                'empresa': linha.razao_social,
+                'status': linha.status,
+                'contagens': [0] * len(periodos)
+            }
+        series[chave]['contagens'][indice[linha.periodo]] = linha.quantidade
+
+    return {
+        'granularidade': granularidade,
+        'inicio': inicio,
+        'fim': fim,
+        'periodos': periodos,
+        'series': sorted(series.values(), key=lambda serie: (serie['tipo'], serie['empresa'], serie['status'] or ''))
+    }
@@ -0,0 +1,206 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+import jwt
+from flask import current_app, g, jsonify, request
+from src.models.user import db, User, VersaoToken
+
+# Rotas que não exigem token mesmo com AUTH_OBRIGATORIA
+ENDPOINTS_PUBLICOS = {'user.login_user', 'user.register_user', 'metricas.exportar_metricas'}
+CACHE_TAMANHO_PADRAO = 10000
+INTERVALO_VERSOES_PADRAO = 30
+# Usuário ausente do mapa (recém-criado?) força nova leitura, no máximo uma vez por segundo
+_INTERVALO_MINIMO_VERSOES = 1
+
+
+class ErroAutenticacao(Exception):
+    def __init__(self, mensagem):
+        super().__init__(mensagem)
+        self.mensagem = mensagem
+
+
+class _CacheClaims:
+    """LRU limitado de claims já verificadas, indexado pelo SHA-256 do token"""
+
+    def __init__(self, tamanho):
+        self.tamanho = tamanho
+        self.itens = OrderedDict()
+        self.lock = threading.Lock()
+
+    def obter(self, chave):
+        with self.lock:
+            claims = self.itens.get(chave)
+            if claims is None:
+                return None
+            if claims['exp'] <= time.time():
+                del self.itens[chave]
+                return None
+            self.itens.move_to_end(chave)
+            return claims
+
+    def guardar(self, chave, claims):
+        with self.lock:
+            self.itens[chave] = claims
+            self.itens.move_to_end(chave)
+            while len(self.itens) > self.tamanho:
+                self.itens.popitem(last=False)
+
+
+class _MapaVersoes:
+    """
+    Versão de token de cada usuário, lida do banco de tempos em tempos (uma consulta
+    para todos os usuários) em vez de a cada requisição.
+    """
+
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self.versoes = {}
+        self.lido_em = None
+        self.lock = threading.Lock()
+
+    def _atualizar(self):
+        linhas = db.session.execute(
+            db.select(User.id, db.func.coalesce(VersaoToken.versao, 0))
+            .outerjoin(VersaoToken, VersaoToken.usuario_id == User.id)
+        ).all()
+        self.versoes = dict(linhas)
+        self.lido_em = time.monotonic()
+
+    def obter(self, usuario_id):
+        agora = time.monotonic()
+        with self.lock:
+            if self.lido_em is None or agora - self.lido_em >= self.intervalo or \
+                    (usuario_id not in self.versoes and agora - self.lido_em >= _INTERVALO_MINIMO_VERSOES):
+                self._atualizar()
+            return self.versoes.get(usuario_id)
+
+    def definir(self, usuario_id, versao):
+        with self.lock:
+            self.versoes[usuario_id] = versao
+
+
+def _estado():
+    return current_app.extensions['autenticacao']
+
+
+def versao_token(usuario_id):
+    """
+    Versão atual dos tokens do usuário, para incluir no payload do login. Também atualiza
+    o mapa deste processo: um usuário recém-criado não espera a próxima releitura.
+    """
+    registro = db.session.get(VersaoToken, usuario_id)
+    versao = registro.versao if registro else 0
+    _estado()['versoes'].definir(usuario_id, versao)
+    return versao
+
+
+def revogar_tokens(usuario_id):
+    """
+    Invalida todos os tokens já emitidos para o usuário (o commit fica a cargo de quem
+    chamou). Os demais processos percebem a mudança na próxima leitura do mapa de versões.
+    """
+    registro = db.session.get(VersaoToken, usuario_id)
+    if registro is None:
+        registro = VersaoToken(usuario_id=usuario_id, versao=0)
+        db.session.add(registro)
+    registro.versao += 1
+    _estado()['versoes'].definir(usuario_id, registro.versao)
+    return registro.versao
+
+
+def verificar_token(token):
+    """
+    Decodifica o token (HS256) e confere a versão do usuário.
+
+    As claims ficam em cache até o `exp` do token: requisições seguintes com o mesmo
+    token não repetem a verificação da assinatura nem consultam o banco.
+
+    Returns:
+        dict: Claims do token
+    """
+    estado = _estado()
+    chave = hashlib.sha256(token.encode()).hexdigest()
+    claims = estado['cache'].obter(chave)
+    if claims is None:
+        try:
+            claims = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'],
+                                options={'require': ['exp', 'user_id', 'role']})
+        except jwt.ExpiredSignatureError:
+            raise ErroAutenticacao('Token expirado')
+        except jwt.InvalidTokenError:
+            raise ErroAutenticacao('Token inválido')
+        estado['cache'].guardar(chave, claims)
+
+    versao_atual = estado['versoes'].obter(claims['user_id'])
+    if versao_atual is None or claims.get('ver', 0) < versao_atual:
+        raise ErroAutenticacao('Token revogado')
+    return claims
+
+
+def _token_da_requisicao():
+    cabecalho = request.headers.get('Authorization', '')
+    if cabecalho[:7].lower() == 'bearer ':
+        return cabecalho[7:].strip() or None
+    return None
+
+
+def _resposta_nao_autorizado(mensagem):
+    resposta = jsonify({'erro': mensagem})
+    resposta.status_code = 401
+    resposta.headers['WWW-Authenticate'] = 'Bearer'
+    return resposta
+
+
+def _autenticar_requisicao():
+    g.usuario = None
+    if current_app.config.get('LOGIN_DISABLED') or request.method == 'OPTIONS':
+        return None
+
+    token = _token_da_requisicao()
+    if token:
+        try:
+            claims = verificar_token(token)
+        except ErroAutenticacao as e:
+            return _resposta_nao_autorizado(e.mensagem)
+        g.usuario = {'id': claims['user_id'], 'role': claims['role']}
+    elif current_app.config.get('AUTH_OBRIGATORIA') and request.path.startswith('/api/') and \
+            request.endpoint not in ENDPOINTS_PUBLICOS:
+        return _resposta_nao_autorizado('Autenticação necessária')
+    return None
+
+
+def configurar_autenticacao(app):
+    """
+    Registra a verificação do token Bearer antes de cada requisição.
+
+    Com um token válido, `g.usuario` recebe {'id', 'role'} das claims. Sem token, a
+    requisição só é recusada se AUTH_OBRIGATORIA estiver ativa; LOGIN_DISABLED
+    desliga a verificação por completo.
+    """
+    app.extensions['autenticacao'] = {
+        'cache': _CacheClaims(app.config.get('AUTH_CACHE_TAMANHO', CACHE_TAMANHO_PADRAO)),
+        'versoes': _MapaVersoes(app.config.get('AUTH_INTERVALO_VERSOES', INTERVALO_VERSOES_PADRAO))
+    }
+    app.before_request(_autenticar_requisicao)
+
+
+def requer_papel(*papeis):
+    """
+    Decorator que restringe a rota aos papéis informados (ex.: 'administrador').
+
+    Exige um token válido mesmo sem AUTH_OBRIGATORIA; só LOGIN_DISABLED libera a rota.
+    """
+    def decorator(funcao):
+        @wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            if not current_app.config.get('LOGIN_DISABLED'):
+                usuario = g.get('usuario')
+                if usuario is None:
+                    return _resposta_nao_autorizado('Autenticação necessária')
+                if usuario['role'] not in papeis:
+                    return jsonify({'erro': 'Permissão insuficiente'}), 403
+            return funcao(*args, **kwargs)
+        return envoltorio
+    return decorator
@@ -0,0 +1,53 @@
+import hashlib
+from datetime import date, timezone
+from flask import current_app, request
+from src.models.user import db
+
+
+class ValidadorColecao:
+    """
+    Validador HTTP (ETag/Last-Modified) de uma listagem, calculado a partir da contagem
+    de linhas e do maior `updated_at` do conjunto filtrado, sem carregar as linhas.
+
+    Uso numa rota:
+
+        validador = ValidadorColecao.consultar(
+            db.select(db.func.count(Licenca.id), db.func.max(Licenca.updated_at)).where(...)
+        )
+        if validador.nao_modificado():
+            return validador.resposta_nao_modificado()
+        ...
+        return validador.aplicar(jsonify(resultado)), 200
+    """
+
+    def __init__(self, valores):
+        self.valores = tuple(valores)
+        # A data entra no ETag: os to_dict() trazem campos relativos a hoje (dias_para_vencimento)
+        base = '|'.join(str(valor) for valor in self.valores + (date.today(),))
+        self.etag = hashlib.sha1(base.encode()).hexdigest()[:20]
+        datas = [valor for valor in self.valores if hasattr(valor, 'isoformat')]
+        self.ultima_alteracao = max(datas).replace(tzinfo=timezone.utc) if datas else None
+
+    @classmethod
+    def consultar(cls, consulta):
+        """Executa a consulta de validação (uma única linha: contagens e MAX(updated_at))"""
+        return cls(db.session.execute(consulta).one())
+
+    def nao_modificado(self):
+        """
+        Só o If-None-Match é considerado: o Last-Modified não muda quando uma linha é
+        excluída, então um If-Modified-Since sozinho poderia devolver dados antigos.
+        """
+        return request.if_none_match.contains_weak(self.etag)
+
+    def aplicar(self, resposta):
+        resposta.set_etag(self.etag, weak=True)
+        if self.ultima_alteracao is not None:
+            resposta.last_modified = self.ultima_alteracao
+        # Sempre revalidar: sem isso o navegador poderia reaproveitar a listagem por heurística
+        resposta.cache_control.private = True
+        resposta.cache_control.no_cache = True
+        return resposta
+
+    def resposta_nao_modificado(self):
+        return self.aplicar(current_app.response_class(status=304))
@@ -0,0 +1,135 @@
+import gzip
+import threading
+import zlib
+from collections import OrderedDict
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+TIPOS_COMPRIMIVEIS = {'application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html'}
+MINIMO_BYTES_PADRAO = 1024
+NIVEL_GZIP_PADRAO = 6
+# Qualidade 4-5 do brotli comprime melhor que o gzip 6 a um custo de CPU parecido (respostas dinâmicas)
+NIVEL_BROTLI_PADRAO = 4
+CACHE_BYTES_PADRAO = 32 * 1024 * 1024
+
+
+class _CacheComprimidos:
+    """
+    LRU de corpos já comprimidos, limitado pelo total de bytes guardados.
+
+    A chave inclui o ETag da resposta: enquanto ele não muda, o corpo é o mesmo e a
+    compressão não precisa ser refeita.
+    """
+
+    def __init__(self, limite_bytes):
+        self.limite_bytes = limite_bytes
+        self.itens = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def obter(self, chave):
+        with self.lock:
+            corpo = self.itens.get(chave)
+            if corpo is not None:
+                self.itens.move_to_end(chave)
+            return corpo
+
+    def guardar(self, chave, corpo):
+        if len(corpo) > self.limite_bytes:
+            return
+        with self.lock:
+            anterior = self.itens.pop(chave, None)
+            if anterior is not None:
+                self.total_bytes -= len(anterior)
+            self.itens[chave] = corpo
+            self.total_bytes += len(corpo)
+            while self.total_bytes > self.limite_bytes:
+                _, removido = self.itens.popitem(last=False)
+                self.total_bytes -= len(removido)
+
+
+def _escolher_codificacao():
+    """br (se o pacote brotli estiver instalado) ou gzip, conforme o Accept-Encoding"""
+    aceitas = request.accept_encodings
+    candidatas = (['br'] if brotli is not None else []) + ['gzip']
+    qualidades = {codificacao: aceitas[codificacao] for codificacao in candidatas}
+    melhor = max(candidatas, key=lambda codificacao: qualidades[codificacao])
+    return melhor if qualidades[melhor] > 0 else None
+
+
+def _comprimir(dados, codificacao, config):
+    if codificacao == 'br':
+        return brotli.compress(dados, quality=config.get('COMPRESSAO_NIVEL_BROTLI', NIVEL_BROTLI_PADRAO))
+    return gzip.compress(dados, compresslevel=config.get('COMPRESSAO_NIVEL_GZIP', NIVEL_GZIP_PADRAO), mtime=0)
+
+
+def _comprimir_fluxo(partes, codificacao, config):
+    """Comprime um corpo em streaming parte a parte, sem juntá-lo em memória"""
+    if codificacao == 'br':
+        compressor = brotli.Compressor(quality=config.get('COMPRESSAO_NIVEL_BROTLI', NIVEL_BROTLI_PADRAO))
+        processar, finalizar = compressor.process, compressor.finish
+    else:
+        # wbits=31: formato gzip (cabeçalho e CRC), não deflate puro
+        compressor = zlib.compressobj(config.get('COMPRESSAO_NIVEL_GZIP', NIVEL_GZIP_PADRAO), zlib.DEFLATED, 31)
+        processar, finalizar = compressor.compress, compressor.flush
+    try:
+        for parte in partes:
+            dados = processar(parte.encode() if isinstance(parte, str) else parte)
+            if dados:
+                yield dados
+        yield finalizar()
+    finally:
+        if hasattr(partes, 'close'):
+            partes.close()
+
+
+def _comprimir_resposta(resposta):
+    if (request.method == 'HEAD' or resposta.status_code < 200 or resposta.status_code in (204, 206, 304)
+            or resposta.direct_passthrough or 'Content-Encoding' in resposta.headers
+            or resposta.mimetype not in TIPOS_COMPRIMIVEIS):
+        return resposta
+
+    config = current_app.config
+    if not resposta.is_streamed and resposta.calculate_content_length() < config.get('COMPRESSAO_MINIMO_BYTES', MINIMO_BYTES_PADRAO):
+        return resposta
+
+    # Mesmo sem comprimir para este cliente, caches intermediários precisam separar as variantes
+    resposta.vary.add('Accept-Encoding')
+    codificacao = _escolher_codificacao()
+    if codificacao is None:
+        return resposta
+
+    if resposta.is_streamed:
+        resposta.response = _comprimir_fluxo(resposta.response, codificacao, config)
+        resposta.headers.pop('Content-Length', None)
+    else:
+        etag, fraco = resposta.get_etag()
+        chave = (request.full_path, etag, codificacao) if etag else None
+        cache = current_app.extensions['compressao']
+        corpo = cache.obter(chave) if chave else None
+        if corpo is None:
+            corpo = _comprimir(resposta.get_data(), codificacao, config)
+            if chave:
+                cache.guardar(chave, corpo)
+        resposta.set_data(corpo)
+        if etag and not fraco:
+            # ETag forte identifica os bytes exatos: cada codificação precisa do seu
+            resposta.set_etag(f'{etag}-{codificacao}')
+
+    resposta.headers['Content-Encoding'] = codificacao
+    return resposta
+
+
+def configurar_compressao(app):
+    """
+    Comprime com gzip ou brotli as respostas de texto/JSON acima de COMPRESSAO_MINIMO_BYTES,
+    conforme o Accept-Encoding do cliente. Respostas em streaming (exportações) são
+    comprimidas parte a parte; arquivos enviados com send_file e respostas já codificadas
+    (variantes .br/.gz dos estáticos) passam direto.
+    """
+    app.extensions['compressao'] = _CacheComprimidos(app.config.get('COMPRESSAO_CACHE_BYTES', CACHE_BYTES_PADRAO))
+    app.after_request(_comprimir_resposta)
@@ -0,0 +1,347 @@
+import hashlib
+import os
+import re
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from flask import current_app, send_file
+from werkzeug.security import safe_join
+from werkzeug.exceptions import ClientDisconnected
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.licenciamento import Condicionante, Comprovante, UploadComprovante
+from src.services.previews import agendar_previews
+
+# Tamanho dos blocos lidos da requisição e gravados em disco
+TAMANHO_BLOCO = 1024 * 1024
+TAMANHO_MAXIMO_PADRAO = 100 * 1024 * 1024
+
+# Estado do SHA-256 das sessões em andamento neste processo, para não reler o arquivo
+# parcial a cada parte recebida. Se o estado não estiver aqui (outro worker, reinício),
+# ele é reconstruído a partir do que já está em disco.
+_MAX_HASHES_EM_MEMORIA = 256
+_hashes_em_andamento = OrderedDict()
+_hashes_lock = threading.Lock()
+
+
+_NOME_ENDERECADO = re.compile(r'^[0-9a-f]{64}$')
+
+
+class ErroUpload(Exception):
+    """Erro de validação de upload, com o status HTTP correspondente"""
+
+    def __init__(self, mensagem, status_code=400, **detalhes):
+        super().__init__(mensagem)
+        self.mensagem = mensagem
+        self.status_code = status_code
+        self.detalhes = detalhes
+
+
+def tamanho_maximo():
+    return current_app.config.get('MAX_COMPROVANTE_BYTES', TAMANHO_MAXIMO_PADRAO)
+
+
+def pasta_parciais():
+    pasta = os.path.join(current_app.config['UPLOAD_FOLDER'], 'parciais')
+    os.makedirs(pasta, exist_ok=True)
+    return pasta
+
+
+def caminho_parcial(upload):
+    return os.path.join(pasta_parciais(), f'{upload.id}.part')
+
+
+def _guardar_hash(upload_id, posicao, hasher):
+    with _hashes_lock:
+        _hashes_em_andamento[upload_id] = (posicao, hasher)
+        _hashes_em_andamento.move_to_end(upload_id)
+        while len(_hashes_em_andamento) > _MAX_HASHES_EM_MEMORIA:
+            _hashes_em_andamento.popitem(last=False)
+
+
+def _obter_hash(upload, posicao):
+    """Retorna o SHA-256 dos primeiros `posicao` bytes do arquivo parcial"""
+    with _hashes_lock:
+        em_memoria = _hashes_em_andamento.pop(upload.id, None)
+    if em_memoria and em_memoria[0] == posicao:
+        return em_memoria[1]
+
+    hasher = hashlib.sha256()
+    restante = posicao
+    with open(caminho_parcial(upload), 'rb') as arquivo:
+        while restante > 0:
+            bloco = arquivo.read(min(TAMANHO_BLOCO, restante))
+            if not bloco:
+                break
+            hasher.update(bloco)
+            restante -= len(bloco)
+    return hasher
+
+
+def caminho_enderecado(sha256, extensao):
+    """Caminho (relativo a UPLOAD_FOLDER) de um comprovante armazenado pelo seu SHA-256"""
+    sufixo = f'.{extensao}' if extensao else ''
+    return f'comprovantes/{sha256[:2]}/{sha256}{sufixo}'
+
+
+def _validar_sha256(sha256):
+    """SHA-256 informado pelo cliente, normalizado em minúsculas (ErroUpload 400 se malformado)"""
+    if sha256 is None:
+        return None
+    if not isinstance(sha256, str) or not _NOME_ENDERECADO.match(sha256.lower()):
+        raise ErroUpload('SHA-256 deve ter 64 caracteres hexadecimais')
+    return sha256.lower()
+
+
+def _publicar(origem, destino):
+    """
+    Coloca o conteúdo de `origem` em `destino` (troca atômica) sem consumir a origem:
+    o arquivo parcial só é apagado depois do commit, para que a sessão possa ser
+    finalizada de novo se a transação falhar.
+    """
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporario = f'{destino}.{uuid.uuid4().hex}.tmp'
+    try:
+        os.link(origem, temporario)
+    except OSError:
+        shutil.copyfile(origem, temporario)
+    os.replace(temporario, destino)
+
+
+def _extensao(nome_arquivo):
+    return nome_arquivo.rsplit('.', 1)[1].lower() if '.' in nome_arquivo else None
+
+
+def vincular_comprovante(condicionante, comprovante):
+    """Aponta a condicionante para o comprovante, ajustando as contagens de referência"""
+    if condicionante.comprovante_path == comprovante.caminho:
+        return
+    desvincular_comprovante(condicionante)
+    db.session.execute(
+        db.update(Comprovante)
+        .where(Comprovante.sha256 == comprovante.sha256)
+        .values(referencias=Comprovante.referencias + 1)
+    )
+    condicionante.comprovante_path = comprovante.caminho
+    condicionante.updated_at = datetime.utcnow()
+
+
+def desvincular_comprovante(condicionante):
+    """Remove o comprovante da condicionante, decrementando a contagem de referências"""
+    if not condicionante.comprovante_path:
+        return
+    db.session.execute(
+        db.update(Comprovante)
+        .where(Comprovante.caminho == condicionante.comprovante_path, Comprovante.referencias > 0)
+        .values(referencias=Comprovante.referencias - 1)
+    )
+    condicionante.comprovante_path = None
+
+
+def liberar_comprovantes(*criterios):
+    """
+    Decrementa as referências dos comprovantes das condicionantes que atendem aos
+    critérios, antes de elas serem desvinculadas ou apagadas em lote.
+
+    Uma consulta agrupada por arquivo e um UPDATE por arquivo distinto (executemany).
+    """
+    contagens = db.session.execute(
+        db.select(Condicionante.comprovante_path, db.func.count())
+        .where(*criterios, Condicionante.comprovante_path.isnot(None))
+        .group_by(Condicionante.comprovante_path)
+    ).all()
+    if not contagens:
+        return
+
+    tabela = Comprovante.__table__
+    db.session.execute(
+        tabela.update()
+        .where(tabela.c.caminho == db.bindparam('b_caminho'))
+        .values(referencias=db.case(
+            (tabela.c.referencias > db.bindparam('b_quantidade'), tabela.c.referencias - db.bindparam('b_quantidade')),
+            else_=0
+        )),
+        [{'b_caminho': caminho, 'b_quantidade': quantidade} for caminho, quantidade in contagens]
+    )
+
+
+def _concluir_com_comprovante(upload, comprovante, deduplicado):
+    upload.sha256 = comprovante.sha256
+    upload.comprovante_path = comprovante.caminho
+    upload.recebidos = upload.tamanho_total
+    upload.deduplicado = deduplicado
+    upload.status = 'concluido'
+
+    if upload.condicionante_id:
+        condicionante = db.session.get(Condicionante, upload.condicionante_id)
+        if condicionante:
+            vincular_comprovante(condicionante, comprovante)
+
+
+def criar_sessao(nome_arquivo, tamanho_total, condicionante_id=None, sha256=None):
+    """
+    Cria uma sessão de upload e o arquivo parcial vazio correspondente.
+
+    O SHA-256 informado pelo cliente é guardado e conferido na finalização. Ele não
+    basta para vincular um comprovante já armazenado: quem conhecesse o hash de um
+    arquivo obteria uma cópia dele. A deduplicação acontece na finalização, depois
+    que o conteúdo foi recebido e conferido.
+    """
+    sha256 = _validar_sha256(sha256)
+    if tamanho_total <= 0:
+        raise ErroUpload('Tamanho do arquivo deve ser positivo')
+    if tamanho_total > tamanho_maximo():
+        raise ErroUpload(f'Arquivo excede o tamanho máximo de {tamanho_maximo()} bytes', 413)
+
+    upload = UploadComprovante(
+        id=uuid.uuid4().hex,
+        condicionante_id=condicionante_id,
+        nome_arquivo=nome_arquivo,
+        tamanho_total=tamanho_total,
+        recebidos=0,
+        status='em_andamento',
+        sha256=sha256
+    )
+    db.session.add(upload)
+    open(caminho_parcial(upload), 'wb').close()
+
+    db.session.commit()
+    return upload
+
+
+def gravar_parte(upload, inicio, stream, tamanho_parte):
+    """
+    Grava em disco uma parte do arquivo lida diretamente do stream da requisição.
+
+    As partes precisam ser enviadas em sequência: `inicio` deve ser igual ao número
+    de bytes já recebidos. Se a conexão cair no meio da parte, o que chegou fica
+    salvo e o cliente retoma a partir de `upload.recebidos`.
+    """
+    if upload.status != 'em_andamento':
+        raise ErroUpload('Upload já finalizado', 409)
+    if inicio != upload.recebidos:
+        raise ErroUpload('Parte fora de sequência', 409, recebidos=upload.recebidos)
+    if inicio + tamanho_parte > upload.tamanho_total:
+        raise ErroUpload('Parte ultrapassa o tamanho declarado do arquivo', 413)
+
+    hasher = _obter_hash(upload, inicio)
+    posicao = inicio
+    try:
+        with open(caminho_parcial(upload), 'r+b') as arquivo:
+            arquivo.seek(inicio)
+            arquivo.truncate()
+            restante = tamanho_parte
+            while restante > 0:
+                bloco = stream.read(min(TAMANHO_BLOCO, restante))
+                if not bloco:
+                    break
+                arquivo.write(bloco)
+                hasher.update(bloco)
+                posicao += len(bloco)
+                restante -= len(bloco)
+    except ClientDisconnected:
+        pass
+    finally:
+        _guardar_hash(upload.id, posicao, hasher)
+        upload.recebidos = posicao
+        db.session.commit()
+
+    return upload
+
+
+def finalizar_upload(upload, sha256_esperado=None):
+    """
+    Conclui o upload: confere tamanho e SHA-256, move o arquivo para a pasta de
+    comprovantes e, se houver, vincula-o à condicionante da sessão.
+    """
+    if upload.status != 'em_andamento':
+        raise ErroUpload('Upload já finalizado', 409)
+    if upload.recebidos != upload.tamanho_total:
+        raise ErroUpload('Upload incompleto', 409, recebidos=upload.recebidos)
+
+    sha256_esperado = _validar_sha256(sha256_esperado) or upload.sha256
+    sha256 = _obter_hash(upload, upload.recebidos).hexdigest()
+    if sha256_esperado and sha256_esperado != sha256:
+        raise ErroUpload('SHA-256 não confere com o arquivo recebido', 422, sha256=sha256)
+
+    # Trava a linha: a coleta de órfãos não apaga o arquivo enquanto ele é vinculado
+    comprovante = db.session.get(Comprovante, sha256, with_for_update=True)
+    deduplicado = comprovante is not None
+    if not deduplicado:
+        extensao = _extensao(upload.nome_arquivo)
+        novo = Comprovante(
+            sha256=sha256,
+            caminho=caminho_enderecado(sha256, extensao),
+            tamanho=upload.recebidos,
+            extensao=extensao,
+            referencias=0
+        )
+        try:
+            # INSERT antes de mover o arquivo: outra sessão com o mesmo conteúdo espera por esta linha
+            with db.session.begin_nested():
+                db.session.add(novo)
+        except IntegrityError:
+            # Mesmo conteúdo finalizado ao mesmo tempo por outra sessão: vincula ao arquivo dela
+            comprovante = db.session.get(Comprovante, sha256, with_for_update=True, populate_existing=True)
+            deduplicado = True
+        else:
+            comprovante = novo
+            _publicar(caminho_parcial(upload), os.path.join(current_app.config['UPLOAD_FOLDER'], novo.caminho))
+
+    _concluir_com_comprovante(upload, comprovante, deduplicado)
+
+    db.session.commit()
+    # Só depois do commit: se ele falhar, a sessão continua finalizável
+    os.remove(caminho_parcial(upload))
+
+    if not deduplicado:
+        # Miniaturas geradas fora do ciclo da requisição; o upload já foi gravado,
+        # então uma falha ao agendar só é registrada
+        try:
+            agendar_previews(comprovante.caminho)
+        except Exception as e:
+            current_app.logger.error(f"Erro ao agendar preview de {comprovante.caminho}: {e}")
+    return upload
+
+
+def cancelar_upload(upload):
+    """Descarta uma sessão em andamento e o arquivo parcial"""
+    with _hashes_lock:
+        _hashes_em_andamento.pop(upload.id, None)
+    if os.path.exists(caminho_parcial(upload)):
+        os.remove(caminho_parcial(upload))
+    db.session.delete(upload)
+    db.session.commit()
+
+
+def enviar_comprovante(caminho_relativo, nome_download=None):
+    """
+    Resposta de download de um arquivo sob UPLOAD_FOLDER, com suporte a
+    ETag/If-None-Match, Last-Modified e Range (send_file condicional).
+
+    O corpo é enviado pelo `wsgi.file_wrapper` do servidor (sendfile no gunicorn) ou,
+    com USE_X_SENDFILE, delegado ao proxy. Para arquivos endereçados por conteúdo,
+    o próprio SHA-256 é o ETag.
+
+    Returns:
+        Response ou None se o arquivo não existir
+    """
+    caminho = safe_join(current_app.config['UPLOAD_FOLDER'], caminho_relativo)
+    if caminho is None or not os.path.isfile(caminho):
+        return None
+
+    base = os.path.splitext(os.path.basename(caminho))[0]
+    etag = base if _NOME_ENDERECADO.match(base) else True
+
+    resposta = send_file(
+        caminho,
+        download_name=nome_download or os.path.basename(caminho),
+        etag=etag,
+        conditional=True,
+        max_age=0
+    )
+    resposta.cache_control.private = True
+    resposta.cache_control.no_cache = True
+    return resposta
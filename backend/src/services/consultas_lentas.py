@@ -0,0 +1,150 @@
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from flask import current_app, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LIMITE_MS_PADRAO = 500
+AMOSTRA_EXPLAIN_PADRAO = 0.1
+ARQUIVO_BYTES = 10 * 1024 * 1024
+ARQUIVOS_ANTIGOS = 5
+TAMANHO_MAXIMO_PARAMETRO = 200
+PARAMETROS_OMITIDOS = '<omitidos>'
+# Comandos na tabela de usuários ou com colunas de credenciais não têm os valores gravados
+_COMANDO_SENSIVEL = re.compile(r'\b(users|password_hash|senha|token\w*)\b', re.IGNORECASE)
+
+
+class RegistroConsultasLentas:
+    """
+    Resumo, neste processo, dos comandos que passaram do limite: ocorrências, tempo
+    total e máximo e a última rota de origem. O detalhe de cada ocorrência vai para
+    o log rotativo (uma linha JSON por comando).
+    """
+
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self.lock = threading.Lock()
+        self.comandos = {}
+        # Um logger por arquivo: aplicações no mesmo processo (ex.: testes) não duplicam linhas
+        self.logger = logging.getLogger(f'{__name__}.{os.path.abspath(arquivo)}')
+        self.logger.propagate = False
+
+    def _garantir_handler(self):
+        # Pasta e arquivo criados só na primeira consulta lenta, não na inicialização do worker
+        if not any(isinstance(handler, RotatingFileHandler) for handler in self.logger.handlers):
+            os.makedirs(os.path.dirname(self.arquivo) or '.', exist_ok=True)
+            handler = RotatingFileHandler(self.arquivo, maxBytes=ARQUIVO_BYTES,
+                                          backupCount=ARQUIVOS_ANTIGOS, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self.logger.addHandler(handler)
+            self.logger.setLevel(logging.INFO)
+
+    def registrar(self, registro):
+        with self.lock:
+            resumo = self.comandos.setdefault(registro['sql'], {'ocorrencias': 0, 'total_ms': 0.0, 'maximo_ms': 0.0})
+            resumo['ocorrencias'] += 1
+            resumo['total_ms'] += registro['duracao_ms']
+            resumo['maximo_ms'] = max(resumo['maximo_ms'], registro['duracao_ms'])
+            resumo['ultima_rota'] = registro['rota']
+            resumo['ultima_em'] = registro['em']
+            if registro.get('explain') is not None:
+                resumo['ultimo_explain'] = registro['explain']
+            self._garantir_handler()
+        self.logger.info(json.dumps(registro, ensure_ascii=False, default=str))
+
+    def resumo(self, limite=50):
+        """Comandos ordenados pelo tempo total gasto acima do limite"""
+        with self.lock:
+            itens = [{'sql': sql, **dados, 'total_ms': round(dados['total_ms'], 1),
+                      'media_ms': round(dados['total_ms'] / dados['ocorrencias'], 1)}
+                     for sql, dados in self.comandos.items()]
+        return sorted(itens, key=lambda item: item['total_ms'], reverse=True)[:limite]
+
+
+def _parametros(statement, parametros):
+    """Parâmetros do comando para o log, com valores longos truncados e credenciais omitidas"""
+    if _COMANDO_SENSIVEL.search(statement):
+        return PARAMETROS_OMITIDOS
+
+    def curto(valor):
+        texto = repr(valor)
+        return texto if len(texto) <= TAMANHO_MAXIMO_PARAMETRO else texto[:TAMANHO_MAXIMO_PARAMETRO] + '...'
+
+    if isinstance(parametros, dict):
+        return {chave: curto(valor) for chave, valor in parametros.items()}
+    if isinstance(parametros, (list, tuple)):
+        return [curto(valor) for valor in parametros]
+    return curto(parametros)
+
+
+def _explain(conn, statement, parametros):
+    """
+    EXPLAIN (ANALYZE, BUFFERS) do comando, num cursor à parte e dentro de um SAVEPOINT
+    para que uma falha não aborte a transação da requisição. Como o ANALYZE executa o
+    comando de novo, só é usado em SELECTs.
+    """
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute('SAVEPOINT explain_consulta_lenta')
+        try:
+            cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}', parametros)
+            plano = cursor.fetchone()[0]
+        except Exception:
+            cursor.execute('ROLLBACK TO SAVEPOINT explain_consulta_lenta')
+            raise
+        cursor.execute('RELEASE SAVEPOINT explain_consulta_lenta')
+        return plano
+    except Exception as e:
+        # O EXPLAIN é acessório: uma falha nele nunca interrompe a requisição
+        return {'erro': str(e)}
+    finally:
+        cursor.close()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _antes_de_executar(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._lenta_inicio = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _depois_de_executar(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, '_lenta_inicio', None)
+    if inicio is None or not has_app_context():
+        return
+    registro_app = current_app.extensions.get('consultas_lentas')
+    if registro_app is None:
+        return
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    if duracao_ms < current_app.config.get('CONSULTAS_LENTAS_MS', LIMITE_MS_PADRAO):
+        return
+
+    registro = {
+        'em': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+        'duracao_ms': round(duracao_ms, 1),
+        'sql': statement,
+        'parametros': _parametros(statement, parameters) if not executemany else f'executemany ({len(parameters)} linhas)',
+        'rota': (f'{request.method} {request.path} ({request.endpoint})' if has_request_context() else None)
+    }
+    amostra = current_app.config.get('CONSULTAS_LENTAS_AMOSTRA_EXPLAIN', AMOSTRA_EXPLAIN_PADRAO)
+    if (conn.dialect.name == 'postgresql' and not executemany and statement.lstrip()[:6].upper() == 'SELECT'
+            and random.random() < amostra):
+        registro['explain'] = _explain(conn, statement, parameters)
+    registro_app.registrar(registro)
+
+
+def configurar_consultas_lentas(app):
+    """
+    Registra os comandos SQL mais lentos que CONSULTAS_LENTAS_MS (com parâmetros e rota
+    de origem) em CONSULTAS_LENTAS_ARQUIVO, um log rotativo com uma linha JSON por
+    comando. No PostgreSQL, uma fração CONSULTAS_LENTAS_AMOSTRA_EXPLAIN dos SELECTs lentos
+    inclui o plano de `EXPLAIN (ANALYZE, BUFFERS)`.
+    """
+    app.extensions['consultas_lentas'] = RegistroConsultasLentas(app.config['CONSULTAS_LENTAS_ARQUIVO'])
@@ -0,0 +1,154 @@
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+
+CONTAGEM_CORRIDOS = 'corridos'
+CONTAGEM_CORRIDOS_DIA_UTIL = 'corridos_dia_util'
+CONTAGEM_UTEIS = 'uteis'
+TIPOS_CONTAGEM = (CONTAGEM_CORRIDOS, CONTAGEM_CORRIDOS_DIA_UTIL, CONTAGEM_UTEIS)
+# Cem anos: acima disso a data limite sairia do intervalo de `date` (ou a tabela ficaria enorme)
+PRAZO_MAXIMO_DIAS = 36500
+
+# (mês, dia) dos feriados de data fixa
+FERIADOS_NACIONAIS = ((1, 1), (4, 21), (5, 1), (9, 7), (10, 12), (11, 2), (11, 15), (12, 25))
+# São João, São Pedro, Emancipação Política de Alagoas e Zumbi dos Palmares (nacional desde 2024)
+FERIADOS_ALAGOAS = ((6, 24), (6, 29), (9, 16), (11, 20))
+# Maceió (sede do IMA/AL): Nossa Senhora dos Prazeres e Nossa Senhora da Conceição
+FERIADOS_MACEIO = ((8, 27), (12, 8))
+# Dias relativos à Páscoa: Carnaval (segunda e terça), Sexta-feira Santa e Corpus Christi
+FERIADOS_MOVEIS = (-48, -47, -2, 60)
+
+ANOS_POR_BLOCO = 20
+
+
+def pascoa(ano):
+    """Domingo de Páscoa (algoritmo de Meeus/Jones/Butcher, calendário gregoriano)"""
+    a, b, c = ano % 19, ano // 100, ano % 100
+    d, e = b // 4, b % 4
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes = (h + l - 7 * m + 114) // 31
+    dia = (h + l - 7 * m + 114) % 31 + 1
+    return date(ano, mes, dia)
+
+
+def feriados(ano):
+    """Feriados nacionais, de Alagoas e de Maceió que caem no ano"""
+    fixos = {date(ano, mes, dia) for mes, dia in FERIADOS_NACIONAIS + FERIADOS_ALAGOAS + FERIADOS_MACEIO}
+    domingo_pascoa = pascoa(ano)
+    return fixos | {domingo_pascoa + timedelta(days=dias) for dias in FERIADOS_MOVEIS}
+
+
+def prazo_valido(prazo_dias):
+    """Se o prazo informado (opcional) é um inteiro entre 0 e PRAZO_MAXIMO_DIAS"""
+    if prazo_dias is None:
+        return True
+    return isinstance(prazo_dias, int) and not isinstance(prazo_dias, bool) and 0 <= prazo_dias <= PRAZO_MAXIMO_DIAS
+
+
+class CalendarioUteis:
+    """
+    Tabela pré-calculada dos dias úteis (ordinais de `date.toordinal()`, em ordem, num
+    `array`), estendida em blocos de ANOS_POR_BLOCO anos conforme as datas pedidas.
+
+    Somar N dias úteis é uma busca binária seguida de um acesso por índice: O(log n),
+    sem percorrer os dias um a um.
+    """
+
+    def __init__(self, feriados_do_ano=feriados):
+        self.feriados_do_ano = feriados_do_ano
+        self.lock = threading.Lock()
+        self._primeiro_ano = None
+        self._ultimo_ano = None
+        self._uteis = array('i')
+
+    def _montar(self, primeiro_ano, ultimo_ano):
+        uteis = array('i')
+        for ano in range(primeiro_ano, ultimo_ano + 1):
+            nao_uteis = self.feriados_do_ano(ano)
+            dia = date(ano, 1, 1)
+            while dia.year == ano:
+                if dia.weekday() < 5 and dia not in nao_uteis:
+                    uteis.append(dia.toordinal())
+                dia += timedelta(days=1)
+        return uteis
+
+    def _tabela(self, ordinal, margem_dias=0):
+        """Tabela que cobre `ordinal` com `margem_dias` de folga para os dois lados"""
+        inicio = date.fromordinal(max(1, ordinal - margem_dias)).year
+        fim = date.fromordinal(ordinal + margem_dias).year + 1
+        if self._primeiro_ano is None or inicio < self._primeiro_ano or fim > self._ultimo_ano:
+            with self.lock:
+                primeiro = inicio - inicio % ANOS_POR_BLOCO
+                ultimo = fim - fim % ANOS_POR_BLOCO + ANOS_POR_BLOCO - 1
+                if self._primeiro_ano is not None:
+                    primeiro = min(primeiro, self._primeiro_ano)
+                    ultimo = max(ultimo, self._ultimo_ano)
+                if (primeiro, ultimo) != (self._primeiro_ano, self._ultimo_ano):
+                    # Troca a tabela inteira de uma vez: leitores concorrentes nunca veem uma parcial
+                    self._uteis = self._montar(primeiro, ultimo)
+                    self._primeiro_ano, self._ultimo_ano = primeiro, ultimo
+        return self._uteis
+
+    def eh_dia_util(self, data):
+        ordinal = data.toordinal()
+        uteis = self._tabela(ordinal)
+        indice = bisect_left(uteis, ordinal)
+        return indice < len(uteis) and uteis[indice] == ordinal
+
+    def proximo_dia_util(self, data):
+        """A própria data, se for dia útil; senão, o primeiro dia útil seguinte"""
+        ordinal = data.toordinal()
+        uteis = self._tabela(ordinal, margem_dias=31)
+        return date.fromordinal(uteis[bisect_left(uteis, ordinal)])
+
+    def somar_dias_uteis(self, data, dias):
+        """
+        Data `dias` dias úteis depois de `data`, excluindo o dia de início (que não
+        precisa ser útil). Com `dias` negativo, conta para trás.
+        """
+        if dias == 0:
+            return data
+        ordinal = data.toordinal()
+        # Folga generosa: no máximo ~40% dos dias de um período deixam de ser úteis
+        uteis = self._tabela(ordinal, margem_dias=abs(dias) * 2 + 31)
+        if dias > 0:
+            return date.fromordinal(uteis[bisect_right(uteis, ordinal) + dias - 1])
+        return date.fromordinal(uteis[bisect_left(uteis, ordinal) + dias])
+
+    def calcular_data_limite(self, data_base, prazo_dias, tipo_contagem=CONTAGEM_CORRIDOS):
+        """
+        Data limite de um prazo contado a partir de `data_base`:
+
+        - 'corridos': data_base + prazo_dias (dias de calendário);
+        - 'corridos_dia_util': idem, prorrogada para o próximo dia útil se cair em fim de semana ou feriado;
+        - 'uteis': prazo_dias dias úteis após data_base.
+        """
+        if tipo_contagem == CONTAGEM_UTEIS:
+            return self.somar_dias_uteis(data_base, prazo_dias)
+        data_limite = data_base + timedelta(days=prazo_dias)
+        if tipo_contagem == CONTAGEM_CORRIDOS_DIA_UTIL:
+            return self.proximo_dia_util(data_limite)
+        if tipo_contagem != CONTAGEM_CORRIDOS:
+            raise ValueError(f'Tipo de contagem inválido: {tipo_contagem}')
+        return data_limite
+
+    def calcular_datas_limite(self, prazos):
+        """
+        Versão em lote de calcular_data_limite para milhares de prazos: recebe um iterável
+        de (data_base, prazo_dias, tipo_contagem) e devolve a lista das datas limite.
+        """
+        return [self.calcular_data_limite(data_base, prazo_dias, tipo_contagem or CONTAGEM_CORRIDOS)
+                for data_base, prazo_dias, tipo_contagem in prazos]
+
+
+# Tabela compartilhada pelo processo (montada na primeira utilização)
+calendario = CalendarioUteis()
+
+
+def calcular_data_limite(data_base, prazo_dias, tipo_contagem=CONTAGEM_CORRIDOS):
+    return calendario.calcular_data_limite(data_base, prazo_dias, tipo_contagem)
@@ -0,0 +1,132 @@
+import gzip
+import mimetypes
+import os
+import re
+from flask import request, send_file
+
+# Arquivos gerados pelo Vite com hash no nome (ex.: assets/index-BxYz12Ab.js) nunca mudam de conteúdo
+_ASSET_COM_HASH = re.compile(r'(^|/)assets/.+[-.][A-Za-z0-9_-]{8,}\.\w+$')
+# Variantes pré-comprimidas, na ordem de preferência
+_CODIFICACOES = (('br', '.br'), ('gzip', '.gz'))
+_EXTENSOES_COMPRIMIVEIS = {'.html', '.js', '.mjs', '.css', '.json', '.svg', '.txt', '.xml', '.map', '.wasm'}
+MAX_AGE_IMUTAVEL = 365 * 24 * 3600
+
+
+class ManifestoEstatico:
+    """
+    Índice em memória dos arquivos da pasta estática, montado na inicialização.
+
+    Evita `os.path.exists` a cada requisição e registra, para cada arquivo, o ETag,
+    se o nome contém hash (cache imutável) e quais variantes .br/.gz existem.
+    """
+
+    def __init__(self, pasta, recarregar_se_ausente=False):
+        self.pasta = pasta
+        self.recarregar_se_ausente = recarregar_se_ausente
+        self.arquivos = {}
+        self.carregar()
+
+    def carregar(self):
+        arquivos = {}
+        if self.pasta and os.path.isdir(self.pasta):
+            for raiz, _, nomes in os.walk(self.pasta):
+                for nome in nomes:
+                    caminho = os.path.join(raiz, nome)
+                    relativo = os.path.relpath(caminho, self.pasta).replace(os.sep, '/')
+                    if any(relativo.endswith(sufixo) for _, sufixo in _CODIFICACOES) and \
+                            os.path.exists(caminho.rsplit('.', 1)[0]):
+                        continue  # Variante de outro arquivo, registrada junto do original
+
+                    info = os.stat(caminho)
+                    arquivos[relativo] = {
+                        'caminho': caminho,
+                        'mimetype': mimetypes.guess_type(nome)[0] or 'application/octet-stream',
+                        'etag': f'{int(info.st_mtime_ns):x}-{info.st_size:x}',
+                        'modificado_em': info.st_mtime,
+                        'imutavel': bool(_ASSET_COM_HASH.search(relativo)),
+                        'variantes': {
+                            codificacao: caminho + sufixo
+                            for codificacao, sufixo in _CODIFICACOES
+                            if os.path.exists(caminho + sufixo)
+                        }
+                    }
+        self.arquivos = arquivos
+
+    def _obter(self, caminho):
+        entrada = self.arquivos.get(caminho)
+        if entrada is None and self.recarregar_se_ausente:
+            self.carregar()
+            entrada = self.arquivos.get(caminho)
+        return entrada
+
+    def servir(self, caminho):
+        """Serve o arquivo pedido ou, como fallback da SPA, o index.html"""
+        entrada = self._obter(caminho) if caminho else None
+        if entrada is None:
+            entrada = self._obter('index.html')
+            if entrada is None:
+                return "index.html not found", 404
+
+        codificacao = None
+        for candidata in entrada['variantes']:
+            if request.accept_encodings[candidata]:
+                codificacao = candidata
+                break
+
+        arquivo = entrada['variantes'][codificacao] if codificacao else entrada['caminho']
+        resposta = send_file(
+            arquivo,
+            mimetype=entrada['mimetype'],
+            etag=f"{entrada['etag']}-{codificacao}" if codificacao else entrada['etag'],
+            last_modified=entrada['modificado_em'],
+            conditional=True
+        )
+
+        if codificacao:
+            resposta.headers['Content-Encoding'] = codificacao
+        if entrada['variantes']:
+            resposta.vary.add('Accept-Encoding')
+
+        if entrada['imutavel']:
+            resposta.cache_control.public = True
+            resposta.cache_control.max_age = MAX_AGE_IMUTAVEL
+            resposta.cache_control.immutable = True
+        else:
+            # index.html e demais arquivos sem hash: sempre revalidar (barato com ETag)
+            resposta.cache_control.no_cache = True
+        return resposta
+
+
+def gerar_variantes_comprimidas(pasta):
+    """
+    Gera arquivos .gz (e .br, se o pacote `brotli` estiver instalado) ao lado dos
+    arquivos estáticos comprimíveis. Pensado para rodar após o build do frontend.
+
+    Returns:
+        list: Caminhos das variantes geradas
+    """
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    geradas = []
+    for raiz, _, nomes in os.walk(pasta):
+        for nome in nomes:
+            if os.path.splitext(nome)[1].lower() not in _EXTENSOES_COMPRIMIVEIS:
+                continue
+            caminho = os.path.join(raiz, nome)
+            with open(caminho, 'rb') as arquivo:
+                conteudo = arquivo.read()
+
+            variantes = [('.gz', gzip.compress(conteudo, compresslevel=9, mtime=0))]
+            if brotli:
+                variantes.append(('.br', brotli.compress(conteudo, quality=11)))
+
+            for sufixo, comprimido in variantes:
+                if len(comprimido) >= len(conteudo):
+                    continue
+                with open(caminho + sufixo, 'wb') as arquivo:
+                    arquivo.write(comprimido)
+                geradas.append(caminho + sufixo)
+    return geradas
@@ -0,0 +1,229 @@
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+from src.models.user import db
+from src.models.licenciamento import Empresa, Licenca, Condicionante
+
+# Linhas buscadas por ida ao banco (cursor do lado do servidor no PostgreSQL)
+LINHAS_POR_LOTE = 1000
+# Início de texto que o Excel interpreta como fórmula
+PREFIXOS_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+COLUNAS_CONDICIONANTES = [
+    ('ID', Condicionante.id),
+    ('Empresa', Empresa.razao_social),
+    ('CNPJ', Empresa.cnpj),
+    ('Licença', Licenca.tipo_licenca),
+    ('Número da Licença', Licenca.numero_licenca),
+    ('Descrição', Condicionante.descricao),
+    ('Prazo (dias)', Condicionante.prazo_dias),
+    ('Data Limite', Condicionante.data_limite),
+    ('Status', Condicionante.status),
+    ('Responsável', Condicionante.responsavel),
+    ('Data de Envio/Cumprimento', Condicionante.data_envio_cumprimento),
+    ('Observações', Condicionante.observacoes),
+]
+
+COLUNAS_LICENCAS = [
+    ('ID', Licenca.id),
+    ('Empresa', Empresa.razao_social),
+    ('CNPJ', Empresa.cnpj),
+    ('Tipo de Licença', Licenca.tipo_licenca),
+    ('Número', Licenca.numero_licenca),
+    ('Órgão Emissor', Licenca.orgao_emissor),
+    ('Data de Emissão', Licenca.data_emissao),
+    ('Data de Vencimento', Licenca.data_vencimento),
+    ('Status', Licenca.status),
+    ('Observações', Licenca.observacoes),
+]
+
+
+def consulta_condicionantes(licenca_id=None, empresa_id=None, status=None):
+    """Consulta única (condicionante + licença + empresa) com os mesmos filtros da listagem"""
+    stmt = (
+        db.select(*[coluna for _, coluna in COLUNAS_CONDICIONANTES])
+        .join(Licenca, Condicionante.licenca_id == Licenca.id)
+        .join(Empresa, Licenca.empresa_id == Empresa.id)
+        .order_by(Condicionante.id)
+    )
+    if licenca_id:
+        stmt = stmt.where(Condicionante.licenca_id == licenca_id)
+    if empresa_id:
+        stmt = stmt.where(Licenca.empresa_id == empresa_id)
+    if status:
+        stmt = stmt.where(Condicionante.status == status)
+    return stmt
+
+
+def consulta_licencas(empresa_id=None, status=None):
+    """Consulta única (licença + empresa) com os mesmos filtros da listagem"""
+    stmt = (
+        db.select(*[coluna for _, coluna in COLUNAS_LICENCAS])
+        .join(Empresa, Licenca.empresa_id == Empresa.id)
+        .order_by(Licenca.id)
+    )
+    if empresa_id:
+        stmt = stmt.where(Licenca.empresa_id == empresa_id)
+    if status:
+        stmt = stmt.where(Licenca.status == status)
+    return stmt
+
+
+def _neutralizar_formula(valor):
+    """Prefixa com ' os textos que o Excel executaria como fórmula (ex.: =HYPERLINK(...))"""
+    if isinstance(valor, str) and valor.startswith(PREFIXOS_FORMULA):
+        return "'" + valor
+    return valor
+
+
+def _linhas(stmt):
+    """Itera as linhas da consulta sem carregá-las todas (stream_results + yield_per)"""
+    return db.session.execute(stmt.execution_options(yield_per=LINHAS_POR_LOTE))
+
+
+def gerar_csv(stmt, cabecalhos):
+    """
+    Gera o CSV em pedaços à medida que as linhas chegam do banco.
+
+    Usa ';' como separador e BOM UTF-8 para abrir corretamente no Excel em português.
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=';')
+
+    buffer.write('\ufeff')
+    escritor.writerow(cabecalhos)
+
+    for numero, linha in enumerate(_linhas(stmt), start=1):
+        escritor.writerow(['' if valor is None else _neutralizar_formula(valor) for valor in linha])
+        if numero % LINHAS_POR_LOTE == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode('utf-8')
+
+
+class _SaidaZip:
+    """Destino não posicionável para o ZipFile: acumula bytes até serem consumidos"""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def consumir(self):
+        dados = b''.join(self._partes)
+        self._partes = []
+        return dados
+
+
+_CARACTERES_INVALIDOS_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_EPOCH_EXCEL = date(1899, 12, 30)
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+# Estilo 0: padrão; estilo 1: data (formato embutido 14)
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+    '<borders count="1"><border/></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+def _workbook(nome_planilha):
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(nome_planilha[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+
+def _celula_xlsx(valor):
+    if valor is None:
+        return '<c/>'
+    if isinstance(valor, bool):
+        return f'<c t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float)):
+        return f'<c><v>{valor}</v></c>'
+    if isinstance(valor, datetime):
+        valor = valor.date()
+    if isinstance(valor, date):
+        return f'<c s="1"><v>{(valor - _EPOCH_EXCEL).days}</v></c>'
+    texto = escape(_CARACTERES_INVALIDOS_XML.sub('', _neutralizar_formula(str(valor))))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _linha_xlsx(valores):
+    return '<row>' + ''.join(_celula_xlsx(valor) for valor in valores) + '</row>'
+
+
+def gerar_xlsx(stmt, cabecalhos, nome_planilha='Planilha1'):
+    """
+    Gera uma planilha XLSX em pedaços, sem bibliotecas externas.
+
+    O pacote ZIP é escrito em modo de fluxo (com data descriptors), então os bytes
+    da planilha saem à medida que as linhas chegam do banco e a memória usada não
+    depende do número de linhas.
+    """
+    saida = _SaidaZip()
+    with zipfile.ZipFile(saida, 'w', compression=zipfile.ZIP_DEFLATED) as pacote:
+        pacote.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        pacote.writestr('_rels/.rels', _RELS)
+        pacote.writestr('xl/workbook.xml', _workbook(nome_planilha))
+        pacote.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        pacote.writestr('xl/styles.xml', _STYLES)
+
+        with pacote.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as planilha:
+            planilha.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            planilha.write(_linha_xlsx(cabecalhos).encode('utf-8'))
+            yield saida.consumir()
+
+            for numero, linha in enumerate(_linhas(stmt), start=1):
+                planilha.write(_linha_xlsx(linha).encode('utf-8'))
+                if numero % LINHAS_POR_LOTE == 0:
+                    yield saida.consumir()
+
+            planilha.write(b'</sheetData></worksheet>')
+
+    yield saida.consumir()
@@ -1,11 +1,9 @@
 import os
 import json
 from datetime import datetime, timedelta
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+
+# As bibliotecas do Google (googleapiclient, google-auth) são importadas só no primeiro
+# uso: elas pesam na inicialização de cada worker e a maioria das requisições não as usa.
 
 # Escopos necessários para o Google Calendar
 SCOPES = ['https://www.googleapis.com/auth/calendar']
@@ -28,6 +26,10 @@ class GoogleCalendarService:
         """
         Realiza a autenticação com o Google Calendar API
         """
+        from google.auth.transport.requests import Request
+        from google.oauth2.credentials import Credentials
+        from googleapiclient.discovery import build
+
         creds = None
         
         # Verifica se já existe um token salvo
@@ -68,6 +70,8 @@ class GoogleCalendarService:
             if not self.authenticate():
                 return None
         
+        from googleapiclient.errors import HttpError
+
         try:
             # Configura lembretes padrão se não fornecidos
             if reminders is None:
@@ -130,6 +134,8 @@ class GoogleCalendarService:
             if not self.authenticate():
                 return None
         
+        from googleapiclient.errors import HttpError
+
         try:
             # Busca o evento atual
             event = self.service.events().get(
@@ -180,6 +186,8 @@ class GoogleCalendarService:
             if not self.authenticate():
                 return False
         
+        from googleapiclient.errors import HttpError
+
         try:
             self.service.events().delete(
                 calendarId='primary',
@@ -0,0 +1,205 @@
+import json
+import time
+from datetime import datetime, date
+from src.models.user import db
+from src.models.licenciamento import Empresa, Licenca, Condicionante
+from src.services.dias_uteis import TIPOS_CONTAGEM, CONTAGEM_CORRIDOS, PRAZO_MAXIMO_DIAS, calcular_data_limite, prazo_valido
+
+TAMANHO_LOTE_PADRAO = 500
+MAX_ERROS_REPORTADOS = 100
+
+
+def _converter_data(valor):
+    return datetime.strptime(valor, '%Y-%m-%d').date() if valor else None
+
+
+def _texto(valor, campo):
+    # Um número ou objeto aqui faria o banco rejeitar o lote inteiro
+    if valor is not None and not isinstance(valor, str):
+        raise ValueError(f'{campo} deve ser um texto')
+    return valor
+
+
+def _converter_documento(documento, empresas_por_cnpj):
+    """
+    Converte um documento NDJSON em (dados da licença, lista de dados das condicionantes).
+
+    Formato esperado de cada linha:
+        {"cnpj_empresa": "...", "tipo_licenca": "...", "data_vencimento": "YYYY-MM-DD",
+         "numero_licenca": ..., "orgao_emissor": ..., "data_emissao": ..., "status": ..., "observacoes": ...,
+         "condicionantes": [{"descricao": "...", "prazo_dias": 120, "tipo_contagem": "uteis", "data_limite": ..., "status": ...,
+                             "responsavel": ..., "observacoes": ..., "data_envio_cumprimento": ...}]}
+    """
+    if not isinstance(documento, dict):
+        raise ValueError('Cada linha deve conter um objeto JSON')
+
+    cnpj = ''.join(filter(str.isdigit, str(documento.get('cnpj_empresa') or '')))
+    if not cnpj:
+        raise ValueError('cnpj_empresa é obrigatório')
+    empresa_id = empresas_por_cnpj.get(cnpj)
+    if empresa_id is None:
+        raise ValueError(f'Empresa com CNPJ {cnpj} não encontrada')
+    if not _texto(documento.get('tipo_licenca'), 'tipo_licenca'):
+        raise ValueError('tipo_licenca é obrigatório')
+    if not documento.get('data_vencimento'):
+        raise ValueError('data_vencimento é obrigatória')
+
+    agora = datetime.utcnow()
+    data_emissao = _converter_data(documento.get('data_emissao'))
+    licenca = {
+        'empresa_id': empresa_id,
+        'tipo_licenca': documento['tipo_licenca'],
+        'numero_licenca': documento.get('numero_licenca'),
+        'orgao_emissor': documento.get('orgao_emissor') or 'IMA/AL',
+        'data_emissao': data_emissao,
+        'data_vencimento': _converter_data(documento['data_vencimento']),
+        'status': _texto(documento.get('status'), 'status') or 'ativa',
+        'observacoes': documento.get('observacoes'),
+        'created_at': agora,
+        'updated_at': agora
+    }
+
+    itens = documento.get('condicionantes') or []
+    if not isinstance(itens, list):
+        raise ValueError('condicionantes deve ser uma lista de objetos JSON')
+
+    condicionantes = []
+    for item in itens:
+        if not isinstance(item, dict):
+            raise ValueError('Cada condicionante deve ser um objeto JSON')
+        if not _texto(item.get('descricao'), 'descricao'):
+            raise ValueError('Descrição da condicionante é obrigatória')
+
+        tipo_contagem = item.get('tipo_contagem') or CONTAGEM_CORRIDOS
+        if tipo_contagem not in TIPOS_CONTAGEM:
+            raise ValueError(f'tipo_contagem inválido: {tipo_contagem}')
+
+        prazo_dias = item.get('prazo_dias')
+        if not prazo_valido(prazo_dias):
+            raise ValueError(f'prazo_dias deve ser um inteiro entre 0 e {PRAZO_MAXIMO_DIAS}')
+        # Mesma regra de criar_condicionante: prazo_dias tem precedência sobre data_limite
+        if prazo_dias:
+            data_limite = calcular_data_limite(data_emissao or date.today(), prazo_dias, tipo_contagem)
+        else:
+            data_limite = _converter_data(item.get('data_limite'))
+
+        condicionantes.append({
+            'descricao': item['descricao'],
+            'prazo_dias': prazo_dias,
+            'tipo_contagem': tipo_contagem,
+            'data_limite': data_limite,
+            'status': _texto(item.get('status'), 'status da condicionante') or 'pendente',
+            'responsavel': item.get('responsavel'),
+            'observacoes': item.get('observacoes'),
+            'data_envio_cumprimento': _converter_data(item.get('data_envio_cumprimento')),
+            'created_at': agora,
+            'updated_at': agora
+        })
+
+    return licenca, condicionantes
+
+
+def _inserir_lote(lote):
+    """
+    Insere um lote de licenças com um INSERT ... RETURNING e, em seguida, todas as
+    condicionantes do lote com um único INSERT em massa, numa só transação.
+    """
+    licenca_ids = db.session.execute(
+        db.insert(Licenca).returning(Licenca.id, sort_by_parameter_order=True),
+        [licenca for licenca, _ in lote]
+    ).scalars().all()
+
+    condicionantes = [
+        {**condicionante, 'licenca_id': licenca_id}
+        for licenca_id, (_, itens) in zip(licenca_ids, lote)
+        for condicionante in itens
+    ]
+    if condicionantes:
+        db.session.execute(db.insert(Condicionante), condicionantes)
+
+    db.session.commit()
+    return len(licenca_ids), len(condicionantes)
+
+
+def importar_ndjson(linhas, tamanho_lote=TAMANHO_LOTE_PADRAO):
+    """
+    Importa licenças (com suas condicionantes) a partir de linhas NDJSON.
+
+    As linhas são consumidas como um fluxo, então o arquivo nunca é carregado inteiro
+    em memória. O mapa CNPJ -> empresa_id é carregado uma única vez e cada lote de
+    `tamanho_lote` licenças é gravado em uma transação própria. Linhas inválidas são
+    ignoradas e reportadas; um lote que falhe no banco é desfeito por inteiro.
+
+    Args:
+        linhas: Iterável de linhas (str ou bytes), por exemplo um arquivo aberto
+        tamanho_lote: Quantidade de licenças por transação
+
+    Returns:
+        dict: Estatísticas da importação, incluindo a vazão em linhas/segundo
+    """
+    inicio = time.perf_counter()
+    empresas_por_cnpj = dict(db.session.execute(db.select(Empresa.cnpj, Empresa.id)).all())
+
+    linhas_lidas = 0
+    licencas_importadas = 0
+    condicionantes_importadas = 0
+    total_erros = 0
+    erros = []
+
+    def registrar_erro(numero_linha, mensagem):
+        nonlocal total_erros
+        total_erros += 1
+        if len(erros) < MAX_ERROS_REPORTADOS:
+            erros.append({'linha': numero_linha, 'erro': mensagem})
+
+    def gravar(lote, numeros_linhas):
+        nonlocal licencas_importadas, condicionantes_importadas
+        try:
+            qtd_licencas, qtd_condicionantes = _inserir_lote(lote)
+            licencas_importadas += qtd_licencas
+            condicionantes_importadas += qtd_condicionantes
+        except Exception as e:
+            db.session.rollback()
+            for numero_linha in numeros_linhas:
+                registrar_erro(numero_linha, f'Lote rejeitado pelo banco: {e}')
+
+    lote = []
+    numeros_linhas = []
+    for numero_linha, linha in enumerate(linhas, start=1):
+        if isinstance(linha, bytes):
+            try:
+                linha = linha.decode('utf-8')
+            except UnicodeDecodeError:
+                linhas_lidas += 1
+                registrar_erro(numero_linha, 'Linha não está codificada em UTF-8')
+                continue
+        linha = linha.strip()
+        if not linha:
+            continue
+        linhas_lidas += 1
+
+        try:
+            lote.append(_converter_documento(json.loads(linha), empresas_por_cnpj))
+            numeros_linhas.append(numero_linha)
+        except (ValueError, TypeError) as e:
+            registrar_erro(numero_linha, str(e))
+            continue
+
+        if len(lote) >= tamanho_lote:
+            gravar(lote, numeros_linhas)
+            lote, numeros_linhas = [], []
+
+    if lote:
+        gravar(lote, numeros_linhas)
+
+    segundos = time.perf_counter() - inicio
+    linhas_gravadas = licencas_importadas + condicionantes_importadas
+    return {
+        'linhas_lidas': linhas_lidas,
+        'licencas_importadas': licencas_importadas,
+        'condicionantes_importadas': condicionantes_importadas,
+        'total_erros': total_erros,
+        'erros': erros,
+        'segundos': round(segundos, 3),
+        'linhas_por_segundo': round(linhas_gravadas / segundos, 1) if segundos > 0 else None
+    }
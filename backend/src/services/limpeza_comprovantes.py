@@ -0,0 +1,154 @@
+import os
+import shutil
+import time
+from flask import current_app
+from src.models.user import db
+from src.models.licenciamento import Condicionante, Comprovante
+from src.services.previews import SUFIXO_FALHA, TAMANHOS_PREVIEW, caminho_falha, caminho_preview
+
+TAMANHO_LOTE_PADRAO = 1000
+CARENCIA_PADRAO_HORAS = 24
+
+_SUFIXOS_PREVIEW = tuple(f'.{tamanho}.jpg' for tamanho in TAMANHOS_PREVIEW) + (SUFIXO_FALHA,)
+
+
+def _percorrer_arquivos(raiz):
+    """
+    Percorre a árvore com os.scandir mantendo em memória apenas a pilha de pastas
+    pendentes, nunca a lista completa de arquivos.
+    """
+    pendentes = [raiz]
+    while pendentes:
+        with os.scandir(pendentes.pop()) as entradas:
+            for entrada in entradas:
+                if entrada.is_dir(follow_symlinks=False):
+                    pendentes.append(entrada.path)
+                elif entrada.is_file(follow_symlinks=False):
+                    yield entrada
+
+
+def _caminhos_referenciados(caminhos):
+    """Dos caminhos informados, retorna os que ainda são usados por alguma condicionante"""
+    consulta = db.union(
+        db.select(Condicionante.comprovante_path).where(Condicionante.comprovante_path.in_(caminhos)),
+        db.select(Comprovante.caminho).where(Comprovante.caminho.in_(caminhos), Comprovante.referencias > 0)
+    )
+    return set(db.session.execute(consulta).scalars())
+
+
+def _remover(pasta_uploads, relativo, pasta_quarentena, limite_mtime):
+    """
+    Remove (ou move para a quarentena) o arquivo e suas miniaturas; retorna os bytes
+    liberados, ou None se o arquivo foi substituído por um upload recente (mtime novo).
+    """
+    try:
+        if os.path.getmtime(os.path.join(pasta_uploads, relativo)) > limite_mtime:
+            return None
+    except FileNotFoundError:
+        return 0
+    liberados = 0
+    for alvo in [relativo, caminho_falha(relativo)] + [caminho_preview(relativo, tamanho) for tamanho in TAMANHOS_PREVIEW]:
+        absoluto = os.path.join(pasta_uploads, alvo)
+        try:
+            tamanho = os.path.getsize(absoluto)
+            if pasta_quarentena:
+                destino = os.path.join(pasta_quarentena, alvo)
+                os.makedirs(os.path.dirname(destino), exist_ok=True)
+                shutil.move(absoluto, destino)
+            else:
+                os.remove(absoluto)
+            liberados += tamanho
+        except FileNotFoundError:
+            continue
+    return liberados
+
+
+def coletar_comprovantes_orfaos(carencia_horas=CARENCIA_PADRAO_HORAS, tamanho_lote=TAMANHO_LOTE_PADRAO,
+                                quarentena=False, simular=False):
+    """
+    Remove arquivos de `uploads/comprovantes` que nenhuma condicionante referencia.
+
+    A pasta é percorrida em lotes de `tamanho_lote` arquivos; para cada lote, uma
+    única consulta informa quais caminhos ainda são referenciados. Arquivos mais novos
+    que a carência são ignorados, protegendo uploads que ainda estão sendo vinculados.
+    Miniaturas acompanham o arquivo original.
+
+    Args:
+        carencia_horas: Idade mínima (pela data de modificação) para um arquivo ser coletado
+        tamanho_lote: Arquivos verificados por consulta ao banco
+        quarentena: Move para `uploads/quarentena` em vez de apagar
+        simular: Apenas informa o que seria removido
+
+    Returns:
+        dict: Contagens e bytes recuperados
+    """
+    pasta_uploads = current_app.config['UPLOAD_FOLDER']
+    raiz = os.path.join(pasta_uploads, 'comprovantes')
+    pasta_quarentena = os.path.join(pasta_uploads, 'quarentena') if quarentena else None
+    limite_mtime = time.time() - carencia_horas * 3600
+
+    resultado = {
+        'arquivos_analisados': 0,
+        'ignorados_por_carencia': 0,
+        'arquivos_removidos': 0,
+        'bytes_recuperados': 0,
+        'modo': 'simulacao' if simular else ('quarentena' if quarentena else 'remocao')
+    }
+    if not os.path.isdir(raiz):
+        return resultado
+
+    def processar(lote):
+        referenciados = _caminhos_referenciados(list(lote))
+        orfaos = [relativo for relativo in lote if relativo not in referenciados]
+        if not orfaos:
+            return
+
+        if simular:
+            resultado['arquivos_removidos'] += len(orfaos)
+            resultado['bytes_recuperados'] += sum(lote[relativo] for relativo in orfaos)
+            return
+
+        # Trava os metadados dos órfãos até o commit: vínculos por deduplicação (que também
+        # travam a linha) esperam, e um upload do mesmo conteúdo não recria a linha no meio da coleta
+        com_metadados = set(db.session.execute(
+            db.select(Comprovante.caminho).where(Comprovante.caminho.in_(orfaos)).with_for_update()
+        ).scalars())
+        # Só os que continuam sem referência: um vínculo feito depois da consulta acima mantém a linha
+        apagados = set(db.session.execute(
+            db.delete(Comprovante)
+            .where(Comprovante.caminho.in_(orfaos), Comprovante.referencias <= 0)
+            .returning(Comprovante.caminho),
+            execution_options={'synchronize_session': False}
+        ).scalars())
+        try:
+            for relativo in orfaos:
+                if relativo in com_metadados and relativo not in apagados:
+                    continue
+                liberados = _remover(pasta_uploads, relativo, pasta_quarentena, limite_mtime)
+                if liberados is not None:
+                    resultado['arquivos_removidos'] += 1
+                    resultado['bytes_recuperados'] += liberados
+        finally:
+            db.session.commit()
+
+    lote = {}
+    for entrada in _percorrer_arquivos(raiz):
+        if entrada.name.endswith(_SUFIXOS_PREVIEW) or entrada.name.endswith('.tmp'):
+            continue  # Tratados junto do arquivo original
+
+        resultado['arquivos_analisados'] += 1
+        info = entrada.stat(follow_symlinks=False)
+        if info.st_mtime > limite_mtime:
+            resultado['ignorados_por_carencia'] += 1
+            continue
+
+        relativo = os.path.relpath(entrada.path, pasta_uploads).replace(os.sep, '/')
+        lote[relativo] = info.st_size
+        if len(lote) >= tamanho_lote:
+            processar(lote)
+            lote = {}
+
+    if lote:
+        processar(lote)
+
+    return resultado
@@ -0,0 +1,153 @@
+import bisect
+import threading
+import time
+from collections import Counter, defaultdict
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+BUCKETS_DURACAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 500)
+LIMITE_N_MAIS_1_PADRAO = 10
+
+
+class _Histograma:
+    def __init__(self, limites):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)
+        self.soma = 0
+        self.total = 0
+
+    def observar(self, valor):
+        self.contagens[bisect.bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+    def linhas(self, nome, rotulos):
+        acumulado = 0
+        for limite, contagem in zip(self.limites + ('+Inf',), self.contagens):
+            acumulado += contagem
+            yield f'{nome}_bucket{{{rotulos},le="{limite}"}} {acumulado}'
+        yield f'{nome}_sum{{{rotulos}}} {round(self.soma, 6)}'
+        yield f'{nome}_count{{{rotulos}}} {self.total}'
+
+
+class RegistroMetricas:
+    """
+    Métricas acumuladas neste processo, por rota. Com vários workers (gunicorn),
+    cada um expõe as suas; o Prometheus agrega pelo rótulo da instância.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requisicoes = Counter()
+        self.duracao = defaultdict(lambda: _Histograma(BUCKETS_DURACAO))
+        self.tamanho_resposta = defaultdict(lambda: _Histograma(BUCKETS_BYTES))
+        self.consultas_por_requisicao = defaultdict(lambda: _Histograma(BUCKETS_CONSULTAS))
+        self.consultas = Counter()
+        self.tempo_banco = Counter()
+
+    def registrar(self, rota, metodo, status, duracao, tamanho, consultas, tempo_banco):
+        with self.lock:
+            self.requisicoes[rota + (metodo, status)] += 1
+            self.duracao[rota + (metodo,)].observar(duracao)
+            if tamanho is not None:
+                self.tamanho_resposta[rota + (metodo,)].observar(tamanho)
+            self.consultas_por_requisicao[rota + (metodo,)].observar(consultas)
+            self.consultas[rota + (metodo,)] += consultas
+            self.tempo_banco[rota + (metodo,)] += tempo_banco
+
+    def exportar(self):
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)"""
+        def rotulos(chave, *extras):
+            nomes = ('blueprint', 'endpoint', 'metodo') + extras
+            return ','.join(f'{nome}="{valor}"' for nome, valor in zip(nomes, chave))
+
+        with self.lock:
+            linhas = [
+                '# HELP http_requisicoes_total Requisições atendidas',
+                '# TYPE http_requisicoes_total counter'
+            ]
+            linhas += [f'http_requisicoes_total{{{rotulos(chave, "status")}}} {valor}'
+                       for chave, valor in sorted(self.requisicoes.items())]
+
+            for nome, ajuda, historicos in (
+                ('http_duracao_segundos', 'Tempo de resposta', self.duracao),
+                ('http_resposta_bytes', 'Tamanho do corpo da resposta', self.tamanho_resposta),
+                ('sql_consultas_por_requisicao', 'Comandos SQL por requisição', self.consultas_por_requisicao)
+            ):
+                linhas += [f'# HELP {nome} {ajuda}', f'# TYPE {nome} histogram']
+                for chave, histograma in sorted(historicos.items()):
+                    linhas += histograma.linhas(nome, rotulos(chave))
+
+            linhas += ['# HELP sql_consultas_total Comandos SQL executados', '# TYPE sql_consultas_total counter']
+            linhas += [f'sql_consultas_total{{{rotulos(chave)}}} {valor}' for chave, valor in sorted(self.consultas.items())]
+            linhas += ['# HELP sql_duracao_segundos_total Tempo gasto no banco',
+                       '# TYPE sql_duracao_segundos_total counter']
+            linhas += [f'sql_duracao_segundos_total{{{rotulos(chave)}}} {round(valor, 6)}'
+                       for chave, valor in sorted(self.tempo_banco.items())]
+        return '\n'.join(linhas) + '\n'
+
+
+def _sql_da_requisicao():
+    """Contadores SQL da requisição em andamento (None fora de requisições, ex.: CLI)"""
+    if not has_request_context():
+        return None
+    return g.get('_metricas_sql')
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _antes_de_executar(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metricas_inicio = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _depois_de_executar(conn, cursor, statement, parameters, context, executemany):
+    sql = _sql_da_requisicao()
+    if sql is not None:
+        inicio = getattr(context, '_metricas_inicio', None)
+        if inicio is not None:
+            sql['tempo'] += time.perf_counter() - inicio
+        sql['comandos'][statement] += 1
+
+
+def _iniciar_requisicao():
+    g._metricas_inicio = time.perf_counter()
+    g._metricas_sql = {'tempo': 0.0, 'comandos': Counter()}
+
+
+def _finalizar_requisicao(resposta):
+    inicio = g.pop('_metricas_inicio', None)
+    sql = g.pop('_metricas_sql', None)
+    if inicio is None or request.endpoint == 'metricas.exportar_metricas':
+        return resposta
+
+    endpoint = request.endpoint or 'sem_rota'
+    rota = (request.blueprint or '', endpoint)
+    consultas = sum(sql['comandos'].values())
+    # Respostas em streaming não têm tamanho conhecido aqui e não são contadas no histograma de bytes
+    tamanho = None if resposta.is_streamed else resposta.calculate_content_length()
+
+    current_app.extensions['metricas'].registrar(
+        rota, request.method, str(resposta.status_code),
+        time.perf_counter() - inicio, tamanho, consultas, sql['tempo']
+    )
+
+    if sql['comandos']:
+        comando, repeticoes = sql['comandos'].most_common(1)[0]
+        limite = current_app.config.get('METRICAS_LIMITE_N_MAIS_1', LIMITE_N_MAIS_1_PADRAO)
+        if repeticoes > limite:
+            current_app.logger.warning(
+                f"Possível N+1 em {request.method} {request.path} ({endpoint}): "
+                f"mesmo comando executado {repeticoes} vezes ({consultas} no total): {comando[:200]}"
+            )
+    return resposta
+
+
+def configurar_metricas(app):
+    """Registra a coleta de latência, tamanho de resposta e comandos SQL por rota"""
+    app.extensions['metricas'] = RegistroMetricas()
+    app.before_request(_iniciar_requisicao)
+    app.after_request(_finalizar_requisicao)
@@ -0,0 +1,119 @@
+import cProfile
+import os
+import pstats
+import re
+import time
+import uuid
+from flask import current_app, g, request
+
+CABECALHO_PERFIL = 'X-Profile'
+PARAMETRO_PERFIL = '_profile'
+MAXIMO_ARQUIVOS_PADRAO = 50
+FUNCOES_RESUMO_PADRAO = 30
+_NOME_VALIDO = re.compile(r'^[\w.-]+\.prof$')
+
+
+def _pasta():
+    return current_app.config['PERFIS_PASTA']
+
+
+def _pedido_de_perfil():
+    return request.headers.get(CABECALHO_PERFIL) == '1' or request.args.get(PARAMETRO_PERFIL) == '1'
+
+
+def _pode_perfilar():
+    """Somente administradores (ou qualquer um com LOGIN_DISABLED, em desenvolvimento)"""
+    if current_app.config.get('LOGIN_DISABLED'):
+        return True
+    usuario = g.get('usuario')
+    return usuario is not None and usuario['role'] == 'administrador'
+
+
+def caminho_perfil(nome):
+    """Caminho do arquivo .prof, ou None se o nome não for de um perfil válido"""
+    if not _NOME_VALIDO.match(nome):
+        return None
+    caminho = os.path.join(_pasta(), nome)
+    return caminho if os.path.isfile(caminho) else None
+
+
+def listar_perfis():
+    """Perfis gravados, do mais recente para o mais antigo"""
+    try:
+        entradas = [entrada for entrada in os.scandir(_pasta()) if _NOME_VALIDO.match(entrada.name)]
+    except FileNotFoundError:
+        return []
+    entradas.sort(key=lambda entrada: entrada.stat().st_mtime, reverse=True)
+    return [{'nome': entrada.name, 'bytes': entrada.stat().st_size} for entrada in entradas]
+
+
+def resumir_perfil(caminho, quantidade=FUNCOES_RESUMO_PADRAO):
+    """Funções com maior tempo acumulado (inclui o tempo das funções chamadas)"""
+    estatisticas = pstats.Stats(caminho)
+    linhas = sorted(estatisticas.stats.items(), key=lambda item: item[1][3], reverse=True)[:quantidade]
+    return {
+        'tempo_total_s': round(estatisticas.total_tt, 6),
+        'chamadas': estatisticas.total_calls,
+        'funcoes': [
+            {
+                'funcao': f'{arquivo}:{linha}({nome})',
+                'chamadas': chamadas,
+                'tempo_proprio_s': round(tempo_proprio, 6),
+                'tempo_acumulado_s': round(tempo_acumulado, 6)
+            }
+            for (arquivo, linha, nome), (_, chamadas, tempo_proprio, tempo_acumulado, _) in linhas
+        ]
+    }
+
+
+def _remover_antigos(pasta, maximo):
+    perfis = sorted((entrada for entrada in os.scandir(pasta) if _NOME_VALIDO.match(entrada.name)),
+                    key=lambda entrada: entrada.stat().st_mtime)
+    for entrada in perfis[:max(0, len(perfis) - maximo)]:
+        os.remove(entrada.path)
+
+
+def _iniciar_perfil():
+    # Sem o cabeçalho, o custo por requisição é só esta verificação
+    if not request.path.startswith('/api/') or not _pedido_de_perfil() or not _pode_perfilar():
+        return
+    g._perfil = cProfile.Profile()
+    g._perfil.enable()
+
+
+def _finalizar_perfil(resposta):
+    perfil = g.pop('_perfil', None)
+    if perfil is None:
+        return resposta
+    perfil.disable()
+
+    pasta = _pasta()
+    os.makedirs(pasta, exist_ok=True)
+    endpoint = (request.endpoint or 'sem_rota').replace('.', '-')
+    nome = f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint}-{uuid.uuid4().hex[:8]}.prof"
+    perfil.dump_stats(os.path.join(pasta, nome))
+    _remover_antigos(pasta, current_app.config.get('PERFIS_MAXIMO_ARQUIVOS', MAXIMO_ARQUIVOS_PADRAO))
+
+    resposta.headers[CABECALHO_PERFIL] = nome
+    resposta.headers.add('Link', f'</api/perfis/{nome}>; rel="profile"')
+    return resposta
+
+
+def _descartar_perfil(excecao=None):
+    # Requisição interrompida por exceção: o perfilador não pode ficar ligado na thread
+    perfil = g.pop('_perfil', None)
+    if perfil is not None:
+        perfil.disable()
+
+
+def configurar_perfilador(app):
+    """
+    Perfilamento sob demanda: uma requisição /api com `X-Profile: 1` (ou `?_profile=1`)
+    de um administrador roda sob o cProfile. O perfil é gravado em PERFIS_PASTA e a
+    resposta traz um cabeçalho `Link` para o resumo em /api/perfis/<nome>.
+
+    Deve ser registrado depois da autenticação, que define `g.usuario`.
+    """
+    app.before_request(_iniciar_perfil)
+    app.after_request(_finalizar_perfil)
+    app.teardown_request(_descartar_perfil)
@@ -0,0 +1,164 @@
+from datetime import date, datetime
+from src.models.user import db
+from src.models.licenciamento import Licenca, Condicionante
+from src.models.expressoes import somar_dias
+from src.services.dias_uteis import CONTAGEM_CORRIDOS, calendario
+from src.services.vencimentos import status_apos_nova_data
+
+TAMANHO_LOTE_PADRAO = 5000
+
+
+def _com_prazo():
+    return (Condicionante.prazo_dias.isnot(None), Condicionante.prazo_dias != 0)
+
+
+def _criterios_recalculo(licenca_id, nova_data_limite):
+    """Condicionantes em dias corridos da licença cuja data limite mudaria"""
+    return (
+        Condicionante.licenca_id == licenca_id,
+        *_com_prazo(),
+        Condicionante.tipo_contagem == CONTAGEM_CORRIDOS,
+        Condicionante.data_limite.is_distinct_from(nova_data_limite)
+    )
+
+
+def _alteracoes_por_calendario(linhas, data_base_da_linha):
+    """
+    Calcula em lote, pela tabela de dias úteis, a nova data limite de cada linha
+    (com id, prazo_dias, tipo_contagem e data_limite) e devolve só as que mudam.
+    """
+    linhas = list(linhas)
+    novas = calendario.calcular_datas_limite(
+        (data_base_da_linha(linha), linha.prazo_dias, linha.tipo_contagem) for linha in linhas
+    )
+    return [(linha, nova) for linha, nova in zip(linhas, novas) if nova != linha.data_limite]
+
+
+def _gravar(alteracoes):
+    """
+    UPDATE em lote por chave primária (executemany) das novas datas limite; no mesmo
+    comando, 'vencida' volta a 'pendente' se a nova data ainda não passou.
+    """
+    if alteracoes:
+        tabela = Condicionante.__table__
+        nova_data_limite = db.bindparam('b_data_limite', type_=db.Date)
+        db.session.execute(
+            tabela.update()
+            .where(tabela.c.id == db.bindparam('b_id'))
+            .values(data_limite=nova_data_limite, updated_at=datetime.utcnow(),
+                    status=status_apos_nova_data(Condicionante, nova_data_limite, date.today())),
+            [{'b_id': linha.id, 'b_data_limite': nova} for linha, nova in alteracoes]
+        )
+    return len(alteracoes)
+
+
+def _condicionantes_por_calendario(licenca_id):
+    """Condicionantes da licença com prazo contado pela tabela de dias úteis"""
+    return db.session.execute(
+        db.select(Condicionante.id, Condicionante.descricao, Condicionante.prazo_dias,
+                  Condicionante.tipo_contagem, Condicionante.data_limite)
+        .where(Condicionante.licenca_id == licenca_id, *_com_prazo(),
+               Condicionante.tipo_contagem != CONTAGEM_CORRIDOS)
+        .order_by(Condicionante.id)
+    ).all()
+
+
+def recalcular_datas_limite(licenca_id, data_emissao):
+    """
+    Recalcula a data limite de todas as condicionantes de uma licença a partir
+    de uma nova data de emissão.
+
+    Prazos em dias corridos são atualizados com um único UPDATE; os contados em dias
+    úteis (ou prorrogados para dia útil) são calculados em lote pela tabela de dias
+    úteis e gravados num UPDATE em lote.
+
+    Não faz commit: deve rodar na mesma transação que altera a licença.
+
+    Returns:
+        int: Quantidade de condicionantes cuja data limite foi alterada
+    """
+    nova_data_limite = somar_dias(data_emissao, Condicionante.prazo_dias)
+    resultado = db.session.execute(
+        db.update(Condicionante)
+        .where(*_criterios_recalculo(licenca_id, nova_data_limite))
+        # Prazo empurrado para o futuro: 'vencida' volta a 'pendente' no mesmo UPDATE
+        .values(data_limite=nova_data_limite,
+                status=status_apos_nova_data(Condicionante, nova_data_limite)),
+        execution_options={'synchronize_session': False}
+    )
+    alteracoes = _alteracoes_por_calendario(_condicionantes_por_calendario(licenca_id), lambda _: data_emissao)
+    return resultado.rowcount + _gravar(alteracoes)
+
+
+def previsualizar_recalculo(licenca_id, data_emissao):
+    """
+    Lista as condicionantes cuja data limite mudaria se a licença passasse a ter
+    a data de emissão informada, sem alterar nada.
+
+    Returns:
+        list: Dicionários com id, descrição, prazo, tipo de contagem e as datas limite atual e nova
+    """
+    nova_data_limite = somar_dias(data_emissao, Condicionante.prazo_dias)
+    linhas = db.session.execute(
+        db.select(
+            Condicionante.id,
+            Condicionante.descricao,
+            Condicionante.prazo_dias,
+            Condicionante.tipo_contagem,
+            Condicionante.data_limite,
+            nova_data_limite.label('nova_data_limite')
+        )
+        .where(*_criterios_recalculo(licenca_id, nova_data_limite))
+    ).all()
+    alteracoes = [(linha, linha.nova_data_limite) for linha in linhas]
+    alteracoes += _alteracoes_por_calendario(_condicionantes_por_calendario(licenca_id), lambda _: data_emissao)
+
+    return [
+        {
+            'id': linha.id,
+            'descricao': linha.descricao,
+            'prazo_dias': linha.prazo_dias,
+            'tipo_contagem': linha.tipo_contagem,
+            'data_limite_atual': linha.data_limite,
+            'data_limite_nova': nova
+        }
+        for linha, nova in sorted(alteracoes, key=lambda alteracao: alteracao[0].id)
+    ]
+
+
+def recalcular_prazos(licenca_id=None, tamanho_lote=TAMANHO_LOTE_PADRAO):
+    """
+    Recalcula em massa as datas limite das condicionantes com prazo em dias, a partir
+    da data de emissão da licença (ex.: depois de mudar a contagem de várias
+    condicionantes ou a tabela de feriados).
+
+    As linhas são lidas em lotes de `tamanho_lote`, calculadas pela tabela de dias úteis
+    e só as que mudaram são gravadas, com um commit por lote. Condicionantes de licenças
+    sem data de emissão ficam como estão (não há como saber a data base original).
+
+    Returns:
+        dict: Condicionantes analisadas e alteradas
+    """
+    consulta = (
+        db.select(Condicionante.id, Condicionante.prazo_dias, Condicionante.tipo_contagem,
+                  Condicionante.data_limite, Licenca.data_emissao)
+        .join(Licenca, Condicionante.licenca_id == Licenca.id)
+        .where(*_com_prazo(), Licenca.data_emissao.isnot(None))
+        .order_by(Condicionante.id)
+    )
+    if licenca_id is not None:
+        consulta = consulta.where(Condicionante.licenca_id == licenca_id)
+
+    analisadas = alteradas = 0
+    ultimo_id = 0
+    while True:
+        # Paginação por chave: cada lote é uma consulta curta, e os UPDATEs não invalidam um cursor aberto
+        lote = db.session.execute(consulta.where(Condicionante.id > ultimo_id).limit(tamanho_lote)).all()
+        if not lote:
+            break
+        alteradas += _gravar(_alteracoes_por_calendario(lote, lambda linha: linha.data_emissao))
+        db.session.commit()
+        analisadas += len(lote)
+        ultimo_id = lote[-1].id
+
+    return {'analisadas': analisadas, 'alteradas': alteradas}
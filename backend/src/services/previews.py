@@ -0,0 +1,203 @@
+import importlib.util
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+# Lado maior, em pixels, de cada variante gerada
+TAMANHOS_PREVIEW = {'thumb': 240, 'preview': 1280}
+QUALIDADE_JPEG = 80
+EXTENSOES_IMAGEM = {'png', 'jpg', 'jpeg', 'gif'}
+# Marcador gravado ao lado do original quando a geração falha (apagá-lo permite nova tentativa)
+SUFIXO_FALHA = '.falhou'
+
+_executor = None
+_executor_lock = threading.Lock()
+# Arquivos com geração em andamento neste processo, para não enfileirar duas vezes (protegido por _executor_lock)
+_em_andamento = set()
+
+
+def caminho_preview(caminho_original, tamanho):
+    """Caminho da variante ao lado do original (ex.: <sha256>.thumb.jpg)"""
+    return f'{os.path.splitext(caminho_original)[0]}.{tamanho}.jpg'
+
+
+def caminho_falha(caminho_original):
+    """Marcador de geração que falhou (ex.: <sha256>.falhou)"""
+    return f'{os.path.splitext(caminho_original)[0]}{SUFIXO_FALHA}'
+
+
+def _marcar_falha(caminho):
+    try:
+        open(caminho_falha(caminho), 'wb').close()
+    except OSError:
+        pass
+
+
+def _abrir_primeira_pagina_pdf(caminho):
+    """Renderiza a primeira página do PDF como imagem (PyMuPDF, ou pdftoppm como alternativa)"""
+    from PIL import Image
+
+    try:
+        import fitz  # PyMuPDF (opcional)
+    except ImportError:
+        fitz = None
+
+    maior_lado = max(TAMANHOS_PREVIEW.values())
+    if fitz:
+        with fitz.open(caminho) as documento:
+            pagina = documento.load_page(0)
+            escala = maior_lado / max(pagina.rect.width, pagina.rect.height)
+            pixmap = pagina.get_pixmap(matrix=fitz.Matrix(escala, escala), alpha=False)
+            return Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples)
+
+    if shutil.which('pdftoppm'):
+        with tempfile.TemporaryDirectory() as pasta:
+            prefixo = os.path.join(pasta, 'pagina')
+            subprocess.run(
+                ['pdftoppm', '-jpeg', '-f', '1', '-l', '1', '-scale-to', str(maior_lado), '-singlefile', caminho, prefixo],
+                check=True, capture_output=True, timeout=60
+            )
+            with Image.open(prefixo + '.jpg') as imagem:
+                imagem.load()
+                return imagem.copy()
+
+    return None
+
+
+def _gerar_variantes(caminho):
+    """
+    Gera as miniaturas JPEG de um comprovante (imagem ou primeira página de PDF).
+
+    Roda num processo do pool, fora do ciclo da requisição: recebe apenas caminhos
+    absolutos e não depende do contexto da aplicação. Cada variante é gravada num
+    arquivo temporário e movida no final, para nunca ser servida pela metade.
+
+    Returns:
+        list: Caminhos das variantes geradas (vazia se o tipo não for suportado)
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return []
+
+    extensao = os.path.splitext(caminho)[1].lstrip('.').lower()
+    if extensao in EXTENSOES_IMAGEM:
+        with Image.open(caminho) as aberta:
+            aberta.seek(0)
+            imagem = aberta.convert('RGB')
+    elif extensao == 'pdf':
+        imagem = _abrir_primeira_pagina_pdf(caminho)
+        if imagem is None:
+            raise RuntimeError('Nenhum renderizador de PDF disponível (PyMuPDF ou pdftoppm)')
+        imagem = imagem.convert('RGB')
+    else:
+        return []
+
+    geradas = []
+    # Do maior para o menor: cada miniatura parte da anterior, já reduzida
+    for tamanho, lado in sorted(TAMANHOS_PREVIEW.items(), key=lambda item: -item[1]):
+        imagem.thumbnail((lado, lado))
+        destino = caminho_preview(caminho, tamanho)
+        temporario = f'{destino}.{os.getpid()}.tmp'
+        imagem.save(temporario, 'JPEG', quality=QUALIDADE_JPEG, optimize=True)
+        os.replace(temporario, destino)
+        geradas.append(destino)
+    return geradas
+
+
+def gerar_previews(caminho):
+    """
+    Gera as miniaturas; se a geração falhar (arquivo corrompido, PDF sem renderizador),
+    grava o marcador de falha para que o arquivo não seja reenfileirado a cada consulta.
+    """
+    try:
+        return _gerar_variantes(caminho)
+    except Exception:
+        _marcar_falha(caminho)
+        raise
+
+
+def _obter_executor(workers):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=workers)
+        return _executor
+
+
+def _descartar_executor(executor):
+    """Pool quebrado (processo morto): o próximo agendamento cria outro"""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _ao_concluir(caminho, futuro):
+    # Roda na thread de callbacks do executor, em paralelo às requisições
+    with _executor_lock:
+        _em_andamento.discard(caminho)
+    erro = futuro.exception()
+    if erro:
+        logger.error(f"Erro ao gerar preview de {caminho}: {erro}")
+
+
+def agendar_previews(caminho_relativo):
+    """
+    Enfileira a geração de previews de um comprovante no pool de processos.
+
+    Com PREVIEW_WORKERS = 0 a geração roda na hora, no próprio processo (útil em testes).
+    """
+    if not preview_suportado(caminho_relativo):
+        return
+    caminho = os.path.join(current_app.config['UPLOAD_FOLDER'], caminho_relativo)
+    workers = current_app.config.get('PREVIEW_WORKERS', 2)
+    if workers <= 0:
+        try:
+            gerar_previews(caminho)
+        except Exception as e:
+            current_app.logger.error(f"Erro ao gerar preview de {caminho}: {e}")
+        return
+
+    executor = _obter_executor(workers)
+    with _executor_lock:
+        if caminho in _em_andamento:
+            return
+        _em_andamento.add(caminho)
+    try:
+        futuro = executor.submit(gerar_previews, caminho)
+    except (BrokenProcessPool, RuntimeError) as e:
+        # Sem isso o caminho ficaria "processando" para sempre e o pool quebrado, em cache
+        with _executor_lock:
+            _em_andamento.discard(caminho)
+        _descartar_executor(executor)
+        current_app.logger.error(f"Erro ao agendar preview de {caminho}: {e}")
+        return
+    futuro.add_done_callback(lambda f: _ao_concluir(caminho, f))
+
+
+def _modulo_disponivel(nome):
+    return importlib.util.find_spec(nome) is not None
+
+
+def preview_suportado(caminho_relativo):
+    """Se há como gerar a prévia deste tipo de arquivo com as bibliotecas instaladas"""
+    if not _modulo_disponivel('PIL'):
+        return False
+    extensao = os.path.splitext(caminho_relativo)[1].lstrip('.').lower()
+    if extensao == 'pdf':
+        return _modulo_disponivel('fitz') or shutil.which('pdftoppm') is not None
+    return extensao in EXTENSOES_IMAGEM
+
+
+def preview_falhou(caminho_relativo):
+    return os.path.exists(caminho_falha(os.path.join(current_app.config['UPLOAD_FOLDER'], caminho_relativo)))
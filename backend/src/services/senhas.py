@@ -0,0 +1,128 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as TempoEsgotado
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+METODO_PADRAO = 'scrypt'
+WORKERS_PADRAO = 2
+FILA_PADRAO = 8
+TIMEOUT_PADRAO = 10
+
+_executor = None
+_vagas = None
+_lock = threading.Lock()
+
+
+class FilaSenhasCheia(Exception):
+    """Há mais verificações de senha pendentes do que a fila comporta (ou o pool não respondeu)"""
+
+
+def _parametros(metodo):
+    """Prefixo que o Werkzeug grava no hash para o método informado (ex.: 'scrypt:32768:8:1')"""
+    nome, *argumentos = metodo.split(':')
+    if nome == 'scrypt':
+        padrao = ['32768', '8', '1']
+    elif nome == 'pbkdf2':
+        padrao = ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)]
+    else:
+        return metodo
+    return ':'.join([nome] + argumentos + padrao[len(argumentos):])
+
+
+def _gerar(senha, metodo):
+    return generate_password_hash(senha, method=metodo)
+
+
+def _verificar(password_hash, senha, metodo):
+    """
+    Confere a senha e, se o hash armazenado usar parâmetros diferentes dos atuais,
+    já devolve o hash novo — tudo numa única ida ao pool.
+    """
+    if not check_password_hash(password_hash, senha):
+        return False, None
+    if password_hash.split('$', 1)[0] != _parametros(metodo):
+        return True, generate_password_hash(senha, method=metodo)
+    return True, None
+
+
+def _obter_pool():
+    """Cria sob demanda o pool de processos e o semáforo que limita a fila"""
+    global _executor, _vagas
+    workers = current_app.config.get('PASSWORD_HASH_WORKERS', WORKERS_PADRAO)
+    with _lock:
+        if _vagas is None:
+            fila = current_app.config.get('PASSWORD_HASH_FILA', FILA_PADRAO)
+            _vagas = threading.BoundedSemaphore(max(workers, 1) + fila)
+        if workers > 0 and _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=workers)
+    return (_executor if workers > 0 else None), _vagas
+
+
+def _descartar_pool(executor):
+    """Pool quebrado (processo morto): o próximo pedido cria outro"""
+    global _executor
+    with _lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _executar(funcao, *argumentos):
+    """
+    Executa `funcao` no pool de processos, sem ocupar a CPU do worker web.
+
+    Com PASSWORD_HASH_WORKERS = 0 roda no próprio processo (útil em testes). Em ambos
+    os casos, se a fila estiver cheia a chamada falha na hora com FilaSenhasCheia; o
+    mesmo acontece se o pool não responder dentro de PASSWORD_HASH_TIMEOUT ou quebrar.
+    """
+    executor, vagas = _obter_pool()
+    if not vagas.acquire(blocking=False):
+        raise FilaSenhasCheia()
+    if executor is None:
+        try:
+            return funcao(*argumentos)
+        finally:
+            vagas.release()
+
+    try:
+        futuro = executor.submit(funcao, *argumentos)
+    except BrokenProcessPool:
+        vagas.release()
+        _descartar_pool(executor)
+        raise FilaSenhasCheia() from None
+    except BaseException:
+        vagas.release()
+        raise
+    # A vaga só volta quando o hash termina no pool, mesmo que a requisição desista antes:
+    # assim o semáforo continua limitando o trabalho realmente pendente
+    futuro.add_done_callback(lambda _: vagas.release())
+
+    timeout = current_app.config.get('PASSWORD_HASH_TIMEOUT', TIMEOUT_PADRAO)
+    try:
+        return futuro.result(timeout=timeout)
+    except TempoEsgotado:
+        raise FilaSenhasCheia() from None
+    except BrokenProcessPool:
+        _descartar_pool(executor)
+        raise FilaSenhasCheia() from None
+
+
+def gerar_hash(senha):
+    """Hash da senha com o método configurado em PASSWORD_HASH_METHOD"""
+    return _executar(_gerar, senha, current_app.config.get('PASSWORD_HASH_METHOD', METODO_PADRAO))
+
+
+def verificar_senha(usuario, senha):
+    """
+    Confere a senha do usuário. Se o hash armazenado estiver com parâmetros
+    desatualizados, ele é substituído (o commit fica a cargo de quem chamou).
+
+    Returns:
+        bool: True se a senha confere
+    """
+    metodo = current_app.config.get('PASSWORD_HASH_METHOD', METODO_PADRAO)
+    valida, novo_hash = _executar(_verificar, usuario.password_hash, senha, metodo)
+    if valida and novo_hash:
+        usuario.password_hash = novo_hash
+    return valida
@@ -0,0 +1,58 @@
+import json
+from datetime import date
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _converter(valor):
+    """Tipos que nem o orjson nem o json da biblioteca padrão serializam sozinhos"""
+    if isinstance(valor, date):  # Só chega aqui no fallback; o orjson trata datas nativamente
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if isinstance(valor, set):
+        return list(valor)
+    raise TypeError(f'Objeto do tipo {type(valor).__name__} não é serializável em JSON')
+
+
+class ProvedorJSON(DefaultJSONProvider):
+    """
+    Provedor `app.json` que codifica com o orjson quando instalado (com fallback para o
+    módulo json), serializando date/datetime em ISO 8601. Assim os `to_dict()` devolvem as
+    datas sem convertê-las e o `jsonify` de listagens grandes fica bem mais barato.
+
+    Mantém o comportamento do provedor padrão do Flask: chaves ordenadas e saída indentada
+    em modo debug.
+    """
+
+    def _orjson(self, obj):
+        opcoes = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            opcoes |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_converter, option=opcoes)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return self._orjson(obj).decode()
+        kwargs.setdefault('default', _converter)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        indentar = self.compact is False or (self.compact is None and self._app.debug)
+        if orjson is None or indentar:
+            return super().response(*args, **kwargs)
+        # Os bytes do orjson vão direto para a resposta, sem passar por str
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._orjson(obj), mimetype=self.mimetype)
@@ -0,0 +1,85 @@
+from datetime import date
+from src.models.user import db
+from src.models.licenciamento import Licenca, Condicionante, VarreduraVencimento
+
+
+STATUS_EM_ABERTO = {Licenca: 'ativa', Condicionante: 'pendente'}
+
+
+def status_apos_nova_data(modelo, nova_data, hoje=None):
+    """
+    Expressão SQL do status de uma linha cuja data (vencimento ou limite) passa a ser
+    `nova_data`: 'vencida' volta ao status em aberto se a nova data ainda não passou.
+    Para usar em `.values(status=...)` no mesmo UPDATE que altera a data.
+    """
+    return db.case(
+        (db.and_(modelo.status == 'vencida', nova_data >= (hoje or date.today())), STATUS_EM_ABERTO[modelo]),
+        else_=modelo.status
+    )
+
+
+def reabrir_se_no_prazo(registro, data, hoje=None):
+    """Versão para objetos carregados: licença ou condicionante 'vencida' com `data` futura volta a ficar em aberto"""
+    if registro.status == 'vencida' and data is not None and data >= (hoje or date.today()):
+        registro.status = STATUS_EM_ABERTO[type(registro)]
+
+
+def marcar_vencidas(hoje=None):
+    """
+    Move licenças e condicionantes cujo prazo já passou para o status 'vencida' e
+    reabre as 'vencida' cujo prazo foi prorrogado (data de novo no futuro).
+
+    São executados quatro UPDATEs (dois por tabela), restritos às linhas que mudam de
+    status, e a contagem de cada um é registrada em VarreduraVencimento.
+
+    Args:
+        hoje: Data de referência (padrão: data atual)
+
+    Returns:
+        VarreduraVencimento: Registro da execução com as contagens
+    """
+    hoje = hoje or date.today()
+
+    resultado_licencas = db.session.execute(
+        db.update(Licenca)
+        .where(Licenca.status == 'ativa', Licenca.data_vencimento < hoje)
+        .values(status='vencida'),
+        execution_options={'synchronize_session': False}
+    )
+    resultado_condicionantes = db.session.execute(
+        db.update(Condicionante)
+        .where(Condicionante.status == 'pendente', Condicionante.data_limite < hoje)
+        .values(status='vencida'),
+        execution_options={'synchronize_session': False}
+    )
+
+    # Passada inversa: alterações de data feitas por fora das rotas (ex.: SQL manual)
+    reabertas_licencas = db.session.execute(
+        db.update(Licenca)
+        .where(Licenca.status == 'vencida', Licenca.data_vencimento >= hoje)
+        .values(status='ativa'),
+        execution_options={'synchronize_session': False}
+    )
+    reabertas_condicionantes = db.session.execute(
+        db.update(Condicionante)
+        .where(Condicionante.status == 'vencida', Condicionante.data_limite >= hoje)
+        .values(status='pendente'),
+        execution_options={'synchronize_session': False}
+    )
+
+    varredura = VarreduraVencimento(
+        data_referencia=hoje,
+        licencas_vencidas=resultado_licencas.rowcount,
+        condicionantes_vencidas=resultado_condicionantes.rowcount,
+        licencas_reabertas=reabertas_licencas.rowcount,
+        condicionantes_reabertas=reabertas_condicionantes.rowcount
+    )
+    db.session.add(varredura)
+    db.session.commit()
+
+    return varredura
+
+
+def ultima_varredura():
+    """Retorna o registro da varredura mais recente, ou None se nunca foi executada"""
+    return VarreduraVencimento.query.order_by(VarreduraVencimento.executada_em.desc()).first()
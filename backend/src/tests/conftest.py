@@ -1,8 +1,32 @@
 import pytest
+from contextlib import contextmanager
+from datetime import date, timedelta
+from sqlalchemy import event
+from flask_sqlalchemy.session import Session
 from src.main import create_app
-from src.models.user import db as _db
+from src.models.user import db as _db, User
+from src.models.licenciamento import Empresa, Licenca, Condicionante
 import tempfile
 import os
+from werkzeug.security import generate_password_hash
+
+def _habilitar_savepoints_sqlite(engine):
+    """
+    O driver sqlite3 abre e encerra transações por conta própria, o que quebra SAVEPOINTs.
+    Desliga esse controle e emite o BEGIN explicitamente (receita da documentação do SQLAlchemy).
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _sem_transacao_implicita(conexao_dbapi, _):
+        conexao_dbapi.isolation_level = None
+
+    @event.listens_for(engine, 'begin')
+    def _begin_explicito(conexao):
+        conexao.exec_driver_sql('BEGIN')
+
+    engine.dispose() # Conexões já abertas não passaram pelo evento 'connect'
 
 @pytest.fixture(scope='session')
 def app():
@@ -15,12 +39,15 @@ def app():
         'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
         'SQLALCHEMY_TRACK_MODIFICATIONS': False,
         'UPLOAD_FOLDER': tempfile.mkdtemp(), # Pasta temporária para uploads
+        'PREVIEW_WORKERS': 0, # Gera miniaturas na própria requisição, sem pool de processos
+        'PASSWORD_HASH_WORKERS': 0, # Hash de senha na própria requisição
         'WTF_CSRF_ENABLED': False, # Desabilitar CSRF para testes de formulário mais simples
         'LOGIN_DISABLED': True # Se você tiver autenticação, pode querer desabilitá-la para alguns testes
     })
 
     with app.app_context():
-        _db.create_all()
+        _db.create_all() # Esquema criado uma única vez; cada teste roda numa transação desfeita ao final
+        _habilitar_savepoints_sqlite(_db.engine)
 
     yield app
 
@@ -45,23 +72,124 @@ def client(app):
     """Um cliente de teste para a aplicação."""
     return app.test_client()
 
+class _SessaoNaConexao(Session):
+    """A sessão do Flask-SQLAlchemy escolhe o engine pela tabela; aqui tudo vai para a conexão do teste"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        return self.bind
+
 @pytest.fixture
 def db(app):
-    """Sessão do banco de dados para testes, com limpeza antes de cada teste."""
+    """
+    Sessão do banco de dados para testes, isolada numa transação desfeita ao final.
+
+    O teste inteiro roda dentro de uma transação externa numa única conexão; a sessão
+    trabalha em SAVEPOINTs (`join_transaction_mode='create_savepoint'`), então os
+    `commit()`/`rollback()` das rotas funcionam normalmente sem nunca gravar de fato.
+    Cada processo (ex.: workers do pytest-xdist) usa o seu próprio arquivo de banco.
+    """
     with app.app_context():
-        # Limpa todas as tabelas antes de cada teste
-        # Isso é destrutivo, mas garante isolamento para a maioria dos casos de teste.
-        # Para performance em suítes grandes, transações podem ser uma alternativa.
-        _db.session.remove()
-        _db.drop_all()
-        _db.create_all()
-        yield _db
+        conexao = _db.engine.connect()
+        transacao = conexao.begin()
+        sessao_original = _db.session
+        _db.session = _db._make_scoped_session({
+            'bind': conexao, 'join_transaction_mode': 'create_savepoint', 'class_': _SessaoNaConexao
+        })
+        try:
+            yield _db
+        finally:
+            _db.session.remove()
+            _db.session = sessao_original
+            transacao.rollback()
+            conexao.close()
 
 @pytest.fixture
 def runner(app):
     """Um runner de comandos CLI para a aplicação, se você tiver comandos Flask."""
     return app.test_cli_runner()
 
+@pytest.fixture
+def assert_max_queries(app):
+    """
+    Orçamento de consultas: falha o teste se o bloco executar mais comandos SQL que o limite.
+
+        with assert_max_queries(3):
+            client.get('/api/licencas')
+    """
+    @contextmanager
+    def verificar(maximo):
+        comandos = []
+
+        def contar(conn, cursor, statement, parameters, context, executemany):
+            # SAVEPOINTs vêm da fixture transacional `db`, não da aplicação
+            if not statement.startswith(('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')):
+                comandos.append(statement)
+
+        with app.app_context():
+            engine = _db.engine
+        event.listen(engine, 'before_cursor_execute', contar)
+        try:
+            yield comandos
+        finally:
+            event.remove(engine, 'before_cursor_execute', contar)
+        assert len(comandos) <= maximo, (
+            f"{len(comandos)} comandos SQL executados (orçamento: {maximo}):\n" + "\n".join(comandos)
+        )
+    return verificar
+
+@pytest.fixture
+def dados_em_volume(db):
+    """
+    Cria `quantidade` empresas, cada uma com uma licença e uma condicionante em aberto
+    vencendo nos próximos dias, via inserts em lote.
+    """
+    def criar(quantidade):
+        hoje = date.today()
+        db.session.execute(db.insert(Empresa), [
+            {'razao_social': f'Empresa {i}', 'cnpj': f'{i:014d}'} for i in range(quantidade)
+        ])
+        empresas = db.session.execute(db.select(Empresa.id).order_by(Empresa.id)).scalars().all()
+        db.session.execute(db.insert(Licenca), [
+            {'empresa_id': empresa_id, 'tipo_licenca': 'LO', 'status': 'ativa',
+             'data_emissao': hoje - timedelta(days=300), 'data_vencimento': hoje + timedelta(days=i % 30)}
+            for i, empresa_id in enumerate(empresas)
+        ])
+        licencas = db.session.execute(db.select(Licenca.id).order_by(Licenca.id)).scalars().all()
+        db.session.execute(db.insert(Condicionante), [
+            {'licenca_id': licenca_id, 'descricao': f'Condicionante {i}', 'status': 'pendente',
+             'data_limite': hoje + timedelta(days=i % 30)}
+            for i, licenca_id in enumerate(licencas)
+        ])
+        db.session.commit()
+        return empresas, licencas
+    return criar
+
+@pytest.fixture
+def autenticacao_obrigatoria(app, monkeypatch):
+    """Liga a exigência de token durante o teste."""
+    monkeypatch.setitem(app.config, 'LOGIN_DISABLED', False)
+    monkeypatch.setitem(app.config, 'AUTH_OBRIGATORIA', True)
+    # Versões de token lidas em outro teste (ids se repetem após o rollback) não valem aqui
+    app.extensions['autenticacao']['versoes'].lido_em = None
+
+@pytest.fixture
+def autenticacao_ativa(app, monkeypatch):
+    """Verificação de token ligada com a configuração padrão (AUTH_OBRIGATORIA desligada)."""
+    monkeypatch.setitem(app.config, 'LOGIN_DISABLED', False)
+    monkeypatch.setitem(app.config, 'AUTH_OBRIGATORIA', False)
+    app.extensions['autenticacao']['versoes'].lido_em = None
+
+@pytest.fixture
+def token_de_usuario(client, db):
+    """Cria um usuário com o papel informado e devolve o token do seu login."""
+    def criar(email, role):
+        db.session.add(User(email=email, role=role, password_hash=generate_password_hash('s3nh@')))
+        db.session.commit()
+        response = client.post('/api/login', json={'email': email, 'password': 's3nh@'})
+        assert response.status_code == 200
+        return response.get_json()['token']
+    return criar
+
 # Adicionar aqui fixtures específicas para criar dados de teste (empresas, licenças, etc.)
 # Exemplo:
 # from src.models.licenciamento import Empresa
@@ -0,0 +1,84 @@
+import pytest
+from datetime import date, timedelta
+from src.models.licenciamento import Empresa, Licenca, Condicionante
+from src.services.agenda import linha_do_tempo
+
+CNPJ_PETRO = "33.000.167/0001-01"
+CNPJ_VALE = "33.592.510/0001-54"
+
+
+@pytest.fixture
+def vencimentos(db):
+    """Duas empresas com licenças e condicionantes vencendo nas próximas semanas."""
+    hoje = date.today()
+    segunda = hoje - timedelta(days=hoje.weekday())
+    petro = Empresa(razao_social='Petro', cnpj=CNPJ_PETRO)
+    vale = Empresa(razao_social='Vale', cnpj=CNPJ_VALE)
+    db.session.add_all([petro, vale])
+    db.session.flush()
+    lo_petro = Licenca(empresa_id=petro.id, tipo_licenca='LO', data_vencimento=segunda + timedelta(days=8))
+    lo_vale = Licenca(empresa_id=vale.id, tipo_licenca='LO', data_vencimento=segunda + timedelta(days=400))
+    db.session.add_all([lo_petro, lo_vale])
+    db.session.flush()
+    db.session.add_all([
+        Condicionante(licenca_id=lo_petro.id, descricao='A', data_limite=segunda + timedelta(days=1)),
+        Condicionante(licenca_id=lo_petro.id, descricao='B', data_limite=segunda + timedelta(days=6)),
+        Condicionante(licenca_id=lo_petro.id, descricao='C', data_limite=segunda + timedelta(days=7), status='cumprida'),
+        Condicionante(licenca_id=lo_vale.id, descricao='D', data_limite=segunda - timedelta(days=1)),
+    ])
+    db.session.commit()
+    return segunda
+
+
+def test_timeline_semanal_por_empresa_e_status(client, vencimentos, assert_max_queries):
+    """Testa as contagens por semana, alinhadas aos períodos, em uma consulta além do validador."""
+    segunda = vencimentos
+    with assert_max_queries(2):
+        response = client.get('/api/agenda/timeline?granularidade=semana&horizonte=30')
+    assert response.status_code == 200, response.get_data(as_text=True)
+    data = response.get_json()
+
+    assert data['periodos'][:3] == [(segunda + timedelta(days=7 * i)).isoformat() for i in range(3)]
+    series = {(s['tipo'], s['empresa'], s['status']): s['contagens'] for s in data['series']}
+    # Fora do horizonte (licença da Vale) ou antes da semana atual (condicionante D) não entram
+    assert set(series) == {('condicionante', 'Petro', 'pendente'), ('condicionante', 'Petro', 'cumprida'),
+                           ('licenca', 'Petro', 'ativa')}
+    assert series[('condicionante', 'Petro', 'pendente')][:2] == [2, 0]
+    assert series[('condicionante', 'Petro', 'cumprida')][:2] == [0, 1]
+    assert series[('licenca', 'Petro', 'ativa')][:2] == [0, 1]
+    assert all(len(contagens) == len(data['periodos']) for contagens in series.values())
+
+
+def test_timeline_mensal_e_cache(client, vencimentos):
+    """Testa o agrupamento mensal, o 304 e a validação dos parâmetros."""
+    response = client.get('/api/agenda/timeline?granularidade=mes&horizonte=730')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert all(periodo.endswith('-01') for periodo in data['periodos'])
+    assert len(data['periodos']) in (24, 25)
+    total = sum(sum(serie['contagens']) for serie in data['series'])
+    # O mês atual entra inteiro: a condicionante D conta se venceu neste mês
+    d_no_mes_atual = (vencimentos - timedelta(days=1)).month == date.today().month
+    assert total == 5 + d_no_mes_atual
+
+    revalidacao = client.get('/api/agenda/timeline?granularidade=mes&horizonte=730',
+                             headers={'If-None-Match': response.headers['ETag']})
+    assert revalidacao.status_code == 304
+    semanal = client.get('/api/agenda/timeline?granularidade=semana&horizonte=730')
+    assert semanal.headers['ETag'] != response.headers['ETag']
+
+    assert client.get('/api/agenda/timeline?granularidade=dia').status_code == 400
+    assert client.get('/api/agenda/timeline?horizonte=5000').status_code == 400
+
+
+def test_inicio_da_semana_no_banco_coincide_com_python(db, vencimentos):
+    """Testa a expressão de início de semana em cada dia da semana."""
+    licenca = Licenca.query.filter_by(data_vencimento=vencimentos + timedelta(days=8)).one()
+    for deslocamento in range(7):
+        db.session.add(Condicionante(licenca_id=licenca.id, descricao=f'Dia {deslocamento}',
+                                     data_limite=vencimentos + timedelta(days=14 + deslocamento)))
+    db.session.commit()
+
+    data = linha_do_tempo('semana', 30)
+    pendentes = next(s for s in data['series'] if s['tipo'] == 'condicionante' and s['status'] == 'pendente')
+    assert pendentes['contagens'][:3] == [2, 0, 7]
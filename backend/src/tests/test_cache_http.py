@@ -0,0 +1,53 @@
+import pytest
+
+CNPJ_PETRO = "33.000.167/0001-01"
+
+
+@pytest.fixture
+def licenca(client, db):
+    empresa = client.post('/api/empresas', json={'razao_social': 'Empresa ETag', 'cnpj': CNPJ_PETRO}).get_json()
+    response = client.post('/api/licencas', json={'empresa_id': empresa['id'], 'tipo_licenca': 'LO', 'data_vencimento': '2030-01-01'})
+    assert response.status_code == 201, response.get_data(as_text=True)
+    licenca = response.get_json()
+    client.post('/api/condicionantes', json={'licenca_id': licenca['id'], 'descricao': 'Relatório anual', 'prazo_dias': 365})
+    return licenca
+
+
+@pytest.mark.parametrize('url', ['/api/empresas', '/api/licencas', '/api/condicionantes', '/api/dashboard/resumo'])
+def test_listagem_responde_304_sem_carregar_linhas(client, licenca, assert_max_queries, url):
+    """Testa que o If-None-Match com o ETag atual gera 304 com apenas a consulta do validador."""
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers['ETag'].startswith('W/')
+    assert response.last_modified is not None
+    assert 'no-cache' in response.headers['Cache-Control']
+
+    with assert_max_queries(1):
+        revalidacao = client.get(url, headers={'If-None-Match': response.headers['ETag']})
+    assert revalidacao.status_code == 304
+    assert revalidacao.data == b''
+    assert revalidacao.headers['ETag'] == response.headers['ETag']
+
+
+def test_etag_muda_com_alteracao_exclusao_e_filtros(client, licenca):
+    """Testa que o ETag acompanha alterações (inclusive nas empresas embutidas), exclusões e filtros."""
+    etag = client.get('/api/licencas').headers['ETag']
+    assert client.get('/api/licencas?status=cancelada').headers['ETag'] != etag
+
+    client.put(f"/api/empresas/{licenca['empresa_id']}", json={'razao_social': 'Empresa Renomeada'})
+    response = client.get('/api/licencas', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()[0]['empresa']['razao_social'] == 'Empresa Renomeada'
+
+    etag = response.headers['ETag']
+    client.delete(f"/api/licencas/{licenca['id']}")
+    response = client.get('/api/licencas', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json() == []
+
+
+def test_if_modified_since_sozinho_nao_gera_304(client, licenca):
+    """Testa que o Last-Modified não basta para 304 (não muda quando uma linha é excluída)."""
+    response = client.get('/api/licencas')
+    revalidacao = client.get('/api/licencas', headers={'If-Modified-Since': response.headers['Last-Modified']})
+    assert revalidacao.status_code == 200
@@ -0,0 +1,67 @@
+import gzip
+import zlib
+import pytest
+from src.services import compressao
+
+
+@pytest.fixture
+def empresas(client, db, dados_em_volume):
+    dados_em_volume(50)
+
+
+def test_listagem_grande_comprimida_com_gzip(client, empresas, monkeypatch):
+    """Testa a compressão gzip negociada pelo Accept-Encoding e o corpo equivalente ao original."""
+    monkeypatch.setattr(compressao, 'brotli', None)
+    original = client.get('/api/empresas')
+    assert 'Content-Encoding' not in original.headers
+
+    response = client.get('/api/empresas', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert int(response.headers['Content-Length']) == len(response.data) < len(original.data)
+    assert gzip.decompress(response.data) == original.data
+    # ETag fraco (validador da listagem) vale para todas as codificações
+    assert response.headers['ETag'] == original.headers['ETag']
+
+
+def test_corpo_comprimido_reaproveitado_pelo_etag(client, app, empresas, monkeypatch):
+    """Testa que uma segunda requisição com o mesmo ETag não comprime de novo."""
+    monkeypatch.setattr(compressao, 'brotli', None)
+    client.get('/api/empresas', headers={'Accept-Encoding': 'gzip'})
+
+    chamadas = []
+    comprimir = compressao._comprimir
+    monkeypatch.setattr(compressao, '_comprimir', lambda *args: chamadas.append(args) or comprimir(*args))
+    response = client.get('/api/empresas', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert chamadas == []
+
+
+def test_resposta_pequena_ou_sem_accept_encoding_nao_comprimida(client, db):
+    """Testa que respostas abaixo do limite e clientes sem gzip recebem o corpo original."""
+    response = client.get('/api/empresas', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+
+    response = client.get('/api/empresas', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_exportacao_em_streaming_comprimida(client, empresas, monkeypatch):
+    """Testa que o CSV em streaming é comprimido parte a parte, sem Content-Length."""
+    monkeypatch.setattr(compressao, 'brotli', None)
+    original = client.get('/api/export/licencas.csv').data
+
+    response = client.get('/api/export/licencas.csv', headers={'Accept-Encoding': 'gzip'})
+    assert response.is_streamed
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    assert zlib.decompress(response.data, 31) == original
+
+
+def test_brotli_preferido_quando_disponivel(client, empresas):
+    """Testa que o brotli é escolhido quando o cliente aceita e o pacote está instalado."""
+    brotli = pytest.importorskip('brotli')
+    original = client.get('/api/empresas').data
+    response = client.get('/api/empresas', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.data) == original
@@ -210,7 +210,7 @@ def test_atualizar_condicionante_data_envio(client, db, setup_empresa_licenca):
     cond_db = db.session.get(Condicionante, cond_id)
     assert cond_db.data_envio_cumprimento.isoformat() == nova_data_envio
 
-def test_listar_condicionantes_por_licenca(client, db, setup_empresa_licenca):
+def test_listar_condicionantes_por_licenca(client, db, setup_empresa_licenca, assert_max_queries):
     """Testa a listagem de condicionantes filtradas por licença."""
     empresa_id, licenca_id_1, _ = setup_empresa_licenca
 
@@ -233,7 +233,8 @@ def test_listar_condicionantes_por_licenca(client, db, setup_empresa_licenca):
     assert res_c1_l2.status_code == 201, res_c1_l2.get_data(as_text=True)
 
 
-    response = client.get(f'/api/condicionantes?licenca_id={licenca_id_1}')
+    with assert_max_queries(2):
+        response = client.get(f'/api/condicionantes?licenca_id={licenca_id_1}')
     assert response.status_code == 200, response.get_data(as_text=True)
     data = response.get_json()
     assert len(data) == 2
@@ -243,6 +244,30 @@ def test_listar_condicionantes_por_licenca(client, db, setup_empresa_licenca):
     assert 'Cond 2 Lic 1' in descricoes_obtidas
     assert all(c['licenca_id'] == licenca_id_1 for c in data)
 
+@pytest.mark.parametrize('quantidade', [10, 1000])
+# A listagem completa faz uma consulta a mais: o validador do ETag (contagem e MAX(updated_at))
+@pytest.mark.parametrize('url, orcamento', [('/api/condicionantes', 2), ('/api/condicionantes/vencimento', 1)])
+def test_listagens_de_condicionantes_orcamento_de_consultas(client, dados_em_volume, assert_max_queries, url, orcamento, quantidade):
+    """Testa que as listagens carregam licença e empresa sem uma consulta por condicionante."""
+    dados_em_volume(quantidade)
+    with assert_max_queries(orcamento):
+        response = client.get(url)
+    data = response.get_json()
+    assert len(data) == quantidade
+    assert data[0]['licenca']['tipo_licenca'] == 'LO'
+    assert data[0]['empresa']['razao_social'].startswith('Empresa ')
+
+@pytest.mark.parametrize('quantidade', [10, 1000])
+def test_dashboard_resumo_orcamento_de_consultas(client, dados_em_volume, assert_max_queries, quantidade):
+    """Testa que o resumo do dashboard usa um número fixo de consultas."""
+    dados_em_volume(quantidade)
+    with assert_max_queries(9):
+        response = client.get('/api/dashboard/resumo')
+    data = response.get_json()
+    assert data['totais']['condicionantes'] == quantidade
+    assert len(data['proximas_acoes']) == 5
+    assert all(acao['tipo_licenca'] == 'LO' for acao in data['proximas_acoes'])
+
 def test_obter_condicionante_especifica(client, db, setup_empresa_licenca):
     """Testa obter uma condicionante específica."""
     _, licenca_id, _ = setup_empresa_licenca
@@ -258,3 +283,69 @@ def test_obter_condicionante_especifica(client, db, setup_empresa_licenca):
     assert data['descricao'] == 'Condicionante Detalhe'
     assert data['licenca']['id'] == licenca_id # Verifica se dados da licença e empresa são incluídos
     assert data['empresa']['cnpj'] == EMPRESA_CNPJ_COND_TEST.replace('.', '').replace('/', '').replace('-', '')
+
+def test_bulk_status_por_ids(client, db, setup_empresa_licenca):
+    """Testa a transição de status em lote a partir de uma lista de IDs."""
+    _, licenca_id, _ = setup_empresa_licenca
+    ids = []
+    for i in range(3):
+        res = client.post('/api/condicionantes', json={
+            'licenca_id': licenca_id, 'descricao': f'Cond lote {i}', 'observacoes': 'Obs antiga'
+        })
+        assert res.status_code == 201, res.get_data(as_text=True)
+        ids.append(res.get_json()['id'])
+
+    response = client.post('/api/condicionantes/bulk-status', json={
+        'status': 'cumprida', 'ids': ids[:2]
+    })
+    assert response.status_code == 200, response.get_data(as_text=True)
+    data = response.get_json()
+    assert data['atualizadas'] == 2
+    assert sorted(c['id'] for c in data['condicionantes']) == sorted(ids[:2])
+    for c in data['condicionantes']:
+        assert c['status'] == 'cumprida'
+        assert c['data_envio_cumprimento'] == date.today().isoformat()
+        assert c['observacoes'] is None
+        assert c['comprovante_path'] is None
+
+    db.session.expire_all()
+    assert db.session.get(Condicionante, ids[2]).status == 'pendente'
+    assert db.session.get(Condicionante, ids[2]).observacoes == 'Obs antiga'
+
+def test_bulk_status_por_filtro(client, db, setup_empresa_licenca):
+    """Testa a transição de status em lote usando filtro por licença e status atual."""
+    _, licenca_id, _ = setup_empresa_licenca
+    for i in range(2):
+        res = client.post('/api/condicionantes', json={
+            'licenca_id': licenca_id, 'descricao': f'Cond cumprida {i}', 'status': 'cumprida'
+        })
+        assert res.status_code == 201, res.get_data(as_text=True)
+
+    response = client.post('/api/condicionantes/bulk-status', json={
+        'status': 'pendente', 'filtro': {'licenca_id': licenca_id, 'status': 'cumprida'}
+    })
+    assert response.status_code == 200, response.get_data(as_text=True)
+    data = response.get_json()
+    assert data['atualizadas'] == 2
+    assert all(c['status'] == 'pendente' and c['data_envio_cumprimento'] is None for c in data['condicionantes'])
+
+def test_bulk_status_sem_criterio(client, db):
+    """Testa que a transição em lote exige IDs ou filtro e um status válido."""
+    response = client.post('/api/condicionantes/bulk-status', json={'status': 'cumprida'})
+    assert response.status_code == 400
+
+    response = client.post('/api/condicionantes/bulk-status', json={'status': 'vencida', 'ids': [1]})
+    assert response.status_code == 400
+
+def test_bulk_status_corpo_malformado(client, db):
+    """Testa que filtros, corpos e IDs malformados geram 400 em vez de 500."""
+    for corpo in ({'status': 'cumprida', 'filtro': [1, 2]},
+                  {'status': 'cumprida', 'filtro': 'pendente'},
+                  {'status': 'cumprida', 'ids': [True, False]},
+                  {'status': 'cumprida', 'filtro': {'licenca_id': [1]}},
+                  {'status': 'cumprida', 'filtro': {'licenca_id': 'x'}},
+                  {'status': 'cumprida', 'filtro': {'licenca_id': True}},
+                  {'status': 'cumprida', 'filtro': {'status': ['pendente']}},
+                  [{'status': 'cumprida'}]):
+        response = client.post('/api/condicionantes/bulk-status', json=corpo)
+        assert response.status_code == 400, corpo
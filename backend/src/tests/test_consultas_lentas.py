@@ -0,0 +1,67 @@
+import json
+import pytest
+from src.services.consultas_lentas import RegistroConsultasLentas
+
+
+@pytest.fixture
+def registro(app, tmp_path, monkeypatch):
+    """Registra todos os comandos (limite 0 ms) num log temporário."""
+    registro = RegistroConsultasLentas(str(tmp_path / 'logs' / 'consultas_lentas.log'))
+    monkeypatch.setitem(app.extensions, 'consultas_lentas', registro)
+    monkeypatch.setitem(app.config, 'CONSULTAS_LENTAS_MS', 0)
+    return registro
+
+
+def test_consulta_lenta_registrada_com_rota_e_parametros(client, db, registro):
+    """Testa a linha JSON do log rotativo e o resumo por comando."""
+    client.get('/api/empresas')
+    client.get('/api/condicionantes?status=pendente')
+
+    with open(registro.arquivo, encoding='utf-8') as arquivo:
+        linhas = [json.loads(linha) for linha in arquivo]
+    filtrada = next(linha for linha in linhas if 'FROM condicionantes' in linha['sql'] and linha['parametros'])
+    assert filtrada['rota'] == 'GET /api/condicionantes (condicionantes.listar_condicionantes)'
+    assert "'pendente'" in filtrada['parametros']
+    assert filtrada['duracao_ms'] >= 0
+    assert 'explain' not in filtrada  # EXPLAIN só no PostgreSQL
+
+    response = client.get('/api/metrics/consultas-lentas?limite=3')
+    assert response.status_code == 200
+    comandos = response.get_json()['comandos']
+    assert 0 < len(comandos) <= 3
+    assert all(comando['ocorrencias'] >= 1 and comando['maximo_ms'] >= comando['media_ms'] for comando in comandos)
+
+
+def test_consultas_abaixo_do_limite_ignoradas(client, db, registro, monkeypatch):
+    """Testa que nada é gravado quando os comandos ficam abaixo do limite."""
+    monkeypatch.setitem(client.application.config, 'CONSULTAS_LENTAS_MS', 60000)
+    client.get('/api/empresas')
+    assert registro.resumo() == []
+
+
+def test_resumo_restrito_a_administradores(client, db, registro, autenticacao_obrigatoria, token_de_usuario):
+    """Testa que só administradores consultam o resumo."""
+    token = token_de_usuario('leitor@empresa.com', 'visualizador')
+    response = client.get('/api/metrics/consultas-lentas', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 403
+
+    token = token_de_usuario('admin@empresa.com', 'administrador')
+    response = client.get('/api/metrics/consultas-lentas', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200
+
+
+def test_resumo_recusa_acesso_anonimo(client, db, registro, autenticacao_ativa):
+    """Testa que o resumo (SQL, parâmetros e caminho do log) exige token mesmo sem AUTH_OBRIGATORIA."""
+    assert client.get('/api/metrics/consultas-lentas').status_code == 401
+
+
+def test_parametros_de_usuarios_nao_sao_gravados(client, db, registro):
+    """Testa que o hash da senha não vai para o log quando o comando envolve a tabela de usuários."""
+    client.post('/api/register', json={'email': 'lento@empresa.com', 'password': 's3nh@forte'})
+
+    with open(registro.arquivo, encoding='utf-8') as arquivo:
+        conteudo = arquivo.read()
+    linhas = [json.loads(linha) for linha in conteudo.splitlines()]
+    insercao = next(linha for linha in linhas if linha['sql'].startswith('INSERT INTO users'))
+    assert insercao['parametros'] == '<omitidos>'
+    assert 'scrypt' not in conteudo and 'lento@empresa.com' not in conteudo
@@ -0,0 +1,168 @@
+import json
+import pytest
+from datetime import date
+from src.models.licenciamento import Condicionante
+from src.services.dias_uteis import CalendarioUteis, calendario, feriados, pascoa
+
+CNPJ_PETRO = "33.000.167/0001-01"
+
+
+@pytest.fixture
+def licenca(client, db):
+    empresa = client.post('/api/empresas', json={'razao_social': 'Empresa Prazos', 'cnpj': CNPJ_PETRO}).get_json()
+    response = client.post('/api/licencas', json={
+        'empresa_id': empresa['id'], 'tipo_licenca': 'LO Prazos',
+        'data_emissao': '2025-02-28', 'data_vencimento': '2030-01-01'
+    })
+    assert response.status_code == 201, response.get_data(as_text=True)
+    return response.get_json()
+
+
+def test_pascoa_e_feriados_moveis():
+    """Testa a Páscoa e os feriados calculados a partir dela."""
+    assert [pascoa(ano) for ano in (2024, 2025, 2026)] == [date(2024, 3, 31), date(2025, 4, 20), date(2026, 4, 5)]
+    do_ano = feriados(2025)
+    assert {date(2025, 3, 3), date(2025, 3, 4), date(2025, 4, 18), date(2025, 6, 19)} <= do_ano
+    assert {date(2025, 6, 24), date(2025, 9, 16), date(2025, 12, 8)} <= do_ano
+
+
+def test_somar_dias_uteis_pula_fim_de_semana_e_feriados():
+    """Testa a contagem em dias úteis atravessando fim de semana e Carnaval."""
+    # Sexta 28/02/2025 + 2 dias úteis: sábado, domingo e Carnaval (3 e 4/03) não contam
+    assert calendario.somar_dias_uteis(date(2025, 2, 28), 2) == date(2025, 3, 6)
+    assert calendario.somar_dias_uteis(date(2025, 3, 6), -2) == date(2025, 2, 28)
+    assert calendario.somar_dias_uteis(date(2025, 3, 1), 1) == date(2025, 3, 5)
+    assert not calendario.eh_dia_util(date(2025, 11, 20))
+    assert calendario.eh_dia_util(date(2025, 11, 21))
+
+
+def test_calcular_data_limite_por_tipo_de_contagem():
+    """Testa os três tipos de contagem e a recusa de um tipo desconhecido."""
+    base = date(2025, 2, 20)
+    assert calendario.calcular_data_limite(base, 9, 'corridos') == date(2025, 3, 1)
+    # Sábado 01/03, Carnaval em 03 e 04/03: prorrogado para quarta
+    assert calendario.calcular_data_limite(base, 9, 'corridos_dia_util') == date(2025, 3, 5)
+    assert calendario.calcular_data_limite(base, 9, 'uteis') == date(2025, 3, 7)
+    with pytest.raises(ValueError):
+        calendario.calcular_data_limite(base, 9, 'semanas')
+
+
+def test_calendario_estende_a_tabela_sob_demanda():
+    """Testa que datas fora do bloco inicial estendem a tabela sem alterar o resultado."""
+    calendario_novo = CalendarioUteis()
+    assert calendario_novo.somar_dias_uteis(date(2025, 2, 28), 2) == date(2025, 3, 6)
+    assert calendario_novo.somar_dias_uteis(date(2058, 12, 31), 1) == date(2059, 1, 2)
+    assert calendario_novo.somar_dias_uteis(date(1999, 12, 31), 1) == date(2000, 1, 3)
+    assert calendario_novo.somar_dias_uteis(date(2025, 2, 28), 2) == date(2025, 3, 6)
+
+
+def test_criar_condicionante_em_dias_uteis(client, licenca):
+    """Testa a criação pela API com tipo_contagem e a validação do valor."""
+    response = client.post('/api/condicionantes', json={
+        'licenca_id': licenca['id'], 'descricao': 'Protocolo', 'prazo_dias': 2, 'tipo_contagem': 'uteis'
+    })
+    assert response.status_code == 201, response.get_data(as_text=True)
+    assert response.get_json()['tipo_contagem'] == 'uteis'
+    assert response.get_json()['data_limite'] == '2025-03-06'
+
+    response = client.post('/api/condicionantes', json={
+        'licenca_id': licenca['id'], 'descricao': 'Inválida', 'prazo_dias': 2, 'tipo_contagem': 'semanas'
+    })
+    assert response.status_code == 400
+    assert 'erro' in response.get_json()
+
+
+def test_mudar_contagem_e_emissao_recalcula_em_dias_uteis(client, db, licenca):
+    """Testa o recálculo ao mudar o tipo de contagem e a data de emissão da licença."""
+    condicionante = client.post('/api/condicionantes', json={
+        'licenca_id': licenca['id'], 'descricao': 'Relatório', 'prazo_dias': 2
+    }).get_json()
+    assert condicionante['tipo_contagem'] == 'corridos'
+    assert condicionante['data_limite'] == '2025-03-02'
+
+    response = client.put(f"/api/condicionantes/{condicionante['id']}", json={'tipo_contagem': 'corridos_dia_util'})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.get_json()['data_limite'] == '2025-03-05'
+
+    client.put(f"/api/condicionantes/{condicionante['id']}", json={'tipo_contagem': 'uteis'})
+    previa = client.get(f"/api/licencas/{licenca['id']}/recalculo-prazos?data_emissao=2025-03-07").get_json()
+    assert previa['condicionantes'][0]['data_limite_nova'] == '2025-03-11'
+
+    response = client.put(f"/api/licencas/{licenca['id']}", json={'data_emissao': '2025-03-07'})
+    assert response.get_json()['condicionantes_recalculadas'] == 1
+    db.session.expire_all()
+    assert db.session.get(Condicionante, condicionante['id']).data_limite == date(2025, 3, 11)
+
+
+def test_recalcular_prazos_em_massa(runner, db, licenca):
+    """Testa o comando de recálculo em lotes, que só grava as datas que mudaram."""
+    licenca_id = licenca['id']
+    db.session.add_all([
+        Condicionante(licenca_id=licenca_id, descricao=f'Cond {i}', prazo_dias=2, tipo_contagem='uteis',
+                      data_limite=date(2025, 3, 2))
+        for i in range(5)
+    ] + [Condicionante(licenca_id=licenca_id, descricao='Certa', prazo_dias=2, tipo_contagem='corridos',
+                       data_limite=date(2025, 3, 2))])
+    db.session.commit()
+
+    result = runner.invoke(args=['recalcular-prazos', '--lote', '2'])
+    assert result.exit_code == 0, result.output
+    assert '6 condicionante(s) analisada(s), 5 com data limite alterada' in result.output
+    db.session.expire_all()
+    datas = {c.data_limite for c in Condicionante.query.filter_by(tipo_contagem='uteis')}
+    assert datas == {date(2025, 3, 6)}
+
+
+def test_importar_condicionante_em_dias_uteis(client, db, licenca):
+    """Testa a importação NDJSON com tipo_contagem."""
+    documentos = [
+        {'cnpj_empresa': CNPJ_PETRO, 'tipo_licenca': 'LO Importada', 'data_emissao': '2024-01-01',
+         'data_vencimento': '2028-01-01',
+         'condicionantes': [{'descricao': 'Úteis', 'prazo_dias': 10, 'tipo_contagem': 'uteis'}]},
+        {'cnpj_empresa': CNPJ_PETRO, 'tipo_licenca': 'LO Inválida', 'data_vencimento': '2028-01-01',
+         'condicionantes': [{'descricao': 'X', 'prazo_dias': 1, 'tipo_contagem': 'semanas'}]}
+    ]
+    response = client.post('/api/importacao/licencas', data='\n'.join(json.dumps(d) for d in documentos),
+                           content_type='application/x-ndjson')
+    assert response.status_code == 200, response.get_data(as_text=True)
+    data = response.get_json()
+    assert data['condicionantes_importadas'] == 1
+    assert [erro['linha'] for erro in data['erros']] == [2]
+    # 01/01/2024 é feriado; 10 dias úteis depois: 15/01
+    assert Condicionante.query.filter_by(descricao='Úteis').one().data_limite == date(2024, 1, 15)
+
+
+def test_recalcular_prazos_reabre_condicionante_vencida(runner, db, licenca):
+    """Testa que o recálculo em massa devolve a 'pendente' as condicionantes cujo prazo foi para o futuro."""
+    condicionante = Condicionante(licenca_id=licenca['id'], descricao='Prorrogada', prazo_dias=2000,
+                                  tipo_contagem='uteis', data_limite=date(2025, 3, 2), status='vencida')
+    db.session.add(condicionante)
+    db.session.commit()
+
+    result = runner.invoke(args=['recalcular-prazos'])
+    assert result.exit_code == 0, result.output
+    db.session.expire_all()
+    condicionante = db.session.get(Condicionante, condicionante.id)
+    assert condicionante.data_limite > date.today()
+    assert condicionante.status == 'pendente'
+
+
+def test_prazo_dias_fora_do_limite_retorna_400(client, db, licenca):
+    """Testa que prazos absurdos (que estourariam o calendário) são recusados na API e na importação."""
+    for prazo in (10 ** 9, -1, True, '30'):
+        response = client.post('/api/condicionantes', json={
+            'licenca_id': licenca['id'], 'descricao': 'Prazo inválido', 'prazo_dias': prazo, 'tipo_contagem': 'uteis'
+        })
+        assert response.status_code == 400, prazo
+
+    condicionante = client.post('/api/condicionantes', json={
+        'licenca_id': licenca['id'], 'descricao': 'Prazo válido', 'prazo_dias': 10
+    }).get_json()
+    response = client.put(f"/api/condicionantes/{condicionante['id']}", json={'prazo_dias': 10 ** 9})
+    assert response.status_code == 400
+    assert 'prazo_dias' in response.get_json()['erro']
+
+    documento = {'cnpj_empresa': CNPJ_PETRO, 'tipo_licenca': 'LO', 'data_vencimento': '2028-01-01',
+                 'condicionantes': [{'descricao': 'X', 'prazo_dias': 10 ** 9, 'tipo_contagem': 'uteis'}]}
+    response = client.post('/api/importacao/licencas', data=json.dumps(documento), content_type='application/x-ndjson')
+    assert response.get_json()['total_erros'] == 1
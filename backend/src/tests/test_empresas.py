@@ -95,14 +95,15 @@ def test_criar_empresa_sem_cnpj(client, db):
     assert 'erro' in data
     assert data['erro'] == 'CNPJ é obrigatório'
 
-def test_listar_empresas(client, db):
+def test_listar_empresas(client, db, assert_max_queries):
     """Testa a listagem de empresas."""
     res_a = client.post('/api/empresas', json={'razao_social': 'Empresa A', 'cnpj': CNPJ_PETRO})
     assert res_a.status_code == 201, res_a.get_data(as_text=True)
     res_b = client.post('/api/empresas', json={'razao_social': 'Empresa B', 'cnpj': CNPJ_VALE})
     assert res_b.status_code == 201, res_b.get_data(as_text=True)
 
-    response = client.get('/api/empresas')
+    with assert_max_queries(2):
+        response = client.get('/api/empresas')
     assert response.status_code == 200, response.get_data(as_text=True)
     data = response.get_json()
     assert len(data) == 2
@@ -111,6 +112,15 @@ def test_listar_empresas(client, db):
     assert any(e['razao_social'] == 'Empresa B' and e['cnpj'] == CNPJ_VALE_FMT for e in data)
 
 
+@pytest.mark.parametrize('quantidade', [10, 1000])
+def test_listar_empresas_orcamento_de_consultas(client, dados_em_volume, assert_max_queries, quantidade):
+    """Testa que a listagem usa o mesmo número de consultas com 10 ou 1.000 empresas."""
+    dados_em_volume(quantidade)
+    with assert_max_queries(2):
+        response = client.get('/api/empresas')
+    assert len(response.get_json()) == quantidade
+
+
 def test_obter_empresa(client, db):
     """Testa obter uma empresa específica."""
     res_post = client.post('/api/empresas', json={'razao_social': 'Empresa Detalhe', 'cnpj': CNPJ_BRADESCO})
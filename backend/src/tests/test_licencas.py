@@ -171,7 +171,7 @@ def test_listar_condicionantes_de_licenca_ordenadas(client, db, setup_empresa_pa
     assert descricoes_obtidas[2] == 'Cond C - Data Antiga'
     assert condicionantes_retornadas[2]['id'] == id_cond_c
 
-def test_listar_licencas_filtros(client, db, setup_empresa_para_licenca):
+def test_listar_licencas_filtros(client, db, setup_empresa_para_licenca, assert_max_queries):
     """Testa os filtros da listagem de licenças."""
     empresa_id_1 = setup_empresa_para_licenca
     # Cria outra empresa (precisa de CNPJ válido diferente)
@@ -191,21 +191,24 @@ def test_listar_licencas_filtros(client, db, setup_empresa_para_licenca):
     client.post('/api/licencas', json={'empresa_id': empresa_id_2, 'tipo_licenca': 'LI', 'status': 'ativa', 'data_vencimento': '2025-06-01'})
 
     # Filtro por empresa_id
-    response = client.get(f'/api/licencas?empresa_id={empresa_id_1}')
+    with assert_max_queries(2):
+        response = client.get(f'/api/licencas?empresa_id={empresa_id_1}')
     assert response.status_code == 200, response.get_data(as_text=True)
     data = response.get_json()
     assert len(data) == 2
     assert all(l['empresa_id'] == empresa_id_1 for l in data)
 
     # Filtro por status
-    response = client.get('/api/licencas?status=ativa')
+    with assert_max_queries(2):
+        response = client.get('/api/licencas?status=ativa')
     assert response.status_code == 200, response.get_data(as_text=True)
     data = response.get_json()
     assert len(data) == 2 # Uma da empresa 1, uma da empresa 2
     assert all(l['status'] == 'ativa' for l in data)
 
     # Filtro por empresa_id e status
-    response = client.get(f'/api/licencas?empresa_id={empresa_id_1}&status=ativa')
+    with assert_max_queries(2):
+        response = client.get(f'/api/licencas?empresa_id={empresa_id_1}&status=ativa')
     assert response.status_code == 200, response.get_data(as_text=True)
     data = response.get_json()
     assert len(data) == 1
@@ -213,6 +216,76 @@ def test_listar_licencas_filtros(client, db, setup_empresa_para_licenca):
     assert data[0]['status'] == 'ativa'
     assert data[0]['tipo_licenca'] == 'LO'
 
+@pytest.mark.parametrize('quantidade', [10, 1000])
+# A listagem completa faz uma consulta a mais: o validador do ETag (contagem e MAX(updated_at))
+@pytest.mark.parametrize('url, orcamento', [('/api/licencas', 2), ('/api/licencas/vencimento', 1)])
+def test_listagens_de_licencas_orcamento_de_consultas(client, dados_em_volume, assert_max_queries, url, orcamento, quantidade):
+    """Testa que as listagens carregam as empresas sem uma consulta por licença."""
+    dados_em_volume(quantidade)
+    with assert_max_queries(orcamento):
+        response = client.get(url)
+    data = response.get_json()
+    assert len(data) == quantidade
+    assert data[0]['empresa']['razao_social'].startswith('Empresa ')
+
+def test_atualizar_data_emissao_recalcula_condicionantes(client, db, setup_empresa_para_licenca):
+    """Testa que alterar a data de emissão recalcula as datas limite dependentes, com prévia."""
+    empresa_id = setup_empresa_para_licenca
+    data_emissao = date(2025, 1, 10)
+    res_lic = client.post('/api/licencas', json={
+        'empresa_id': empresa_id, 'tipo_licenca': 'LO Recalculo',
+        'data_emissao': data_emissao.isoformat(),
+        'data_vencimento': '2030-01-01'
+    })
+    assert res_lic.status_code == 201, res_lic.get_data(as_text=True)
+    licenca_id = res_lic.get_json()['id']
+
+    res_prazo = client.post('/api/condicionantes', json={'licenca_id': licenca_id, 'descricao': 'Com prazo', 'prazo_dias': 30})
+    res_fixa = client.post('/api/condicionantes', json={'licenca_id': licenca_id, 'descricao': 'Data fixa', 'data_limite': '2025-06-01'})
+    id_prazo = res_prazo.get_json()['id']
+    id_fixa = res_fixa.get_json()['id']
+    assert res_prazo.get_json()['data_limite'] == '2025-02-09'
+
+    nova_data_emissao = date(2025, 3, 1)
+
+    # Prévia não altera nada
+    response = client.get(f'/api/licencas/{licenca_id}/recalculo-prazos?data_emissao={nova_data_emissao.isoformat()}')
+    assert response.status_code == 200, response.get_data(as_text=True)
+    previa = response.get_json()
+    assert previa['total'] == 1
+    assert previa['condicionantes'][0]['id'] == id_prazo
+    assert previa['condicionantes'][0]['data_limite_atual'] == '2025-02-09'
+    assert previa['condicionantes'][0]['data_limite_nova'] == '2025-03-31'
+    assert db.session.get(Condicionante, id_prazo).data_limite == date(2025, 2, 9)
+
+    response = client.put(f'/api/licencas/{licenca_id}', json={'data_emissao': nova_data_emissao.isoformat()})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.get_json()['condicionantes_recalculadas'] == 1
+
+    db.session.expire_all()
+    assert db.session.get(Condicionante, id_prazo).data_limite == date(2025, 3, 31)
+    assert db.session.get(Condicionante, id_fixa).data_limite == date(2025, 6, 1)
+
 # Adicionar mais testes para atualização, deleção de licenças, etc.
 # Teste de deleção de licença com condicionantes (deve deletar em cascata)
 # Teste de dias_para_vencimento no to_dict
+
+def test_recalculo_reabre_condicionante_vencida(client, db, runner, setup_empresa_para_licenca):
+    """Testa que o recálculo por nova data de emissão devolve a condicionante vencida a 'pendente'."""
+    res_lic = client.post('/api/licencas', json={
+        'empresa_id': setup_empresa_para_licenca, 'tipo_licenca': 'LO Prorrogada',
+        'data_emissao': '2020-01-01', 'data_vencimento': '2035-01-01'
+    })
+    licenca_id = res_lic.get_json()['id']
+    condicionante_id = client.post('/api/condicionantes', json={
+        'licenca_id': licenca_id, 'descricao': 'Relatório', 'prazo_dias': 10
+    }).get_json()['id']
+    runner.invoke(args=['marcar-vencidas'])
+    assert db.session.get(Condicionante, condicionante_id).status == 'vencida'
+
+    response = client.put(f'/api/licencas/{licenca_id}', json={'data_emissao': '2030-01-01'})
+    assert response.get_json()['condicionantes_recalculadas'] == 1
+    db.session.expire_all()
+    condicionante = db.session.get(Condicionante, condicionante_id)
+    assert condicionante.data_limite == date(2030, 1, 11)
+    assert condicionante.status == 'pendente'
@@ -0,0 +1,40 @@
+import logging
+import re
+import pytest
+from src.services.metricas import RegistroMetricas
+
+
+@pytest.fixture
+def metricas(app, monkeypatch):
+    """Registro de métricas vazio: as contagens não incluem requisições de outros testes."""
+    registro = RegistroMetricas()
+    monkeypatch.setitem(app.extensions, 'metricas', registro)
+    return registro
+
+
+def test_metricas_por_rota_em_formato_prometheus(client, db, metricas):
+    """Testa a contagem de requisições, latência, tamanho de resposta e SQL por rota."""
+    client.post('/api/empresas', json={'razao_social': 'Empresa Métricas', 'cnpj': '33.000.167/0001-01'})
+    for _ in range(3):
+        assert client.get('/api/empresas').status_code == 200
+
+    response = client.get('/api/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    texto = response.get_data(as_text=True)
+
+    rotulos = 'blueprint="empresas",endpoint="empresas.listar_empresas",metodo="GET"'
+    assert re.search(rf'http_requisicoes_total\{{{rotulos},status="200"\}} 3\n', texto)
+    assert f'http_duracao_segundos_bucket{{{rotulos},le="+Inf"}}' in texto
+    assert f'http_resposta_bytes_count{{{rotulos}}}' in texto
+    assert re.search(rf'sql_consultas_total\{{{rotulos}\}} [1-9]', texto)
+    assert f'sql_duracao_segundos_total{{{rotulos}}}' in texto
+    # O próprio endpoint de métricas não é medido
+    assert 'metricas.exportar_metricas' not in texto
+
+def test_alerta_de_n_mais_1(client, app, db, caplog, monkeypatch):
+    """Testa o alerta quando o mesmo comando SQL se repete além do limite numa requisição."""
+    monkeypatch.setitem(app.config, 'METRICAS_LIMITE_N_MAIS_1', 0)
+    with caplog.at_level(logging.WARNING):
+        client.get('/api/empresas')
+    assert any('Possível N+1 em GET /api/empresas' in registro.getMessage() for registro in caplog.records)
@@ -0,0 +1,69 @@
+import os
+import pytest
+
+
+@pytest.fixture
+def pasta_perfis(app, tmp_path, monkeypatch):
+    pasta = tmp_path / 'perfis'
+    monkeypatch.setitem(app.config, 'PERFIS_PASTA', str(pasta))
+    return pasta
+
+
+def test_requisicao_com_x_profile_gera_perfil(client, db, pasta_perfis):
+    """Testa o perfil gravado em disco, o cabeçalho Link e o resumo por função."""
+    response = client.get('/api/empresas', headers={'X-Profile': '1'})
+    assert response.status_code == 200
+    nome = response.headers['X-Profile']
+    assert response.headers['Link'] == f'</api/perfis/{nome}>; rel="profile"'
+    assert os.listdir(pasta_perfis) == [nome]
+
+    resumo = client.get(f'/api/perfis/{nome}?funcoes=200').get_json()
+    assert resumo['chamadas'] > 0
+    assert any('listar_empresas' in funcao['funcao'] for funcao in resumo['funcoes'])
+    acumulados = [funcao['tempo_acumulado_s'] for funcao in resumo['funcoes']]
+    assert acumulados == sorted(acumulados, reverse=True)
+
+    arquivo = client.get(f'/api/perfis/{nome}?formato=prof')
+    assert arquivo.status_code == 200
+    assert arquivo.data == (pasta_perfis / nome).read_bytes()
+    assert client.get('/api/perfis').get_json()[0]['nome'] == nome
+
+
+def test_sem_cabecalho_nao_perfila(client, db, pasta_perfis):
+    """Testa que requisições comuns não geram perfil."""
+    response = client.get('/api/empresas')
+    assert 'Link' not in response.headers
+    assert not pasta_perfis.exists()
+    assert client.get('/api/perfis/inexistente.prof').status_code == 404
+
+
+def test_perfis_antigos_removidos(client, app, db, pasta_perfis, monkeypatch):
+    """Testa o limite de arquivos de perfil guardados."""
+    monkeypatch.setitem(app.config, 'PERFIS_MAXIMO_ARQUIVOS', 2)
+    nomes = [client.get('/api/empresas?_profile=1').headers['X-Profile'] for _ in range(3)]
+    restantes = os.listdir(pasta_perfis)
+    assert len(restantes) == 2
+    assert nomes[-1] in restantes
+
+
+def test_perfil_restrito_a_administradores(client, db, pasta_perfis, autenticacao_obrigatoria, token_de_usuario):
+    """Testa que o cabeçalho é ignorado para quem não é administrador."""
+    token = token_de_usuario('leitor@empresa.com', 'visualizador')
+    response = client.get('/api/empresas', headers={'X-Profile': '1', 'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200
+    assert 'X-Profile' not in response.headers
+    assert client.get('/api/perfis', headers={'Authorization': f'Bearer {token}'}).status_code == 403
+
+    token = token_de_usuario('admin@empresa.com', 'administrador')
+    response = client.get('/api/empresas', headers={'X-Profile': '1', 'Authorization': f'Bearer {token}'})
+    assert 'X-Profile' in response.headers
+
+
+def test_perfis_recusam_acesso_anonimo(client, db, pasta_perfis, autenticacao_ativa):
+    """Testa que a listagem e os arquivos exigem token, mesmo sem AUTH_OBRIGATORIA."""
+    pasta_perfis.mkdir()
+    (pasta_perfis / '20260101-000000-empresas-abcd1234.prof').write_bytes(b'x')
+    assert client.get('/api/perfis').status_code == 401
+    assert client.get('/api/perfis/20260101-000000-empresas-abcd1234.prof?formato=prof').status_code == 401
+    response = client.get('/api/empresas', headers={'X-Profile': '1'})
+    assert 'X-Profile' not in response.headers
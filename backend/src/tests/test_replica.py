@@ -0,0 +1,56 @@
+import os
+import tempfile
+import pytest
+from src.main import create_app
+from src.models.user import db as _db
+from src.models.banco import BIND_REPLICA, COOKIE_PRIMARIO
+from src.models.licenciamento import Empresa
+
+
+@pytest.fixture
+def app_com_replica():
+    """Aplicação com dois bancos SQLite: o principal e uma 'réplica' independente."""
+    pasta = tempfile.mkdtemp()
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(pasta, "primario.db")}',
+        'SQLALCHEMY_BINDS': {BIND_REPLICA: f'sqlite:///{os.path.join(pasta, "replica.db")}'},
+        'UPLOAD_FOLDER': pasta,
+        'LOGIN_DISABLED': True
+    })
+    with app.app_context():
+        _db.create_all()
+        _db.metadata.create_all(_db.engines[BIND_REPLICA])
+        # Conteúdo diferente em cada banco, para saber de onde veio a leitura
+        with _db.engines[BIND_REPLICA].begin() as conexao:
+            conexao.execute(_db.insert(Empresa), {'razao_social': 'Empresa na Réplica', 'cnpj': '00000000000001'})
+    yield app
+    with app.app_context():
+        for engine in _db.engines.values():
+            engine.dispose()
+    # O metadata do bind é global na extensão; sem isso o create_all de outras aplicações o procuraria
+    _db.metadatas.pop(BIND_REPLICA, None)
+
+
+def test_get_le_da_replica_e_escrita_vai_para_o_primario(app_com_replica):
+    """Testa o roteamento das leituras e a leitura no primário logo após uma escrita."""
+    client = app_com_replica.test_client()
+
+    response = client.get('/api/empresas')
+    assert [e['razao_social'] for e in response.get_json()] == ['Empresa na Réplica']
+
+    response = client.post('/api/empresas', json={'razao_social': 'Empresa Nova', 'cnpj': '33.000.167/0001-01'})
+    assert response.status_code == 201
+    assert COOKIE_PRIMARIO in response.headers.get('Set-Cookie', '')
+
+    # Com o cookie, o mesmo cliente lê o que acabou de gravar
+    response = client.get('/api/empresas')
+    assert [e['razao_social'] for e in response.get_json()] == ['Empresa Nova']
+
+    # Outro cliente (sem cookie) continua lendo da réplica
+    response = app_com_replica.test_client().get('/api/empresas')
+    assert [e['razao_social'] for e in response.get_json()] == ['Empresa na Réplica']
+
+    # Leituras que não gravam nada não renovam o cookie
+    response = client.get('/api/empresas')
+    assert 'Set-Cookie' not in response.headers
@@ -0,0 +1,33 @@
+from datetime import date, datetime
+from decimal import Decimal
+import pytest
+from src.services import serializacao
+
+
+def test_datas_dos_modelos_em_iso_8601(client, db):
+    """Testa que os to_dict() devolvem datas cruas e a resposta as traz em ISO 8601."""
+    empresa = client.post('/api/empresas', json={'razao_social': 'Empresa JSON', 'cnpj': '33.000.167/0001-01'}).get_json()
+    response = client.post('/api/licencas', json={
+        'empresa_id': empresa['id'], 'tipo_licenca': 'LO',
+        'data_emissao': '2024-01-15', 'data_vencimento': '2028-01-15'
+    })
+    assert response.status_code == 201
+    licenca = response.get_json()
+    assert licenca['data_emissao'] == '2024-01-15'
+    assert licenca['data_vencimento'] == '2028-01-15'
+    assert datetime.fromisoformat(licenca['created_at'])
+
+
+@pytest.mark.parametrize('usar_orjson', [True, False])
+def test_provedor_com_e_sem_orjson(app, monkeypatch, usar_orjson):
+    """Testa que o fallback para o módulo json produz o mesmo documento que o orjson."""
+    if not usar_orjson:
+        monkeypatch.setattr(serializacao, 'orjson', None)
+    dados = {'b': date(2024, 1, 15), 'a': datetime(2024, 1, 15, 8, 30, 5), 'valor': Decimal('1.50')}
+
+    texto = app.json.dumps(dados)
+    assert app.json.loads(texto) == {'a': '2024-01-15T08:30:05', 'b': '2024-01-15', 'valor': '1.50'}
+    with app.app_context():
+        assert app.json.response(dados).get_json()['b'] == '2024-01-15'
+    with pytest.raises(TypeError):
+        app.json.dumps({'objeto': object()})
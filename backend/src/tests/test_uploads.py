@@ -0,0 +1,383 @@
+import pytest
+import hashlib
+import io
+import os
+from datetime import date
+from src.models.licenciamento import Empresa, Licenca, Condicionante, Comprovante, UploadComprovante
+
+EMPRESA_CNPJ_UPLOAD_TEST = "33000167000101" # CNPJ_PETRO
+CONTEUDO = b"%PDF-1.4 relatorio de monitoramento " * 100
+
+
+@pytest.fixture
+def condicionante_upload(db):
+    """Cria uma condicionante para receber o comprovante."""
+    empresa = Empresa(razao_social='Empresa Upload', cnpj=EMPRESA_CNPJ_UPLOAD_TEST)
+    db.session.add(empresa)
+    db.session.flush()
+    licenca = Licenca(empresa_id=empresa.id, tipo_licenca='LO', data_vencimento=date(2030, 1, 1))
+    db.session.add(licenca)
+    db.session.flush()
+    condicionante = Condicionante(licenca_id=licenca.id, descricao='Enviar relatório')
+    db.session.add(condicionante)
+    db.session.commit()
+    return condicionante.id
+
+def _enviar(client, upload_id, inicio, dados, total=len(CONTEUDO)):
+    return client.put(f'/api/uploads/{upload_id}', data=dados, content_type='application/octet-stream',
+                      headers={'Content-Range': f'bytes {inicio}-{inicio + len(dados) - 1}/{total}'})
+
+def test_upload_em_partes_com_retomada(client, app, db, condicionante_upload):
+    """Testa o fluxo criar sessão → partes → retomada → finalizar."""
+    response = client.post('/api/uploads', json={
+        'nome_arquivo': 'relatorio.pdf', 'tamanho': len(CONTEUDO), 'condicionante_id': condicionante_upload
+    })
+    assert response.status_code == 201, response.get_data(as_text=True)
+    upload_id = response.get_json()['id']
+
+    response = _enviar(client, upload_id, 0, CONTEUDO[:1000])
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.headers['Upload-Offset'] == '1000'
+
+    # Parte fora de sequência é recusada e informa de onde retomar
+    response = _enviar(client, upload_id, 2000, CONTEUDO[2000:3000])
+    assert response.status_code == 409
+    assert response.get_json()['recebidos'] == 1000
+
+    # Cliente consulta o estado e retoma a partir do que o servidor já tem
+    response = client.get(f'/api/uploads/{upload_id}')
+    assert response.get_json()['recebidos'] == 1000
+
+    response = _enviar(client, upload_id, 1000, CONTEUDO[1000:])
+    assert response.status_code == 200
+    assert response.get_json()['recebidos'] == len(CONTEUDO)
+
+    sha256 = hashlib.sha256(CONTEUDO).hexdigest()
+    response = client.post(f'/api/uploads/{upload_id}/finalizar', json={'sha256': sha256})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    data = response.get_json()
+    assert data['status'] == 'concluido'
+    assert data['sha256'] == sha256
+    assert data['comprovante_path'] == f'comprovantes/{sha256[:2]}/{sha256}.pdf'
+    assert data['deduplicado'] is False
+
+    caminho = os.path.join(app.config['UPLOAD_FOLDER'], data['comprovante_path'])
+    with open(caminho, 'rb') as arquivo:
+        assert arquivo.read() == CONTEUDO
+    assert db.session.get(Condicionante, condicionante_upload).comprovante_path == data['comprovante_path']
+
+def test_upload_reconstroi_hash_do_arquivo_parcial(client, db, condicionante_upload):
+    """Testa que o SHA-256 é reconstruído do disco quando o estado em memória não existe."""
+    from src.services import comprovantes
+    response = client.post('/api/uploads', json={'nome_arquivo': 'scan.png', 'tamanho': len(CONTEUDO)})
+    upload_id = response.get_json()['id']
+
+    _enviar(client, upload_id, 0, CONTEUDO[:500])
+    comprovantes._hashes_em_andamento.clear() # Simula outro worker atendendo a próxima parte
+    _enviar(client, upload_id, 500, CONTEUDO[500:])
+
+    response = client.post(f'/api/uploads/{upload_id}/finalizar')
+    assert response.status_code == 200
+    assert response.get_json()['sha256'] == hashlib.sha256(CONTEUDO).hexdigest()
+
+def test_upload_validacoes(client, app, db):
+    """Testa limite de tamanho, extensão, upload incompleto e SHA-256 divergente."""
+    response = client.post('/api/uploads', json={'nome_arquivo': 'virus.exe', 'tamanho': 10})
+    assert response.status_code == 400
+    assert response.get_json()['erro'] == 'Tipo de arquivo não permitido'
+
+    response = client.post('/api/uploads', json={
+        'nome_arquivo': 'grande.pdf', 'tamanho': app.config['MAX_COMPROVANTE_BYTES'] + 1
+    })
+    assert response.status_code == 413
+
+    response = client.post('/api/uploads', json={'nome_arquivo': 'doc.pdf', 'tamanho': 10})
+    upload_id = response.get_json()['id']
+    response = _enviar(client, upload_id, 0, b'0123456789ABC', total=10)
+    assert response.status_code == 413
+
+    _enviar(client, upload_id, 0, b'01234', total=10)
+    response = client.post(f'/api/uploads/{upload_id}/finalizar')
+    assert response.status_code == 409
+
+    _enviar(client, upload_id, 5, b'56789', total=10)
+    response = client.post(f'/api/uploads/{upload_id}/finalizar', json={'sha256': '0' * 64})
+    assert response.status_code == 422
+
+    response = client.delete(f'/api/uploads/{upload_id}')
+    assert response.status_code == 200
+    assert db.session.get(UploadComprovante, upload_id) is None
+
+def _upload_completo(client, conteudo, nome='relatorio.pdf', condicionante_id=None):
+    response = client.post('/api/uploads', json={
+        'nome_arquivo': nome, 'tamanho': len(conteudo), 'condicionante_id': condicionante_id
+    })
+    upload_id = response.get_json()['id']
+    _enviar(client, upload_id, 0, conteudo, total=len(conteudo))
+    return client.post(f'/api/uploads/{upload_id}/finalizar').get_json()
+
+def test_upload_deduplicado_por_sha256(client, app, db, condicionante_upload):
+    """Testa que conteúdo idêntico é armazenado uma vez e apenas vinculado nas demais."""
+    conteudo = b"%PDF-1.4 laudo de ruido ambiental " * 50
+    primeiro = _upload_completo(client, conteudo)
+    sha256 = primeiro['sha256']
+
+    # Mesmo conteúdo enviado de novo: arquivo recebido é descartado
+    segundo = _upload_completo(client, conteudo, nome='copia.pdf', condicionante_id=condicionante_upload)
+    assert segundo['deduplicado'] is True
+    assert segundo['comprovante_path'] == primeiro['comprovante_path']
+
+    # Só o hash não basta para obter o arquivo: a sessão continua esperando o conteúdo
+    response = client.post('/api/uploads', json={
+        'nome_arquivo': 'outra.pdf', 'tamanho': len(conteudo), 'sha256': sha256.upper(),
+        'condicionante_id': condicionante_upload
+    })
+    assert response.status_code == 201
+    assert response.get_json()['status'] == 'em_andamento'
+    assert response.get_json()['recebidos'] == 0
+
+    pasta = os.path.join(app.config['UPLOAD_FOLDER'], 'comprovantes', sha256[:2])
+    assert os.listdir(pasta) == [f'{sha256}.pdf']
+    assert db.session.get(Comprovante, sha256).referencias == 1
+
+def test_upload_sha256_declarado(client, db):
+    """Testa a validação do SHA-256 informado na criação e a conferência na finalização."""
+    for invalido in (123, 'abc', 'g' * 64, ['a' * 64]):
+        response = client.post('/api/uploads', json={'nome_arquivo': 'a.pdf', 'tamanho': 10, 'sha256': invalido})
+        assert response.status_code == 400
+
+    response = client.post('/api/uploads', json={'nome_arquivo': 'a.pdf', 'tamanho': len(CONTEUDO), 'sha256': 'f' * 64})
+    upload_id = response.get_json()['id']
+    _enviar(client, upload_id, 0, CONTEUDO)
+    response = client.post(f'/api/uploads/{upload_id}/finalizar')
+    assert response.status_code == 422
+    assert response.get_json()['sha256'] == hashlib.sha256(CONTEUDO).hexdigest()
+
+def test_finalizacoes_simultaneas_do_mesmo_conteudo(client, app, db, monkeypatch):
+    """Testa que a sessão que perde a corrida pelo INSERT é deduplicada em vez de falhar."""
+    conteudo = b"%PDF-1.4 enviado por dois tecnicos " * 40
+    primeiro = _upload_completo(client, conteudo)
+    assert primeiro['status'] == 'concluido'
+
+    response = client.post('/api/uploads', json={'nome_arquivo': 'copia.pdf', 'tamanho': len(conteudo)})
+    upload_id = response.get_json()['id']
+    _enviar(client, upload_id, 0, conteudo, total=len(conteudo))
+
+    # A consulta inicial não vê o comprovante (gravado por outra sessão logo em seguida)
+    get_original = db.session.get
+    ocultar = [True]
+    def get_simulando_corrida(entidade, ident, **kwargs):
+        if entidade is Comprovante and ocultar:
+            ocultar.pop()
+            return None
+        return get_original(entidade, ident, **kwargs)
+    monkeypatch.setattr(db.session, 'get', get_simulando_corrida)
+
+    response = client.post(f'/api/uploads/{upload_id}/finalizar')
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.get_json()['deduplicado'] is True
+    assert response.get_json()['comprovante_path'] == primeiro['comprovante_path']
+    assert not os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], 'parciais', f'{upload_id}.part'))
+
+def test_referencias_liberadas_ao_desvincular(client, db, condicionante_upload):
+    """Testa a contagem de referências ao marcar pendente e ao apagar condicionantes."""
+    condicionante = db.session.get(Condicionante, condicionante_upload)
+    outra = Condicionante(licenca_id=condicionante.licenca_id, descricao='Outra')
+    db.session.add(outra)
+    db.session.commit()
+    outra_id = outra.id
+
+    sha256 = _upload_completo(client, CONTEUDO, condicionante_id=condicionante_upload)['sha256']
+    _upload_completo(client, CONTEUDO, condicionante_id=outra_id)
+    assert db.session.get(Comprovante, sha256).referencias == 2
+
+    client.post(f'/api/condicionantes/{condicionante_upload}/marcar-pendente')
+    db.session.expire_all()
+    assert db.session.get(Comprovante, sha256).referencias == 1
+
+    response = client.post('/api/condicionantes/bulk-status', json={'status': 'cumprida', 'ids': [outra_id]})
+    assert response.status_code == 200
+    db.session.expire_all()
+    assert db.session.get(Comprovante, sha256).referencias == 0
+
+def test_download_comprovante_condicional_e_parcial(client, db, condicionante_upload):
+    """Testa ETag (SHA-256), 304 e requisições Range no download do comprovante."""
+    sha256 = _upload_completo(client, CONTEUDO, condicionante_id=condicionante_upload)['sha256']
+
+    response = client.get(f'/api/condicionantes/{condicionante_upload}/comprovante')
+    assert response.status_code == 200
+    assert response.data == CONTEUDO
+    assert response.headers['ETag'] == f'"{sha256}"'
+
+    response = client.get(f'/api/condicionantes/{condicionante_upload}/comprovante',
+                          headers={'If-None-Match': f'"{sha256}"'})
+    assert response.status_code == 304
+
+    response = client.get(f'/api/condicionantes/{condicionante_upload}/comprovante',
+                          headers={'Range': 'bytes=10-19'})
+    assert response.status_code == 206
+    assert response.data == CONTEUDO[10:20]
+    assert response.headers['Content-Range'] == f'bytes 10-19/{len(CONTEUDO)}'
+
+def test_preview_de_comprovante_imagem(client, app, db, condicionante_upload):
+    """Testa a geração de miniatura após o upload e o endpoint de preview."""
+    Image = pytest.importorskip('PIL.Image')
+    buffer = io.BytesIO()
+    Image.new('RGB', (2400, 1600), color=(30, 120, 60)).save(buffer, 'PNG')
+    imagem = buffer.getvalue()
+
+    _upload_completo(client, imagem, nome='foto_campo.png', condicionante_id=condicionante_upload)
+
+    response = client.get(f'/api/condicionantes/{condicionante_upload}/comprovante/preview?tamanho=thumb')
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.mimetype == 'image/jpeg'
+    miniatura = Image.open(io.BytesIO(response.data))
+    assert max(miniatura.size) == 240
+
+    response = client.get(f'/api/condicionantes/{condicionante_upload}/comprovante/preview?tamanho=preview')
+    assert max(Image.open(io.BytesIO(response.data)).size) == 1280
+
+    response = client.get(f'/api/condicionantes/{condicionante_upload}/comprovante/preview?tamanho=enorme')
+    assert response.status_code == 400
+
+def test_limpeza_de_comprovantes_orfaos(client, app, db, runner, condicionante_upload):
+    """Testa o comando que remove comprovantes sem referência (e suas miniaturas)."""
+    Image = pytest.importorskip('PIL.Image')
+    pasta_uploads = app.config['UPLOAD_FOLDER']
+    buffer = io.BytesIO()
+    Image.new('RGB', (300, 200), color=(200, 40, 40)).save(buffer, 'PNG')
+
+    usado = _upload_completo(client, b"%PDF-1.4 licenca de operacao vigente " * 40,
+                             condicionante_id=condicionante_upload)['comprovante_path']
+    orfao = _upload_completo(client, buffer.getvalue(), nome='descartada.png')['comprovante_path']
+    recente = _upload_completo(client, b"%PDF-1.4 enviado agora " * 40)['comprovante_path']
+    miniatura = os.path.join(pasta_uploads, orfao.rsplit('.', 1)[0] + '.thumb.jpg')
+    assert os.path.exists(miniatura)
+
+    antigo = os.path.getmtime(os.path.join(pasta_uploads, usado)) - 3 * 24 * 3600
+    for caminho in (usado, orfao):
+        os.utime(os.path.join(pasta_uploads, caminho), (antigo, antigo))
+
+    result = runner.invoke(args=['limpar-comprovantes', '--simular'])
+    assert result.exit_code == 0, result.output
+    assert '1 órfão(s) seriam removido(s)' in result.output
+    assert os.path.exists(os.path.join(pasta_uploads, orfao))
+
+    result = runner.invoke(args=['limpar-comprovantes', '--quarentena', '--lote', '1'])
+    assert result.exit_code == 0, result.output
+    assert '1 órfão(s) movido(s) para a quarentena' in result.output
+
+    assert os.path.exists(os.path.join(pasta_uploads, usado))
+    assert os.path.exists(os.path.join(pasta_uploads, recente))
+    assert not os.path.exists(os.path.join(pasta_uploads, orfao))
+    assert not os.path.exists(miniatura)
+    assert os.path.exists(os.path.join(pasta_uploads, 'quarentena', orfao))
+    assert db.session.execute(db.select(Comprovante).filter_by(caminho=orfao)).scalar() is None
+
+def test_limpeza_preserva_arquivo_vinculado_durante_a_coleta(client, app, db, monkeypatch):
+    """Testa que só são apagados os arquivos cujos metadados a coleta removeu de fato."""
+    from src.services import limpeza_comprovantes
+    pasta_uploads = app.config['UPLOAD_FOLDER']
+    vinculado = _upload_completo(client, b"%PDF-1.4 vinculado no meio da coleta " * 40)['comprovante_path']
+    substituido = _upload_completo(client, b"%PDF-1.4 reenviado durante a coleta " * 40)['comprovante_path']
+    sem_metadados = 'comprovantes/zz/arquivo_solto.pdf'
+    os.makedirs(os.path.join(pasta_uploads, 'comprovantes', 'zz'), exist_ok=True)
+    with open(os.path.join(pasta_uploads, sem_metadados), 'wb') as arquivo:
+        arquivo.write(b'sem linha em comprovantes')
+    for caminho in (vinculado, substituido, sem_metadados):
+        antigo = os.path.getmtime(os.path.join(pasta_uploads, caminho)) - 3 * 24 * 3600
+        os.utime(os.path.join(pasta_uploads, caminho), (antigo, antigo))
+
+    # Entre a consulta de referências e o DELETE, um upload deduplicado se vincula a um
+    # arquivo e outro conteúdo é reenviado (o arquivo volta com mtime novo)
+    consulta_original = limpeza_comprovantes._caminhos_referenciados
+    def consulta_e_concorrencia(caminhos):
+        referenciados = consulta_original(caminhos)
+        db.session.execute(db.update(Comprovante).where(Comprovante.caminho == vinculado).values(referencias=1))
+        os.utime(os.path.join(pasta_uploads, substituido))
+        return referenciados
+    monkeypatch.setattr(limpeza_comprovantes, '_caminhos_referenciados', consulta_e_concorrencia)
+
+    with app.test_request_context():
+        resultado = limpeza_comprovantes.coletar_comprovantes_orfaos()
+
+    assert os.path.exists(os.path.join(pasta_uploads, vinculado))
+    assert os.path.exists(os.path.join(pasta_uploads, substituido))
+    assert not os.path.exists(os.path.join(pasta_uploads, sem_metadados))
+    assert db.session.execute(db.select(Comprovante).filter_by(caminho=vinculado)).scalar() is not None
+
+def test_preview_que_falhou_nao_e_reagendado(client, app, db, condicionante_upload, monkeypatch):
+    """Testa que uma imagem corrompida responde 415 em vez de 202 a cada consulta."""
+    pytest.importorskip('PIL.Image')
+    from src.services import previews
+    _upload_completo(client, b'nao sou um png' * 100, nome='corrompida.png', condicionante_id=condicionante_upload)
+
+    chamadas = []
+    monkeypatch.setattr(previews, 'gerar_previews', lambda caminho: chamadas.append(caminho))
+    for _ in range(2):
+        response = client.get(f'/api/condicionantes/{condicionante_upload}/comprovante/preview')
+        assert response.status_code == 415
+    assert chamadas == []
+
+def test_preview_de_pdf_sem_renderizador(client, db, condicionante_upload, monkeypatch):
+    """Testa que PDFs sem PyMuPDF nem pdftoppm não ficam em 202 para sempre."""
+    pytest.importorskip('PIL.Image')
+    from src.services import previews
+    monkeypatch.setattr(previews, '_modulo_disponivel', lambda nome: nome == 'PIL')
+    monkeypatch.setattr(previews.shutil, 'which', lambda nome: None)
+    _upload_completo(client, b"%PDF-1.4 sem renderizador " * 40, condicionante_id=condicionante_upload)
+
+    response = client.get(f'/api/condicionantes/{condicionante_upload}/comprovante/preview')
+    assert response.status_code == 404
+
+def test_partes_e_finalizacao_travam_a_sessao(client, db, monkeypatch):
+    """Testa que a sessão é lida com FOR UPDATE antes de gravar partes ou finalizar."""
+    upload_id = client.post('/api/uploads', json={'nome_arquivo': 'a.pdf', 'tamanho': len(CONTEUDO)}).get_json()['id']
+    get_original = db.session.get
+    travadas = []
+    def get_espiao(entidade, ident, **kwargs):
+        if entidade is UploadComprovante:
+            travadas.append(kwargs.get('with_for_update'))
+        return get_original(entidade, ident, **kwargs)
+    monkeypatch.setattr(db.session, 'get', get_espiao)
+
+    assert _enviar(client, upload_id, 0, CONTEUDO).status_code == 200
+    assert client.post(f'/api/uploads/{upload_id}/finalizar').status_code == 200
+    assert travadas == [True, True]
+
+def test_pool_de_previews_quebrado(client, app, db, condicionante_upload, monkeypatch):
+    """Testa que um pool quebrado é descartado sem derrubar a finalização nem travar o arquivo em 202."""
+    Image = pytest.importorskip('PIL.Image')
+    from concurrent.futures.process import BrokenProcessPool
+    from src.services import previews
+
+    pools = []
+
+    class PoolQuebrado:
+        def __init__(self, max_workers):
+            pools.append(self)
+            self.encerrado = False
+
+        def submit(self, *argumentos):
+            raise BrokenProcessPool('processo morto')
+
+        def shutdown(self, wait=True, cancel_futures=False):
+            self.encerrado = True
+
+    monkeypatch.setitem(app.config, 'PREVIEW_WORKERS', 2)
+    monkeypatch.setattr(previews, 'ProcessPoolExecutor', PoolQuebrado)
+    monkeypatch.setattr(previews, '_executor', None)
+    buffer = io.BytesIO()
+    Image.new('RGB', (300, 200)).save(buffer, 'PNG')
+
+    resultado = _upload_completo(client, buffer.getvalue(), nome='foto.png', condicionante_id=condicionante_upload)
+    assert resultado['status'] == 'concluido'
+    assert previews._executor is None
+    assert pools[0].encerrado
+    assert previews._em_andamento == set()
+
+    # A consulta tenta de novo com um pool novo, em vez de reaproveitar o quebrado
+    response = client.get(f'/api/condicionantes/{condicionante_upload}/comprovante/preview')
+    assert response.status_code == 202
+    assert len(pools) == 2
+    assert previews._em_andamento == set()
@@ -0,0 +1,186 @@
+import threading
+import pytest
+from werkzeug.security import generate_password_hash
+from src.models.user import User
+from src.services import autenticacao, senhas
+
+
+def test_register_e_login(client, db):
+    """Testa o cadastro e o login com o hash calculado pelo serviço de senhas."""
+    response = client.post('/api/register', json={'email': 'tecnico@empresa.com', 'password': 's3nh@forte'})
+    assert response.status_code == 201, response.get_data(as_text=True)
+    usuario = db.session.execute(db.select(User).filter_by(email='tecnico@empresa.com')).scalar_one()
+    assert usuario.password_hash.startswith('scrypt:32768:8:1$')
+
+    response = client.post('/api/login', json={'email': 'tecnico@empresa.com', 'password': 's3nh@forte'})
+    assert response.status_code == 200
+    assert 'token' in response.get_json()
+
+    response = client.post('/api/login', json={'email': 'tecnico@empresa.com', 'password': 'errada'})
+    assert response.status_code == 401
+
+def test_login_refaz_hash_com_parametros_antigos(client, db):
+    """Testa que um hash com parâmetros desatualizados é substituído no login."""
+    antigo = generate_password_hash('s3nh@forte', method='pbkdf2:sha256:1000')
+    db.session.add(User(email='antigo@empresa.com', password_hash=antigo))
+    db.session.commit()
+
+    response = client.post('/api/login', json={'email': 'antigo@empresa.com', 'password': 'errada'})
+    assert response.status_code == 401
+    db.session.expire_all()
+    assert db.session.execute(db.select(User.password_hash)).scalar_one() == antigo
+
+    response = client.post('/api/login', json={'email': 'antigo@empresa.com', 'password': 's3nh@forte'})
+    assert response.status_code == 200
+    db.session.expire_all()
+    novo = db.session.execute(db.select(User.password_hash)).scalar_one()
+    assert novo.startswith('scrypt:32768:8:1$')
+
+    response = client.post('/api/login', json={'email': 'antigo@empresa.com', 'password': 's3nh@forte'})
+    assert response.status_code == 200
+
+def test_login_com_fila_cheia_retorna_503(client, db, monkeypatch):
+    """Testa que o login é recusado com 503 quando a fila de hashes está cheia."""
+    db.session.add(User(email='ocupado@empresa.com', password_hash=generate_password_hash('x')))
+    db.session.commit()
+
+    cheia = threading.BoundedSemaphore(1)
+    cheia.acquire()
+    monkeypatch.setattr(senhas, '_vagas', cheia)
+
+    response = client.post('/api/login', json={'email': 'ocupado@empresa.com', 'password': 'x'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+def test_rotas_exigem_token_valido(client, db, autenticacao_obrigatoria, token_de_usuario, monkeypatch):
+    """Testa a verificação do token e o cache das claims já verificadas."""
+    token = token_de_usuario('leitor@empresa.com', 'visualizador')
+
+    response = client.get('/api/empresas')
+    assert response.status_code == 401
+    assert response.headers['WWW-Authenticate'] == 'Bearer'
+    response = client.get('/api/empresas', headers={'Authorization': 'Bearer nao-e-um-jwt'})
+    assert response.status_code == 401
+    assert response.get_json()['erro'] == 'Token inválido'
+
+    chamadas = []
+    decode_original = autenticacao.jwt.decode
+    monkeypatch.setattr(autenticacao.jwt, 'decode', lambda *a, **k: chamadas.append(1) or decode_original(*a, **k))
+    for _ in range(3):
+        response = client.get('/api/empresas', headers={'Authorization': f'Bearer {token}'})
+        assert response.status_code == 200
+    assert len(chamadas) <= 1
+
+    # Papel vem das claims: visualizador não lista usuários
+    response = client.get('/api/users', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 403
+
+def test_troca_de_papel_revoga_tokens(client, db, autenticacao_obrigatoria, token_de_usuario):
+    """Testa que alterar o papel do usuário invalida os tokens emitidos antes."""
+    admin = token_de_usuario('admin@empresa.com', 'administrador')
+    token = token_de_usuario('editor@empresa.com', 'editor')
+    editor_id = db.session.execute(db.select(User.id).filter_by(email='editor@empresa.com')).scalar_one()
+
+    response = client.get('/api/users', headers={'Authorization': f'Bearer {admin}'})
+    assert response.status_code == 200
+
+    response = client.put(f'/api/users/{editor_id}', json={'role': 'visualizador'},
+                          headers={'Authorization': f'Bearer {admin}'})
+    assert response.status_code == 200
+
+    response = client.get('/api/empresas', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 401
+    assert response.get_json()['erro'] == 'Token revogado'
+
+    novo = client.post('/api/login', json={'email': 'editor@empresa.com', 'password': 's3nh@'}).get_json()['token']
+    response = client.get('/api/empresas', headers={'Authorization': f'Bearer {novo}'})
+    assert response.status_code == 200
+
+def test_register_ignora_papel_enviado(client, db):
+    """Testa que o cadastro público sempre cria um visualizador."""
+    response = client.post('/api/register', json={'email': 'intruso@empresa.com', 'password': 's3nh@forte',
+                                                   'role': 'administrador'})
+    assert response.status_code == 201
+    assert response.get_json()['role'] == 'visualizador'
+
+def test_rotas_de_administrador_exigem_token_sem_auth_obrigatoria(client, db, autenticacao_ativa, token_de_usuario):
+    """Testa que requer_papel recusa requisições anônimas mesmo sem AUTH_OBRIGATORIA."""
+    response = client.get('/api/users')
+    assert response.status_code == 401
+    assert response.headers['WWW-Authenticate'] == 'Bearer'
+    assert client.get('/api/empresas').status_code == 200
+
+    token = token_de_usuario('admin@empresa.com', 'administrador')
+    assert client.get('/api/users', headers={'Authorization': f'Bearer {token}'}).status_code == 200
+
+def test_consulta_de_usuario_restrita_ao_proprio_ou_administrador(client, db, autenticacao_ativa, token_de_usuario):
+    """Testa que GET /users/<id> exige token e só mostra outro usuário a um administrador."""
+    token_visualizador = token_de_usuario('visualizador@empresa.com', 'visualizador')
+    token_admin = token_de_usuario('admin@empresa.com', 'administrador')
+    proprio_id = User.query.filter_by(email='visualizador@empresa.com').first().id
+    admin_id = User.query.filter_by(email='admin@empresa.com').first().id
+
+    assert client.get(f'/api/users/{proprio_id}').status_code == 401
+    cabecalho = {'Authorization': f'Bearer {token_visualizador}'}
+    response = client.get(f'/api/users/{proprio_id}', headers=cabecalho)
+    assert response.status_code == 200
+    assert response.get_json()['email'] == 'visualizador@empresa.com'
+    assert client.get(f'/api/users/{admin_id}', headers=cabecalho).status_code == 403
+    assert client.get(f'/api/users/{proprio_id}', headers={'Authorization': f'Bearer {token_admin}'}).status_code == 200
+
+class _FuturoLento:
+    """Futuro que nunca termina a tempo; guarda os callbacks para concluí-lo depois."""
+    def __init__(self):
+        self.callbacks = []
+    def add_done_callback(self, callback):
+        self.callbacks.append(callback)
+    def result(self, timeout=None):
+        from concurrent.futures import TimeoutError
+        raise TimeoutError()
+    def concluir(self):
+        for callback in self.callbacks:
+            callback(self)
+
+class _PoolFalso:
+    def __init__(self, erro=None):
+        self.erro = erro
+        self.futuros = []
+        self.encerrado = False
+    def submit(self, funcao, *argumentos):
+        if self.erro:
+            raise self.erro
+        self.futuros.append(_FuturoLento())
+        return self.futuros[-1]
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.encerrado = True
+
+def test_login_com_timeout_do_pool_retorna_503_sem_liberar_a_vaga(client, app, db, monkeypatch):
+    """Testa que o timeout vira 503 e a vaga só volta quando o hash termina no pool."""
+    db.session.add(User(email='lento@empresa.com', password_hash=generate_password_hash('x')))
+    db.session.commit()
+    pool = _PoolFalso()
+    vagas = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(senhas, '_obter_pool', lambda: (pool, vagas))
+
+    response = client.post('/api/login', json={'email': 'lento@empresa.com', 'password': 'x'})
+    assert response.status_code == 503
+    assert client.post('/api/login', json={'email': 'lento@empresa.com', 'password': 'x'}).status_code == 503
+    assert len(pool.futuros) == 1  # O segundo login nem chegou ao pool: a vaga segue ocupada
+
+    pool.futuros[0].concluir()
+    assert vagas.acquire(blocking=False)
+
+def test_pool_quebrado_e_recriado(client, app, db, monkeypatch):
+    """Testa que um BrokenProcessPool descarta o pool em vez de falhar para sempre."""
+    from concurrent.futures.process import BrokenProcessPool
+    db.session.add(User(email='quebrado@empresa.com', password_hash=generate_password_hash('x')))
+    db.session.commit()
+    quebrado = _PoolFalso(BrokenProcessPool('worker morto'))
+    monkeypatch.setattr(senhas, '_executor', quebrado)
+    monkeypatch.setattr(senhas, '_vagas', threading.BoundedSemaphore(3))
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_WORKERS', 1)
+
+    response = client.post('/api/login', json={'email': 'quebrado@empresa.com', 'password': 'x'})
+    assert response.status_code == 503
+    assert quebrado.encerrado
+    assert senhas._executor is None
@@ -0,0 +1,97 @@
+import pytest
+from datetime import date, timedelta
+from src.models.licenciamento import Empresa, Licenca, Condicionante, VarreduraVencimento
+
+EMPRESA_CNPJ_VENC_TEST = "33592510000154" # CNPJ_VALE
+
+
+@pytest.fixture
+def licencas_com_prazos(db):
+    """Cria uma licença vencida e outra ativa, com condicionantes vencidas, futuras e cumpridas."""
+    hoje = date.today()
+    empresa = Empresa(razao_social='Empresa Vencimentos', cnpj=EMPRESA_CNPJ_VENC_TEST)
+    db.session.add(empresa)
+    db.session.flush()
+
+    licenca_vencida = Licenca(empresa_id=empresa.id, tipo_licenca='LO Antiga', data_vencimento=hoje - timedelta(days=1))
+    licenca_ativa = Licenca(empresa_id=empresa.id, tipo_licenca='LO Atual', data_vencimento=hoje + timedelta(days=10))
+    db.session.add_all([licenca_vencida, licenca_ativa])
+    db.session.flush()
+
+    db.session.add_all([
+        Condicionante(licenca_id=licenca_ativa.id, descricao='Atrasada', data_limite=hoje - timedelta(days=5)),
+        Condicionante(licenca_id=licenca_ativa.id, descricao='No prazo', data_limite=hoje),
+        Condicionante(licenca_id=licenca_ativa.id, descricao='Cumprida', data_limite=hoje - timedelta(days=5), status='cumprida'),
+    ])
+    db.session.commit()
+    return licenca_vencida.id, licenca_ativa.id
+
+def test_comando_marcar_vencidas(runner, db, licencas_com_prazos):
+    """Testa que o comando CLI marca como vencidas apenas as linhas em aberto com prazo expirado."""
+    licenca_vencida_id, licenca_ativa_id = licencas_com_prazos
+
+    result = runner.invoke(args=['marcar-vencidas'])
+    assert result.exit_code == 0, result.output
+    assert '1 licença(s) e 1 condicionante(s)' in result.output
+
+    db.session.expire_all()
+    assert db.session.get(Licenca, licenca_vencida_id).status == 'vencida'
+    assert db.session.get(Licenca, licenca_ativa_id).status == 'ativa'
+    status_por_descricao = {c.descricao: c.status for c in Condicionante.query.all()}
+    assert status_por_descricao == {'Atrasada': 'vencida', 'No prazo': 'pendente', 'Cumprida': 'cumprida'}
+
+    varredura = VarreduraVencimento.query.one()
+    assert varredura.licencas_vencidas == 1
+    assert varredura.condicionantes_vencidas == 1
+
+    # Uma segunda execução não encontra nada novo
+    result = runner.invoke(args=['marcar-vencidas'])
+    assert '0 licença(s) e 0 condicionante(s)' in result.output
+
+def test_dashboard_usa_status_vencida(client, runner, db, licencas_com_prazos):
+    """Testa que o dashboard e a listagem por vencimento refletem o status materializado."""
+    runner.invoke(args=['marcar-vencidas'])
+
+    response = client.get('/api/dashboard/resumo')
+    assert response.status_code == 200, response.get_data(as_text=True)
+    data = response.get_json()
+    assert data['alertas']['condicionantes_vencidas'] == 1
+    assert data['totais']['condicionantes'] == 2
+    assert data['ultima_varredura']['condicionantes_vencidas'] == 1
+
+    response = client.get('/api/condicionantes?status=vencida')
+    assert [c['descricao'] for c in response.get_json()] == ['Atrasada']
+
+    response = client.get('/api/condicionantes/vencimento?dias=30')
+    assert {c['descricao'] for c in response.get_json()} == {'Atrasada', 'No prazo'}
+
+def test_prazo_prorrogado_reabre_item_vencido(client, runner, db, licencas_com_prazos):
+    """Testa que licenças e condicionantes 'vencida' voltam a ficar em aberto quando a data vai para o futuro."""
+    licenca_vencida_id, licenca_ativa_id = licencas_com_prazos
+    runner.invoke(args=['marcar-vencidas'])
+    atrasada_id = Condicionante.query.filter_by(descricao='Atrasada').one().id
+    futuro = (date.today() + timedelta(days=30)).isoformat()
+
+    response = client.put(f'/api/licencas/{licenca_vencida_id}', json={'data_vencimento': futuro})
+    assert response.get_json()['status'] == 'ativa'
+    response = client.put(f'/api/condicionantes/{atrasada_id}', json={'data_limite': futuro})
+    assert response.get_json()['status'] == 'pendente'
+
+    # Status informado explicitamente prevalece
+    response = client.put(f'/api/condicionantes/{atrasada_id}', json={'data_limite': futuro, 'status': 'vencida'})
+    assert response.get_json()['status'] == 'vencida'
+
+def test_varredura_reabre_datas_alteradas_por_fora(runner, db, licencas_com_prazos):
+    """Testa a passada inversa da varredura para datas alteradas sem passar pelas rotas."""
+    licenca_vencida_id, _ = licencas_com_prazos
+    runner.invoke(args=['marcar-vencidas'])
+    futuro = date.today() + timedelta(days=30)
+    db.session.execute(db.update(Licenca).where(Licenca.id == licenca_vencida_id).values(data_vencimento=futuro))
+    db.session.execute(db.update(Condicionante).where(Condicionante.descricao == 'Atrasada').values(data_limite=futuro))
+    db.session.commit()
+
+    result = runner.invoke(args=['marcar-vencidas'])
+    assert '1 licença(s) e 1 condicionante(s) reabertas' in result.output
+    db.session.expire_all()
+    assert db.session.get(Licenca, licenca_vencida_id).status == 'ativa'
+    assert Condicionante.query.filter_by(descricao='Atrasada').one().status == 'pendente'